@@ -0,0 +1,258 @@
+#################################################################################
+##
+## gpxtotk.py - Convert GPS eXchange files into Wintec TK files.
+##
+## Copyright (c) 2026 The Wintec Tools contributors
+##
+#################################################################################
+##
+## This program is free software; you can redistribute it and/or modify
+## it under the terms of the GNU General Public License as published by
+## the Free Software Foundation; either version 2 of the License, or
+## (at your option) any later version.
+##
+## This program is distributed in the hope that it will be useful,
+## but WITHOUT ANY WARRANTY; without even the implied warranty of
+## MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+## GNU General Public License for more details.
+##
+## You should have received a copy of the GNU General Public License
+## along with this program; if not, write to the Free Software
+## Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA
+##
+#################################################################################
+## Requirements                                                                ##
+#################################################################################
+##
+## Python 3.10 or later:
+## <http://www.python.org>
+##
+#################################################################################
+## Program information:                                                        ##
+#################################################################################
+##
+## - Every track segment becomes a track of the TK file.
+## - Track points without time are skipped.
+## - Track points with the time of a waypoint are marked as push log points.
+## - The files are parsed incrementally, so even very large files are
+##   converted in constant memory when writing a .tk1 file.
+##
+#################################################################################
+## Support                                                                     ##
+#################################################################################
+##
+## The latest version of the wintec tools is available on Github
+## <https://github.com/BlinxFox/WintecTools>
+##
+## If you have bug reports, patches or some questions, please create an
+## issue on Github:
+## <https://github.com/BlinxFox/WintecTools>
+##
+#################################################################################
+
+"""
+Convert GPS eXchange files into Wintec TK files.
+"""
+
+import getopt
+from glob import glob
+import os
+import sys
+from xml.etree.ElementTree import iterparse, ParseError
+
+from winteclib import VERSION, COORDINATE_SCALE, TKImporter, getDayStart, openCompressedFile, parseScaled
+
+DEVICENAME = b"GPX import"
+""" The device name stored in the header of the TK files. """
+
+MIN_TIMESTAMP = 946684800
+""" The first second (2000-01-01) which can be stored in a trackpoint. """
+
+MAX_TIMESTAMP = 2966371200
+""" The first second (2064-01-01) which can't be stored in a trackpoint. """
+
+CLEARED_ELEMENTS = frozenset(["trkpt", "wpt", "trkseg", "trk", "rte", "metadata"])
+""" The elements removed from the tree after they have been parsed. """
+
+def getLocalName(tag):
+    """
+    Strip the namespace from an element tag.
+    
+    @param tag: The element tag, e.g. "{http://www.topografix.com/GPX/1/1}trkpt".
+    @return: The tag without namespace.
+    """
+    return tag[tag.rfind("}") + 1:]
+
+def parseGpxTime(text):
+    """
+    Convert a GPX time (ISO 8601, e.g. 2008-05-01T10:20:30Z) into seconds since the epoch.
+    
+    Fractional seconds are truncated, timezone offsets are taken into account.
+    
+    @param text: The time string.
+    @return: The seconds since the epoch or None if the time can't be parsed.
+    """
+    try:
+        text = text.strip()
+        year = int(text[0:4])
+        month = int(text[5:7])
+        day = int(text[8:10])
+        if not (2000 <= year < 2064 and 1 <= month <= 12 and 1 <= day <= 31) or text[4] + text[7] != "--" or \
+           text[10] not in "T ":
+            return None
+        timestamp = getDayStart(((year - 2000) << 9) | (month << 5) | day) + int(text[11:13]) * 3600 + \
+                    int(text[14:16]) * 60 + int(text[17:19])
+        zone = text[19:]
+        if zone.startswith("."):
+            zone = zone.lstrip(".0123456789")
+        if zone in ("", "Z"):
+            return timestamp
+        offset = int(zone[1:3]) * 3600 + int(zone[-2:]) * 60
+        return timestamp - offset if zone[0] == "+" else timestamp + offset
+    except (ValueError, IndexError):
+        return None
+
+def importGpx(gpxFileName, importer):
+    """
+    Read the track points of a GPX file and add them to the importer.
+    
+    @param gpxFileName: The name of the GPX file.
+    @param importer: The L{TKImporter}.
+    @return: The number of track points imported.
+    """
+    count = 0
+    skipped = 0
+    logTimes = set()
+    parents = []
+    localNames = {}
+    gpxFile = openCompressedFile(gpxFileName)
+    try:
+        for event, elem in iterparse(gpxFile, events = ("start", "end")):
+            name = localNames.get(elem.tag)
+            if name == None:
+                name = localNames[elem.tag] = getLocalName(elem.tag)
+            if event == "start":
+                if name == "trkseg":
+                    importer.startTrack()
+                parents.append(elem)
+                continue
+            parents.pop()
+            if name in ("trkpt", "wpt"):
+                elevation = None
+                timestamp = None
+                temperature = None
+                pressure = None
+                for child in elem:
+                    childName = localNames.get(child.tag)
+                    if childName == "ele" and child.text:
+                        elevation = child.text
+                    elif childName == "time" and child.text:
+                        timestamp = parseGpxTime(child.text)
+                    elif childName == "extensions":
+                        # Temperature and air pressure of WSG1000 log version 2.0, see TEMPERATURE_PRESSURE in tktogpx.
+                        for value in child.iter():
+                            valueName = localNames.get(value.tag)
+                            if valueName == "Temperature" and value.text:
+                                temperature = value.text
+                            elif valueName == "Pressure" and value.text:
+                                pressure = value.text
+                if timestamp == None or not MIN_TIMESTAMP <= timestamp < MAX_TIMESTAMP:
+                    skipped += name == "trkpt"
+                elif name == "wpt":
+                    logTimes.add(timestamp)
+                else:
+                    try:
+                        latitude = parseScaled(elem.get("lat"), COORDINATE_SCALE)
+                        longitude = parseScaled(elem.get("lon"), COORDINATE_SCALE)
+                        altitude = round(float(elevation)) if elevation else 0
+                        if temperature != None and pressure != None:
+                            temperature = float(temperature)
+                            pressure = float(pressure)
+                    except (AttributeError, ValueError):
+                        skipped += 1
+                    else:
+                        importer.addTrackpoint(timestamp, latitude, longitude, altitude, timestamp in logTimes,
+                                               temperature, pressure)
+                        count += 1
+            if name in CLEARED_ELEMENTS:
+                # Drop the parsed element, so memory usage doesn't grow with the file size.
+                elem.clear()
+                if parents:
+                    parents[-1].remove(elem)
+    finally:
+        gpxFile.close()
+    if skipped:
+        print("Skipped %i trackpoints without valid time or position" % skipped)
+    return count
+
+def usage():
+    """
+    Print program usage.
+    """
+    executable = os.path.split(sys.argv[0])[1]
+    print("%s Version %s (C) 2026 The Wintec Tools contributors" % (executable, VERSION))
+    print("Convert GPS eXchange files into Wintec TK files.\n")
+    print("Usage: %s [-2] [-d outputdir] [-o filename] <gpx files>" % executable)
+    print("-2: Create a .tk2 file for every track instead of a .tk1 file.")
+    print("-d: Use output directory.")
+    print("-o: Use output filename; all gpx files are written into this .tk1 file.")
+
+def main():
+    """
+    The main method.
+    """
+    # pylint: disable-msg=R0912
+    createTk2 = False
+    outputDir = None
+    filename = None
+
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], "?h2d:o:")
+    except getopt.GetoptError:
+        # print help information and exit:
+        usage()
+        sys.exit(2)
+    if len(args) == 0:
+        usage()
+        sys.exit(1)
+
+    for o, a in opts:
+        if o in ("-h", "-?"):
+            usage()
+            sys.exit()
+        if o == "-2":
+            createTk2 = True
+        if o == "-d":
+            outputDir = a
+        if o == "-o":
+            filename = a
+
+    if outputDir and not os.path.exists(outputDir):
+        print("Output directory %s doesn't exist!" % outputDir)
+        sys.exit(3)
+
+    gpxFileNames = []
+    for arg in args:
+        gpxFileNames += glob(arg)
+    if len(gpxFileNames) == 0:
+        print("No GPX files found!")
+        sys.exit(3)
+
+    importer = None
+    for gpxFileName in gpxFileNames:
+        if importer == None or not filename:
+            defaultFilename = os.path.splitext(os.path.basename(gpxFileName))[0] + ".tk1"
+            importer = TKImporter(DEVICENAME, b"", outputDir, filename, defaultFilename, createTk2)
+        print("Reading %s" % gpxFileName)
+        try:
+            count = importGpx(gpxFileName, importer)
+        except ParseError as e:
+            print("Can't parse %s: %s" % (gpxFileName, e))
+            count = 0
+        print("Imported %i trackpoints" % count)
+        if not filename:
+            importer.close()
+    importer.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+#################################################################################
+##
+## nmeatotk.py - Convert NMEA-0183 files into Wintec TK files.
+##
+## Copyright (c) 2026 The Wintec Tools contributors
+##
+#################################################################################
+##
+## This program is free software; you can redistribute it and/or modify
+## it under the terms of the GNU General Public License as published by
+## the Free Software Foundation; either version 2 of the License, or
+## (at your option) any later version.
+##
+## This program is distributed in the hope that it will be useful,
+## but WITHOUT ANY WARRANTY; without even the implied warranty of
+## MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+## GNU General Public License for more details.
+##
+## You should have received a copy of the GNU General Public License
+## along with this program; if not, write to the Free Software
+## Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA
+##
+#################################################################################
+## Requirements                                                                ##
+#################################################################################
+##
+## Python 3.10 or later:
+## <http://www.python.org>
+##
+#################################################################################
+## Program information:                                                        ##
+#################################################################################
+##
+## - The trackpoints are taken from the RMC and GGA sentences, sentences with
+##   wrong checksum or without a fix are skipped.
+## - A new track is started after 60 seconds without a fix.
+## - The files are read line by line, so even very large files are converted
+##   in constant memory when writing a .tk1 file.
+##
+#################################################################################
+## Support                                                                     ##
+#################################################################################
+##
+## The latest version of the wintec tools is available on Github
+## <https://github.com/BlinxFox/WintecTools>
+##
+## If you have bug reports, patches or some questions, please create an
+## issue on Github:
+## <https://github.com/BlinxFox/WintecTools>
+##
+#################################################################################
+
+"""
+Convert NMEA-0183 files into Wintec TK files.
+"""
+
+import getopt
+from glob import glob
+import os
+import sys
+
+from winteclib import VERSION, NEW_TRACK_GAP, TKImporter, NmeaParser, convertToTimestamp, \
+    openCompressedFile
+
+DEVICENAME = b"NMEA import"
+""" The device name stored in the header of the TK files. """
+
+def importNmea(nmeaFileName, importer):
+    """
+    Read the trackpoints of a NMEA file and add them to the importer.
+    
+    @param nmeaFileName: The name of the NMEA file.
+    @param importer: The L{TKImporter}.
+    @return: The number of trackpoints imported.
+    """
+    state = {"count": 0, "previous": None}
+
+    def addTrackpoint(dateTimeField, latitude, longitude, altitude):
+        """
+        Add a trackpoint emitted by the parser, starting a new track after a gap.
+        """
+        timestamp = convertToTimestamp(dateTimeField)
+        previous = state["previous"]
+        if previous != None and not 0 <= timestamp - previous <= NEW_TRACK_GAP:
+            importer.startTrack()
+        importer.addTrackpoint(timestamp, latitude, longitude, altitude)
+        state["previous"] = timestamp
+        state["count"] += 1
+
+    importer.startTrack()
+    parser = NmeaParser(addTrackpoint)
+    f = openCompressedFile(nmeaFileName)
+    try:
+        for line in f:
+            parser.parse(line)
+        parser.flush()
+    finally:
+        f.close()
+    return state["count"]
+
+def usage():
+    """
+    Print program usage.
+    """
+    executable = os.path.split(sys.argv[0])[1]
+    print("%s Version %s (C) 2026 The Wintec Tools contributors" % (executable, VERSION))
+    print("Convert NMEA-0183 files into Wintec TK files.\n")
+    print("Usage: %s [-2] [-d outputdir] [-o filename] <nmea files>" % executable)
+    print("-2: Create a .tk2 file for every track instead of a .tk1 file.")
+    print("-d: Use output directory.")
+    print("-o: Use output filename; all nmea files are written into this .tk1 file.")
+
+def main():
+    """
+    The main method.
+    """
+    # pylint: disable-msg=R0912
+    createTk2 = False
+    outputDir = None
+    filename = None
+
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], "?h2d:o:")
+    except getopt.GetoptError:
+        # print help information and exit:
+        usage()
+        sys.exit(2)
+    if len(args) == 0:
+        usage()
+        sys.exit(1)
+
+    for o, a in opts:
+        if o in ("-h", "-?"):
+            usage()
+            sys.exit()
+        if o == "-2":
+            createTk2 = True
+        if o == "-d":
+            outputDir = a
+        if o == "-o":
+            filename = a
+
+    if outputDir and not os.path.exists(outputDir):
+        print("Output directory %s doesn't exist!" % outputDir)
+        sys.exit(3)
+
+    nmeaFileNames = []
+    for arg in args:
+        nmeaFileNames += glob(arg)
+    if len(nmeaFileNames) == 0:
+        print("No NMEA files found!")
+        sys.exit(3)
+
+    importer = None
+    for nmeaFileName in nmeaFileNames:
+        if importer == None or not filename:
+            defaultFilename = os.path.splitext(os.path.basename(nmeaFileName))[0] + ".tk1"
+            importer = TKImporter(DEVICENAME, b"", outputDir, filename, defaultFilename, createTk2)
+        print("Reading %s" % nmeaFileName)
+        print("Imported %i trackpoints" % importNmea(nmeaFileName, importer))
+        if not filename:
+            importer.close()
+    importer.close()
+
+if __name__ == "__main__":
+    main()
@@ -56,14 +56,38 @@ import getopt
 import os
 import sys
 import time
-import serial
 
-from winteclib import VERSION, Trackpoint, TK1File, createOutputFile
+from winteclib import VERSION, NEW_TRACK_GAP, Trackpoint, TrackColumns, TK1File, TK1Writer, NmeaParser, \
+    createOutputFile, getOutputFileName, convertToTimestamp
 
 BLOCKSIZE = 4096
 BAUDRATE = 57600
 READ_TIMEOUT = 3000 # 3 seconds
 
+LIVE_READ_TIMEOUT = 0.1
+""" The serial read timeout in seconds during a live capture. """
+
+LIVE_FLUSH_INTERVAL = 0.5
+""" The interval in seconds for writing new trackpoints and updating footer and header of the live capture file. """
+
+LIVE_DEVICENAME = b"NMEA live capture"
+""" The device name stored in the header of live capture files. """
+
+LIVE_FILENAME_TEMPLATE = "%y%m%d_%H%M-live.tk1"
+""" The strftime format string for the names of the live capture files. """
+
+LIVE_FILENAME_SUFFIX = "-%i"
+""" The suffix inserted before the extension if a live capture file with the same name already exists. """
+
+def importSerial():
+    """
+    Import pyserial on first use, so the usage is printed without loading it.
+    
+    @return: The serial module.
+    """
+    import serial # pylint: disable-msg=C0415
+    return serial
+
 def isChecksumCorrect(buf, checksum):
     """
     Validates buffer checksum.
@@ -122,6 +146,7 @@ def readLog(tty, password, debug):
     @param debug: True if debug information should be printed; False otherwise.
     """
     # pylint: disable-msg=R0912,R0914,R0915
+    serial = importSerial()
 
     # Make sure that bypass mode is enabled.
     tty.write(b"@AL,02,01\n")
@@ -259,6 +284,134 @@ def readLog(tty, password, debug):
         print("Can't switch into command mode!")
     return tk1
 
+class LiveTk1Writer:
+    """
+    This class collects live trackpoints and appends them to a .tk1 file.
+
+    Without a given filename a new file is started for every day (UTC).
+    """
+
+    def __init__(self, outputDir, filename):
+        """
+        Constructor.
+        
+        @param outputDir: The output directory or None.
+        @param filename: The output file name or None to create names from the trackpoint dates.
+        """
+        self.outputDir = outputDir
+        self.filename = filename
+        self.file = None
+        self.writer = None
+        self.day = None
+        self.previousTimestamp = None
+        self.newPoints = []
+        self.totalCount = 0
+
+    def append(self, dateTimeField, latitude, longitude, altitude):
+        """
+        Append a trackpoint. It is written by the next L{flush()}.
+        
+        @param dateTimeField: The date/time field value.
+        @param latitude: The latitude field value.
+        @param longitude: The longitude field value.
+        @param altitude: The altitude in meters.
+        """
+        timestamp = convertToTimestamp(dateTimeField)
+        if self.file == None or (self.filename == None and dateTimeField >> 17 != self.day):
+            self.open(dateTimeField)
+        pointType = 0
+        if self.previousTimestamp == None or not 0 <= timestamp - self.previousTimestamp <= NEW_TRACK_GAP:
+            pointType = Trackpoint.TRACKSTART
+        self.newPoints.append(TrackColumns.TRACKPOINTFORMAT.pack(pointType, dateTimeField, latitude, longitude,
+                                                                 altitude))
+        self.previousTimestamp = timestamp
+        self.totalCount += 1
+
+    def open(self, dateTimeField):
+        """
+        Close the current file and create a new one.
+        
+        Generated file names get a number suffix if the file already exists, so a capture restarted within the same
+        minute doesn't overwrite the earlier file.
+        
+        @param dateTimeField: The date/time field value of the first trackpoint.
+        """
+        self.close()
+        if self.filename != None:
+            self.file = createOutputFile(self.outputDir, self.filename, "%s", None, flags = "wb")
+        else:
+            firstPoint = Trackpoint(TrackColumns.TRACKPOINTFORMAT.pack(0, dateTimeField, 0, 0, 0))
+            name = firstPoint.getDateTimeString(LIVE_FILENAME_TEMPLATE)
+            base, extension = os.path.splitext(name)
+            number = 1
+            while os.path.exists(getOutputFileName(self.outputDir, None, "%s", name)):
+                number += 1
+                name = base + LIVE_FILENAME_SUFFIX % number + extension
+            self.file = createOutputFile(self.outputDir, None, "%s", name, flags = "xb")
+        self.writer = TK1Writer(self.file, LIVE_DEVICENAME, b"", b"")
+        self.day = dateTimeField >> 17
+        self.previousTimestamp = None
+
+    def flush(self):
+        """
+        Write the new trackpoints and update footer and header.
+        """
+        if self.writer == None or not self.newPoints:
+            return
+        self.writer.write(b"".join(self.newPoints))
+        self.writer.flush()
+        self.newPoints = []
+
+    def close(self):
+        """
+        Flush and close the current file.
+        """
+        if self.file != None:
+            self.flush()
+            self.file.close()
+            self.file = None
+            self.writer = None
+
+def captureLive(tty, outputDir, filename, debug):
+    """
+    Capture the NMEA stream of a gps device in bypass mode into .tk1 files until interrupted.
+    
+    @param tty: The serial device handle for the gps device.
+    @param outputDir: The output directory or None.
+    @param filename: The output file name or None for daily files with generic names.
+    @param debug: True if debug information should be printed; False otherwise.
+    @return: The number of captured trackpoints.
+    """
+    # Make sure that bypass mode is enabled.
+    tty.write(b"@AL,02,01\n")
+
+    writer = LiveTk1Writer(outputDir, filename)
+    parser = NmeaParser(writer.append)
+    buf = bytearray()
+    nextFlush = time.monotonic() + LIVE_FLUSH_INTERVAL
+    print("Capture live data, press Ctrl-C to stop")
+    try:
+        while True:
+            buf += tty.read(max(1, tty.inWaiting()))
+            end = buf.find(b"\n")
+            while end >= 0:
+                line = bytes(buf[:end])
+                del buf[:end + 1]
+                if debug:
+                    print(line)
+                parser.parse(line)
+                end = buf.find(b"\n")
+            now = time.monotonic()
+            if now >= nextFlush:
+                writer.flush()
+                nextFlush = now + LIVE_FLUSH_INTERVAL
+    except KeyboardInterrupt:
+        pass
+    finally:
+        parser.flush()
+        writer.close()
+    return writer.totalCount
+
 def usage():
     """
     Print program usage.
@@ -267,11 +420,14 @@ def usage():
     print("%s Version %s (C) 2008 Steffen Siebert <siebert@steffensiebert.de>" % (executable, VERSION))
     print("Read gps tracklogs from Wintec WBT-201 or WSG-1000 and write them into a .tk1 file.\n")
     print("Usage: %s [-v] [-p password] [-d outputdir] [-o filename] [--delete] <serial port>" % executable)
+    print("       %s --live [-v] [-d outputdir] [-o filename] <serial port>" % executable)
     print("-v: Print debug info.")
     print("-p: Wintec WBT-201 password (4 digits).")
     print("-d: Use output directory.")
     print("-o: Use output filename.")
     print("--delete: Delete log from device after successful read.")
+    print("--live: Capture the live NMEA output of the device in bypass mode until Ctrl-C is pressed.")
+    print("        Without -o a new file is started every day (UTC).")
 
 def main():
     """
@@ -280,13 +436,14 @@ def main():
     # pylint: disable-msg=R0912
     
     deleteLog = False
+    live = False
     debug = False
     password = None
     outputDir = None
     filename = None
     
     try:
-        opts, args = getopt.getopt(sys.argv[1:], "?hvp:d:o:", "delete")
+        opts, args = getopt.getopt(sys.argv[1:], "?hvp:d:o:", ["delete", "live"])
     except getopt.GetoptError:
         # print help information and exit:
         usage()
@@ -309,6 +466,8 @@ def main():
             filename = a
         if o == "--delete":
             deleteLog = True
+        if o == "--live":
+            live = True
 
     if outputDir and not os.path.exists(outputDir):
         print("Output directory %s doesn't exist!" % outputDir)
@@ -318,7 +477,17 @@ def main():
         print("Output file %s already exists!" % filename)
         sys.exit(4)
 
+    serial = importSerial()
     tty = None
+    if live:
+        try:
+            tty = serial.Serial(args[0], BAUDRATE, timeout=LIVE_READ_TIMEOUT)
+            print("Captured %i trackpoints" % captureLive(tty, outputDir, filename, debug))
+        finally:
+            if tty != None:
+                del tty
+        return
+
     try:
         tty = serial.Serial(args[0], BAUDRATE, timeout=READ_TIMEOUT)
         tk1 = readLog(tty, password, debug)
@@ -52,7 +52,7 @@ import os.path
 from pytz import utc
 import sys
 
-from winteclib import VERSION, readTKFile, parseTimezone, TK1File, TK2File, TK3File
+from winteclib import VERSION, readTKFile, parseTimezone, ConversionCache, TK1File, TK2File, TK3File
 
 def splitTK1(tk1File, comment = ""):
     """
@@ -87,6 +87,7 @@ def writeFile(tkFile, directory = None):
     Create TK file.
      
     @param tkFile: The tk object to write.
+    @return: The name of the created file.
     """
     fileName = tkFile.createFilename()
     if directory:
@@ -95,6 +96,7 @@ def writeFile(tkFile, directory = None):
     f = open(fileName, 'wb')
     tkFile.write(f)
     f.close()
+    return fileName
 
 def usage():
     """
@@ -104,7 +106,7 @@ def usage():
     print("%s Version %s (C) 2008 Steffen Siebert <siebert@steffensiebert.de>" % (executable, VERSION))
     print("Split .tk1 files into .tk2 and/or .tk3 files.\n")
     print('Usage: %s [-2] [-3] [-d directory] [--d2 directory] [--d3 directory] [-c "user comment"]' % executable,)
-    print("[-t +hh:mm|--autotz] <tk1 files>")
+    print("[-t +hh:mm|--autotz] [--force] <tk1 files>")
     print("-2: Create .tk2 files.")
     print("-3: Create .tk3 files.")
     print("-d: Use output directory for tk2 and tk3 files.")
@@ -113,6 +115,7 @@ def usage():
     print("-c: User comment string to store in the .tk2/tk3 header.")
     print("-t: Use timezone for local time (offset to UTC).")
     print("--autotz: Determine timezone from first trackpoint.")
+    print("--force: Split even if the file and options are unchanged since the last split.")
 
 def main():
     """
@@ -127,9 +130,10 @@ def main():
     timezone = utc
     autotimezone = False
     comment = ""
+    force = False
 
     try:
-        opts, args = getopt.getopt(sys.argv[1:], "?h23d:t:c:", ["autotz", "d2=", "d3="])
+        opts, args = getopt.getopt(sys.argv[1:], "?h23d:t:c:", ["autotz", "d2=", "d3=", "force"])
     except getopt.GetoptError:
         # print help information and exit:
         usage()
@@ -161,6 +165,8 @@ def main():
             comment = a
         if o == "--autotz":
             autotimezone = True
+        if o == "--force":
+            force = True
     
     # if neither -2 nor -3 is specified, create both file types.
     if not createTk2 and not createTk3:
@@ -177,7 +183,13 @@ def main():
     for arg in args:
         filelist += glob(arg)
 
+    cache = ConversionCache(force = force)
+    options = [(o, a) for o, a in opts if o != "--force"]
     for tk1FileName in filelist:
+        cacheKey = "tk1split:%s" % os.path.abspath(tk1FileName)
+        if cache.isUnchanged(cacheKey, options, [tk1FileName]):
+            print("%s is unchanged, skipped." % tk1FileName)
+            continue
         print("Reading %s" % tk1FileName)
         tk1File = readTKFile(tk1FileName)
         if tk1File == None:
@@ -189,12 +201,15 @@ def main():
             tk1File.setAutotimezone(autotimezone)
             tk1File.setTimezone(timezone)
             tk2Files, tk3Files = splitTK1(tk1File, comment)
+            outputNames = []
             if createTk2:
                 for tkFile in tk2Files:
-                    writeFile(tkFile, tk2OutputDir)
+                    outputNames.append(writeFile(tkFile, tk2OutputDir))
             if createTk3:
                 for tkFile in tk3Files:
-                    writeFile(tkFile, tk3OutputDir)
+                    outputNames.append(writeFile(tkFile, tk3OutputDir))
+            cache.update(cacheKey, options, [tk1FileName], outputNames)
+    cache.close()
 
 if __name__ == "__main__":
     main()
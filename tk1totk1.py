@@ -51,7 +51,7 @@ import getopt
 import os
 import sys
 
-from winteclib import VERSION, TK1File, createOutputFile
+from winteclib import VERSION, TK1File, createOutputFile, openCompressedFile
 
 def createTK1File(tk1Source):    
     """
@@ -112,7 +112,7 @@ def main():
         sys.exit(4)
 
     tk1Source = TK1File()
-    f = open(args[0], "rb")
+    f = openCompressedFile(args[0])
     tk1Source.read(f)
     f.close()
 
@@ -0,0 +1,580 @@
+#################################################################################
+##
+## tkarchive.py - Store Wintec TK files in a compact archive and restore them.
+##
+## Copyright (c) 2026 The Wintec Tools contributors
+##
+#################################################################################
+##
+## This program is free software; you can redistribute it and/or modify
+## it under the terms of the GNU General Public License as published by
+## the Free Software Foundation; either version 2 of the License, or
+## (at your option) any later version.
+##
+## This program is distributed in the hope that it will be useful,
+## but WITHOUT ANY WARRANTY; without even the implied warranty of
+## MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+## GNU General Public License for more details.
+##
+## You should have received a copy of the GNU General Public License
+## along with this program; if not, write to the Free Software
+## Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA
+##
+#################################################################################
+## Requirements                                                                ##
+#################################################################################
+##
+## Python 3.10 or later:
+## <http://www.python.org>
+##
+#################################################################################
+## Program information:                                                        ##
+#################################################################################
+##
+## - The trackpoints are stored as blocks of delta encoded columns, every
+##   block is compressed separately.
+## - The archive directory keeps the time range of every block for random
+##   access by time, see TKArchive.readTrackdata().
+## - Extracted files are identical to the archived files.
+##
+#################################################################################
+## Support                                                                     ##
+#################################################################################
+##
+## The latest version of the wintec tools is available on Github
+## <https://github.com/BlinxFox/WintecTools>
+##
+## If you have bug reports, patches or some questions, please create an
+## issue on Github:
+## <https://github.com/BlinxFox/WintecTools>
+##
+#################################################################################
+
+"""
+Store Wintec TK files in a compact archive and restore them.
+"""
+
+from array import array
+import getopt
+from fnmatch import fnmatch
+from glob import glob
+import io
+import os
+import struct
+import sys
+import zlib
+
+from winteclib import VERSION, FILEMARKERLEN, Trackpoint, TrackColumns, TK1File, getTKFileClass, convertToTimestamp, \
+    convertFromTimestamp, packTrackpoints, splitTrackdata, encodeDeltas, decodeDeltas
+
+ARCHIVE_COMPRESSIONS = {"none": 0, "zlib": 1, "lzma": 2}
+""" A map of the names and ids of the block compression methods of L{TKArchiveWriter}. """
+
+def compressBlock(data, compression):
+    """
+    Compress an archive block.
+    
+    @param data: The block data.
+    @param compression: The compression method id, see L{ARCHIVE_COMPRESSIONS}.
+    @return: The compressed data.
+    """
+    if compression == 1:
+        return zlib.compress(data, 9)
+    if compression == 2:
+        import lzma # pylint: disable-msg=C0415
+        return lzma.compress(data, preset = 9)
+    return data
+
+def decompressBlock(data, compression):
+    """
+    Decompress an archive block.
+    
+    @param data: The compressed block data.
+    @param compression: The compression method id, see L{ARCHIVE_COMPRESSIONS}.
+    @return: The block data.
+    """
+    if compression == 1:
+        return zlib.decompress(data)
+    if compression == 2:
+        import lzma # pylint: disable-msg=C0415
+        return lzma.decompress(data)
+    return data
+
+def encodeTrackdataBlock(trackdata):
+    """
+    Encode trackdata into an archive block.
+    
+    Every trackpoint field is stored as a column of zigzag varint deltas. The date/time fields are stored as deltas
+    of their timestamps, unless a field isn't a valid date, then the raw field values are used.
+    
+    @param trackdata: The trackdata as array of bytes.
+    @return: Tuple of the encoded block, the first and the last timestamp of the block.
+    """
+    columns = TrackColumns.TRACKPOINTFORMAT.iter_unpack(trackdata)
+    types, dateTimeFields, latitudes, longitudes, altitudes = zip(*columns)
+    try:
+        timestamps = list(map(convertToTimestamp, dateTimeFields))
+        rawTimes = list(map(convertFromTimestamp, timestamps)) != list(dateTimeFields)
+    except (ValueError, AssertionError):
+        rawTimes = True
+    if rawTimes:
+        times = dateTimeFields
+        firstTime, lastTime = ARCHIVE_MINTIME, ARCHIVE_MAXTIME
+    else:
+        times = timestamps
+        firstTime, lastTime = min(timestamps), max(timestamps)
+    block = struct.pack("<IB", len(types), rawTimes) + encodeDeltas(types) + encodeDeltas(times) + \
+            encodeDeltas(latitudes) + encodeDeltas(longitudes) + encodeDeltas(altitudes)
+    return block, firstTime, lastTime
+
+def decodeTrackdataBlock(block):
+    """
+    Decode an archive block created by L{encodeTrackdataBlock()}.
+    
+    @param block: The block data.
+    @return: The trackdata as array of bytes.
+    """
+    count, rawTimes = struct.unpack("<IB", block[:5])
+    types, pos = decodeDeltas(block, 5, count)
+    times, pos = decodeDeltas(block, pos, count)
+    latitudes, pos = decodeDeltas(block, pos, count)
+    longitudes, pos = decodeDeltas(block, pos, count)
+    altitudes, pos = decodeDeltas(block, pos, count)
+    assert pos == len(block)
+    dateTimeFields = times if rawTimes else array('I', map(convertFromTimestamp, times))
+    return packTrackpoints(types, dateTimeFields, latitudes, longitudes, altitudes)
+
+def isInTimeRange(trackpoint, startTime, endTime):
+    """
+    Test whether the time of a trackpoint is in a time range. Trackpoints with an invalid date are never in range.
+    
+    @param trackpoint: The trackpoint data.
+    @param startTime: The first second (since the epoch) of the time range or None.
+    @param endTime: The second after the time range or None.
+    @return: True if the trackpoint is in the time range; False otherwise.
+    """
+    try:
+        timestamp = convertToTimestamp(struct.unpack('<I', trackpoint[0x02:0x06])[0])
+    except ValueError:
+        return False
+    return (startTime == None or timestamp >= startTime) and (endTime == None or timestamp < endTime)
+
+ARCHIVE_MARKER = b"WintecArchive01\x00"
+""" The identification marker at the beginning and the end of a TK archive. """
+
+ARCHIVE_BLOCKSIZE = 4096
+""" The number of trackpoints per archive block. """
+
+ARCHIVE_MINTIME = -2 ** 63
+""" The first timestamp of a block with raw date/time fields, so it overlaps every time range. """
+
+ARCHIVE_MAXTIME = 2 ** 63 - 1
+""" The last timestamp of a block with raw date/time fields, so it overlaps every time range. """
+
+ARCHIVE_TRAILER = struct.Struct("<QI16s")
+""" The end of a TK archive: directory offset, directory length and archive marker. """
+
+ARCHIVE_BLOCKENTRY = struct.Struct("<qqQIIB")
+""" A block of the archive directory: first and last timestamp, offset, length, trackpoint count, compression. """
+
+class TKArchiveMember:
+    """
+    This class represents a TK file stored in a L{TKArchive}.
+
+    The member keeps the file header and the data behind the trackdata (the TK1 footer) and the index of the
+    trackdata blocks.
+    """
+
+    def __init__(self, name, headerExtent, footerExtent, blocks):
+        """
+        Constructor.
+        
+        @param name: The member name.
+        @param headerExtent: Tuple of offset and length of the compressed header.
+        @param footerExtent: Tuple of offset and length of the compressed footer.
+        @param blocks: A list of (firstTime, lastTime, offset, length, count, compression) tuples.
+        """
+        self.name = name
+        self.headerExtent = headerExtent
+        self.footerExtent = footerExtent
+        self.blocks = blocks
+
+    def getName(self):
+        """
+        Get the member name.
+        
+        @return: The member name.
+        """
+        return self.name
+
+    def getTrackpointCount(self):
+        """
+        Get the number of trackpoints.
+        
+        @return: The number of trackpoints.
+        """
+        return sum([block[4] for block in self.blocks])
+
+    def getStoredSize(self):
+        """
+        Get the number of bytes used in the archive.
+        
+        @return: The number of bytes.
+        """
+        return self.headerExtent[1] + self.footerExtent[1] + sum([block[3] for block in self.blocks])
+
+    def pack(self):
+        """
+        Create the directory entry of the member.
+        
+        @return: The directory entry as bytes.
+        """
+        name = self.name.encode("utf-8")
+        entry = struct.pack("<H", len(name)) + name + struct.pack("<QIQII", self.headerExtent[0], self.headerExtent[1],
+                                                                 self.footerExtent[0], self.footerExtent[1],
+                                                                 len(self.blocks))
+        return entry + b"".join([ARCHIVE_BLOCKENTRY.pack(*block) for block in self.blocks])
+
+def unpackArchiveDirectory(directory):
+    """
+    Read the members of an archive directory created by L{TKArchiveMember.pack()}.
+    
+    @param directory: The uncompressed directory.
+    @return: A list of L{TKArchiveMember} objects.
+    """
+    members = []
+    pos = 0
+    while pos < len(directory):
+        nameLength = struct.unpack("<H", directory[pos:pos + 2])[0]
+        name = directory[pos + 2:pos + 2 + nameLength].decode("utf-8")
+        pos += 2 + nameLength
+        headerOffset, headerLength, footerOffset, footerLength, blockCount = \
+            struct.unpack("<QIQII", directory[pos:pos + 28])
+        pos += 28
+        blocks = list(ARCHIVE_BLOCKENTRY.iter_unpack(directory[pos:pos + blockCount * ARCHIVE_BLOCKENTRY.size]))
+        pos += blockCount * ARCHIVE_BLOCKENTRY.size
+        members.append(TKArchiveMember(name, (headerOffset, headerLength), (footerOffset, footerLength), blocks))
+    return members
+
+class TKArchive:
+    """
+    This class reads a TK archive.
+
+    A TK archive stores TK files in a compact form: the trackdata is split into blocks of delta encoded trackpoints,
+    which are compressed separately. The directory at the end of the archive keeps the time range of every block,
+    so the trackpoints of a time range are read without reading the whole archive.
+    The original TK files are restored byte by byte.
+    """
+
+    def __init__(self, fileName):
+        """
+        Constructor.
+        
+        @param fileName: The name of the archive file.
+        @raise IOError: If the file isn't a TK archive.
+        """
+        self.fileName = fileName
+        self.fileHandle = open(fileName, "rb")
+        self.fileHandle.seek(-ARCHIVE_TRAILER.size, os.SEEK_END)
+        self.directoryOffset, directoryLength, marker = ARCHIVE_TRAILER.unpack(self.fileHandle.read())
+        if marker != ARCHIVE_MARKER:
+            self.fileHandle.close()
+            raise IOError("%s is not a TK archive!" % fileName)
+        self.members = unpackArchiveDirectory(zlib.decompress(self.readExtent((self.directoryOffset,
+                                                                               directoryLength))))
+
+    def readExtent(self, extent):
+        """
+        Read a part of the archive file.
+        
+        @param extent: Tuple of offset and length.
+        @return: The data.
+        """
+        self.fileHandle.seek(extent[0])
+        return self.fileHandle.read(extent[1])
+
+    def getMembers(self):
+        """
+        Get the members of the archive.
+        
+        @return: A list of L{TKArchiveMember} objects.
+        """
+        return self.members
+
+    def getMember(self, name):
+        """
+        Get a member by name.
+        
+        @param name: The member name.
+        @return: The L{TKArchiveMember} or None.
+        """
+        for member in self.members:
+            if member.name == name:
+                return member
+        return None
+
+    def readTrackdata(self, member, startTime = None, endTime = None):
+        """
+        Read the trackdata of a member, optionally only the trackpoints of a time range.
+        
+        Only the blocks overlapping the time range are read and decoded.
+        
+        @param member: The L{TKArchiveMember}.
+        @param startTime: The first second (since the epoch) of the time range or None.
+        @param endTime: The second after the time range or None.
+        @return: The trackdata as array of bytes.
+        """
+        trackdata = []
+        for firstTime, lastTime, offset, length, _, compression in member.blocks:
+            if (startTime != None and lastTime < startTime) or (endTime != None and firstTime >= endTime):
+                continue
+            data = decodeTrackdataBlock(decompressBlock(self.readExtent((offset, length)), compression))
+            if (startTime != None and firstTime < startTime) or (endTime != None and lastTime >= endTime):
+                data = b"".join([trackpoint for trackpoint in splitTrackdata(data)
+                                 if isInTimeRange(trackpoint, startTime, endTime)])
+            trackdata.append(data)
+        return b"".join(trackdata)
+
+    def readFileData(self, member):
+        """
+        Restore the original TK file of a member.
+        
+        @param member: The L{TKArchiveMember}.
+        @return: The TK file content.
+        """
+        return zlib.decompress(self.readExtent(member.headerExtent)) + self.readTrackdata(member) + \
+            zlib.decompress(self.readExtent(member.footerExtent))
+
+    def readTKFile(self, member):
+        """
+        Restore a member as TK file object.
+        
+        @param member: The L{TKArchiveMember}.
+        @return: An object of TK1File, TK2File or TK3File; None if the member isn't a TK file.
+        """
+        data = self.readFileData(member)
+        fileClass = getTKFileClass(data[:FILEMARKERLEN])
+        if fileClass == None:
+            return None
+        tkFile = fileClass()
+        tkFile.read(io.BytesIO(data))
+        return tkFile
+
+    def close(self):
+        """
+        Close the archive file.
+        """
+        self.fileHandle.close()
+
+class TKArchiveWriter:
+    """
+    This class creates a TK archive or appends TK files to an existing one, see L{TKArchive}.
+    """
+
+    def __init__(self, fileName, compression = "zlib", append = False):
+        """
+        Constructor.
+        
+        @param fileName: The name of the archive file.
+        @param compression: The name of the block compression method, see L{ARCHIVE_COMPRESSIONS}.
+        @param append: True to append to an existing archive.
+        """
+        self.compression = ARCHIVE_COMPRESSIONS[compression]
+        if append and os.path.exists(fileName):
+            archive = TKArchive(fileName)
+            self.members = archive.getMembers()
+            offset = archive.directoryOffset
+            archive.close()
+            self.fileHandle = open(fileName, "r+b")
+            self.fileHandle.seek(offset)
+        else:
+            self.members = []
+            self.fileHandle = open(fileName, "wb")
+            self.fileHandle.write(ARCHIVE_MARKER)
+
+    def writeData(self, data):
+        """
+        Append data to the archive.
+        
+        @param data: The data.
+        @return: Tuple of offset and length.
+        """
+        offset = self.fileHandle.tell()
+        self.fileHandle.write(data)
+        return offset, len(data)
+
+    def addFile(self, name, data):
+        """
+        Add a TK file.
+        
+        @param name: The member name.
+        @param data: The content of the TK file.
+        @return: The L{TKArchiveMember}.
+        """
+        fileClass = getTKFileClass(data[:FILEMARKERLEN])
+        assert fileClass != None
+        start = fileClass.HEADERLEN
+        end = len(data)
+        if fileClass == TK1File:
+            end = struct.unpack('<I', data[0x008c:0x0090])[0]
+        end = start + (max(0, end - start) // Trackpoint.TRACKPOINTLEN) * Trackpoint.TRACKPOINTLEN
+        headerExtent = self.writeData(zlib.compress(data[:start], 9))
+        blocks = []
+        for blockStart in range(start, end, ARCHIVE_BLOCKSIZE * Trackpoint.TRACKPOINTLEN):
+            blockData = data[blockStart:min(end, blockStart + ARCHIVE_BLOCKSIZE * Trackpoint.TRACKPOINTLEN)]
+            block, firstTime, lastTime = encodeTrackdataBlock(blockData)
+            offset, length = self.writeData(compressBlock(block, self.compression))
+            blocks.append((firstTime, lastTime, offset, length, len(blockData) // Trackpoint.TRACKPOINTLEN,
+                           self.compression))
+        footerExtent = self.writeData(zlib.compress(data[end:], 9))
+        member = TKArchiveMember(name, headerExtent, footerExtent, blocks)
+        self.members.append(member)
+        return member
+
+    def close(self):
+        """
+        Write the directory and close the archive file.
+        """
+        directory = zlib.compress(b"".join([member.pack() for member in self.members]), 9)
+        offset, length = self.writeData(directory)
+        self.fileHandle.write(ARCHIVE_TRAILER.pack(offset, length, ARCHIVE_MARKER))
+        self.fileHandle.truncate()
+        self.fileHandle.close()
+
+def addFiles(archiveName, tkFileNames, compression, append):
+    """
+    Create an archive or append TK files to an existing archive.
+    
+    @param archiveName: The name of the archive file.
+    @param tkFileNames: The names of the TK files.
+    @param compression: The name of the block compression method.
+    @param append: True to append to an existing archive.
+    """
+    writer = TKArchiveWriter(archiveName, compression, append)
+    try:
+        names = set([member.getName() for member in writer.members])
+        for tkFileName in tkFileNames:
+            name = os.path.basename(tkFileName)
+            if name in names:
+                print("%s is already archived, skipped." % name)
+                continue
+            f = open(tkFileName, "rb")
+            data = f.read()
+            f.close()
+            if getTKFileClass(data[:FILEMARKERLEN]) == None:
+                print("%s is not a valid TK file!" % tkFileName)
+                continue
+            member = writer.addFile(name, data)
+            names.add(name)
+            print("Add %s (%i -> %i bytes)" % (name, len(data), member.getStoredSize()))
+    finally:
+        writer.close()
+
+def listFiles(archiveName):
+    """
+    Print the members of an archive.
+    
+    @param archiveName: The name of the archive file.
+    """
+    archive = TKArchive(archiveName)
+    try:
+        for member in archive.getMembers():
+            print("%-40s %8i trackpoints %10i bytes %5i blocks" % (member.getName(), member.getTrackpointCount(),
+                                                                   member.getStoredSize(), len(member.blocks)))
+    finally:
+        archive.close()
+
+def extractFiles(archiveName, patterns, outputDir):
+    """
+    Restore TK files from an archive.
+    
+    @param archiveName: The name of the archive file.
+    @param patterns: Shell patterns of the member names to extract; all members if empty.
+    @param outputDir: The output directory or None.
+    """
+    archive = TKArchive(archiveName)
+    try:
+        for member in archive.getMembers():
+            if patterns and not [pattern for pattern in patterns if fnmatch(member.getName(), pattern)]:
+                continue
+            fileName = member.getName()
+            if outputDir:
+                fileName = os.path.join(outputDir, fileName)
+            print("Create %s" % fileName)
+            f = open(fileName, "wb")
+            f.write(archive.readFileData(member))
+            f.close()
+    finally:
+        archive.close()
+
+def usage():
+    """
+    Print program usage.
+    """
+    executable = os.path.split(sys.argv[0])[1]
+    print("%s Version %s (C) 2026 The Wintec Tools contributors" % (executable, VERSION))
+    print("Store Wintec TK files in a compact archive and restore them.\n")
+    print("Usage: %s -c|-a [-z none|zlib|lzma] <archive> <tk files>" % executable)
+    print("       %s -x [-d outputdir] <archive> [member names]" % executable)
+    print("       %s -l <archive>" % executable)
+    print("-c: Create archive.")
+    print("-a: Append files to archive.")
+    print("-x: Extract files from archive; all files if no member names are given.")
+    print("-l: List archive contents.")
+    print("-z: Block compression (default: zlib).")
+    print("-d: Use output directory.")
+
+def main():
+    """
+    The main method.
+    """
+    # pylint: disable-msg=R0912
+    command = None
+    compression = "zlib"
+    outputDir = None
+
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], "?hcaxlz:d:")
+    except getopt.GetoptError:
+        # print help information and exit:
+        usage()
+        sys.exit(2)
+
+    for o, a in opts:
+        if o in ("-h", "-?"):
+            usage()
+            sys.exit()
+        if o in ("-c", "-a", "-x", "-l"):
+            command = o
+        if o == "-z":
+            compression = a
+            if compression not in ARCHIVE_COMPRESSIONS:
+                print("Unknown compression %s!" % compression)
+                sys.exit(5)
+        if o == "-d":
+            outputDir = a
+
+    if command == None or len(args) == 0 or (command in ("-c", "-a") and len(args) < 2):
+        usage()
+        sys.exit(1)
+
+    if outputDir and not os.path.exists(outputDir):
+        print("Output directory %s doesn't exist!" % outputDir)
+        sys.exit(3)
+
+    archiveName = args[0]
+    if command in ("-c", "-a"):
+        tkFileNames = []
+        for arg in args[1:]:
+            tkFileNames += sorted(glob(arg))
+        addFiles(archiveName, tkFileNames, compression, command == "-a")
+    elif not os.path.exists(archiveName):
+        print("Archive %s doesn't exist!" % archiveName)
+        sys.exit(3)
+    elif command == "-l":
+        listFiles(archiveName)
+    else:
+        extractFiles(archiveName, args[1:], outputDir)
+
+if __name__ == "__main__":
+    main()
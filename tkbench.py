@@ -0,0 +1,512 @@
+#################################################################################
+##
+## tkbench.py - Benchmark the Wintec tools with synthetic TK files.
+##
+## Copyright (c) 2026 The Wintec Tools contributors
+##
+#################################################################################
+##
+## This program is free software; you can redistribute it and/or modify
+## it under the terms of the GNU General Public License as published by
+## the Free Software Foundation; either version 2 of the License, or
+## (at your option) any later version.
+##
+## This program is distributed in the hope that it will be useful,
+## but WITHOUT ANY WARRANTY; without even the implied warranty of
+## MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+## GNU General Public License for more details.
+##
+## You should have received a copy of the GNU General Public License
+## along with this program; if not, write to the Free Software
+## Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA
+##
+#################################################################################
+## Requirements                                                                ##
+#################################################################################
+##
+## Python 3.10 or later:
+## <http://www.python.org>
+##
+#################################################################################
+## Program information:                                                        ##
+#################################################################################
+##
+## - Synthetic .tk1, .tk2 and .tk3 files are generated with several tracks,
+##   push log points, log version 1.0 or 2.0 and walking, cycling and
+##   driving motion.
+## - Parse, footer rebuild, split, GPX, NMEA and tkinfo are timed at several
+##   sizes; the throughput is reported in trackpoints per second together
+##   with the peak memory of the run.
+##
+#################################################################################
+## Support                                                                     ##
+#################################################################################
+##
+## The latest version of the wintec tools is available on Github
+## <https://github.com/BlinxFox/WintecTools>
+##
+## If you have bug reports, patches or some questions, please create an
+## issue on Github:
+## <https://github.com/BlinxFox/WintecTools>
+##
+#################################################################################
+
+"""
+Benchmark the Wintec tools with synthetic TK files.
+"""
+
+from contextlib import redirect_stdout
+import gc
+import getopt
+import importlib
+from math import cos, sin, pi, radians
+import multiprocessing
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from winteclib import VERSION, Trackpoint, TK1File, packTrackpoints, convertFromTimestamp, readTKFile
+from tk1split import splitTK1
+
+DEVICENAME = b"WBT-201 benchmark"
+""" The device name of the synthetic TK files. """
+
+DEVICEINFO = b"synthetic"
+""" The device information of the synthetic TK files. """
+
+DEVICESERIAL = b"00000000"
+""" The device serial number of the synthetic TK files. """
+
+START_TIMESTAMP = 1714550400
+""" The time of the first trackpoint (2024-05-01 08:00 UTC). """
+
+START_POSITION = (48.137, 11.575, 520.0)
+""" Latitude, longitude and altitude of the first trackpoint. """
+
+TRACK_GAP = 3600
+""" The seconds between two tracks. """
+
+MOTION_PROFILES = ((1.4, 1), (5.5, 2), (25.0, 5))
+""" Tupels of speed in m/s and trackpoint interval in seconds for walking, cycling and driving tracks. """
+
+PUSHPOINT_INTERVAL = 500
+""" The average number of trackpoints per push log point. """
+
+METERS_PER_DEGREE = 111320.0
+""" The length of one degree latitude in meters. """
+
+BENCHMARKS = ("parse", "footer", "split", "gpx", "nmea", "info")
+""" The benchmark names in the order of execution. """
+
+DEFAULT_SCALES = (10000, 100000)
+""" The default numbers of trackpoints of the generated .tk1 files. """
+
+DEFAULT_TRACKS = 5
+""" The default number of tracks per generated .tk1 file. """
+
+DEFAULT_REPEATS = 3
+""" The default number of timed runs per benchmark; the fastest run is reported. """
+
+PROC_STATUS = "/proc/self/status"
+""" The Linux status file of the process, containing the current and the peak resident set size. """
+
+PROC_CLEAR_REFS = "/proc/self/clear_refs"
+""" Writing 5 to this Linux file resets the peak resident set size of the process. """
+
+def generateTrackdata(trackpointCount, trackCount, logVersion, startTimestamp = START_TIMESTAMP, seed = 0):
+    """
+    Generate the trackdata of synthetic tracks.
+    
+    Every track follows one of the L{MOTION_PROFILES} with a slowly changing heading, speed and altitude. Log version
+    2.0 trackpoints carry slowly changing temperature and air pressure values.
+    
+    @param trackpointCount: The total number of trackpoints.
+    @param trackCount: The number of tracks.
+    @param logVersion: The log version, 1.0 or 2.0.
+    @param startTimestamp: The seconds since the epoch (UTC) of the first trackpoint.
+    @param seed: The seed of the random number generator; the same seed creates the same trackdata.
+    @return: The trackdata as array of bytes.
+    """
+    # pylint: disable-msg=R0914
+    rng = random.Random(seed)
+    types = []
+    dateTimeFields = []
+    latitudes = []
+    longitudes = []
+    altitudes = []
+    timestamp = startTimestamp
+    latitude, longitude, altitude = START_POSITION
+    temperature = 18.0
+    pressure = 955.0
+    for trackNumber in range(trackCount):
+        count = trackpointCount // trackCount + (trackNumber < trackpointCount % trackCount)
+        speed, interval = MOTION_PROFILES[trackNumber % len(MOTION_PROFILES)]
+        heading = rng.uniform(0, 2 * pi)
+        for index in range(count):
+            pointType = Trackpoint.TRACKSTART if index == 0 else 0
+            if rng.random() < 1.0 / PUSHPOINT_INTERVAL:
+                pointType |= Trackpoint.LOGPOINT
+            if logVersion == 2.0:
+                temperature += 0.001 * (18.0 - temperature) + rng.gauss(0, 0.05)
+                pressure += 0.001 * (955.0 - pressure) + rng.gauss(0, 0.1)
+                temperature = min(52.0, max(-10.0, temperature))
+                pressure = min(1100.0, max(589.0, pressure))
+                pointType |= int((temperature + 10) / 2) << 2 | int(pressure - 589) << 7
+            types.append(pointType)
+            dateTimeFields.append(convertFromTimestamp(timestamp))
+            latitudes.append(int(round(latitude * 10000000)))
+            longitudes.append(int(round(longitude * 10000000)))
+            altitudes.append(int(round(altitude)))
+            heading += rng.gauss(0, 0.1)
+            distance = speed * rng.uniform(0.8, 1.2) * interval
+            latitude += distance * cos(heading) / METERS_PER_DEGREE
+            longitude += distance * sin(heading) / (METERS_PER_DEGREE * cos(radians(latitude)))
+            altitude = max(-100.0, altitude + rng.gauss(0, 0.5))
+            timestamp += interval
+        timestamp += TRACK_GAP
+    return packTrackpoints(types, dateTimeFields, latitudes, longitudes, altitudes)
+
+def writeTKFile(tkFile, directory):
+    """
+    Write a TK file with its canonical name.
+    
+    @param tkFile: The L{TK1File}, L{TK2File} or L{TK3File}.
+    @param directory: The output directory.
+    @return: The name of the created file.
+    """
+    fileName = os.path.join(directory, tkFile.createFilename())
+    f = open(fileName, "wb")
+    tkFile.write(f)
+    f.close()
+    return fileName
+
+def generateFiles(directory, trackpointCount, trackCount, logVersion, startTimestamp = START_TIMESTAMP):
+    """
+    Generate a synthetic .tk1 file and the .tk2 and .tk3 files of its tracks.
+    
+    @param directory: The output directory.
+    @param trackpointCount: The total number of trackpoints.
+    @param trackCount: The number of tracks.
+    @param logVersion: The log version, 1.0 or 2.0.
+    @param startTimestamp: The seconds since the epoch (UTC) of the first trackpoint.
+    @return: Tupel of the .tk1 file name, the list of .tk2 file names and the list of .tk3 file names.
+    """
+    tk1File = TK1File()
+    tk1File.init(DEVICENAME, DEVICEINFO, DEVICESERIAL,
+                 generateTrackdata(trackpointCount, trackCount, logVersion, startTimestamp))
+    tk2Files, tk3Files = splitTK1(tk1File)
+    return writeTKFile(tk1File, directory), [writeTKFile(tkFile, directory) for tkFile in tk2Files], \
+        [writeTKFile(tkFile, directory) for tkFile in tk3Files]
+
+def parseFiles(fileNames):
+    """
+    Read TK files and decode time, position and altitude of every trackpoint.
+    
+    @param fileNames: The list of file names.
+    @return: The number of trackpoints.
+    """
+    count = 0
+    for fileName in fileNames:
+        for track in readTKFile(fileName).tracks():
+            for trackpoint in track.trackpoints():
+                trackpoint.getDateTime()
+                trackpoint.getLatitude()
+                trackpoint.getLongitude()
+                trackpoint.getAltitude()
+                count += 1
+    return count
+
+class PeakMemory:
+    """
+    This class measures the peak memory of a benchmark run.
+
+    On Linux the peak resident set size is reset before the run, the result is its growth during the run.
+    Elsewhere tracemalloc measures the peak of the memory allocated by Python, which slows down the run a lot.
+    The measurement is done in a new worker process, see L{measurePeakMemory()}, as memory retained by previous
+    runs would hide the growth.
+    """
+
+    def __init__(self):
+        """
+        Constructor.
+        """
+        self.procfs = os.path.exists(PROC_CLEAR_REFS)
+        self.baseline = 0
+
+    def readStatus(self, name):
+        """
+        Read a value of the process status file.
+        
+        @param name: The name of the value, e.g. VmRSS.
+        @return: The value in bytes.
+        """
+        f = open(PROC_STATUS)
+        try:
+            for line in f:
+                if line.startswith(name + ":"):
+                    return int(line.split()[1]) * 1024
+        finally:
+            f.close()
+        return 0
+
+    def start(self):
+        """
+        Start the measurement.
+        """
+        if self.procfs:
+            f = open(PROC_CLEAR_REFS, "w")
+            f.write("5")
+            f.close()
+            self.baseline = self.readStatus("VmRSS")
+        else:
+            tracemalloc.start()
+
+    def stop(self):
+        """
+        Stop the measurement.
+        
+        @return: The peak memory in bytes.
+        """
+        if self.procfs:
+            return max(0, self.readStatus("VmHWM") - self.baseline)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return peak
+
+def runTool(tool, arguments):
+    """
+    Run the main method of a tool with the arguments, discarding its output.
+    
+    @param tool: The module name of the tool.
+    @param arguments: The list of command line arguments.
+    @return: True if the tool succeeded; False otherwise.
+    """
+    module = importlib.import_module(tool)
+    argv = sys.argv
+    sys.argv = [tool + ".py"] + arguments
+    try:
+        with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+            module.main()
+    except SystemExit as exit:
+        return not exit.code
+    finally:
+        sys.argv = argv
+    return True
+
+def runBenchmark(benchmark, files, outputDir):
+    """
+    Run a single benchmark.
+    
+    @param benchmark: The benchmark name, see L{BENCHMARKS}.
+    @param files: Tupel of .tk1 file name, .tk2 file names and .tk3 file names, see L{generateFiles()}.
+    @param outputDir: The empty output directory.
+    @return: True if the benchmark succeeded; False otherwise.
+    """
+    tk1FileName, tk2FileNames, tk3FileNames = files
+    if benchmark == "parse":
+        return parseFiles([tk1FileName] + tk2FileNames + tk3FileNames) > 0
+    if benchmark == "footer":
+        return runTool("tk1totk1", ["-d", outputDir, tk1FileName])
+    if benchmark == "split":
+        return runTool("tk1split", ["--force", "-d", outputDir, tk1FileName])
+    if benchmark == "gpx":
+        return runTool("tktogpx", ["--force", "-d", outputDir, tk1FileName])
+    if benchmark == "nmea":
+        return runTool("tktonmea", ["--force", "-d", outputDir, tk1FileName])
+    return runTool("tkinfo", [tk1FileName])
+
+def measurePeakMemory(benchmark, files, outputDir):
+    """
+    Run a single benchmark and measure its peak memory, see L{PeakMemory}.
+    
+    @param benchmark: The benchmark name, see L{BENCHMARKS}.
+    @param files: Tupel of .tk1 file name, .tk2 file names and .tk3 file names, see L{generateFiles()}.
+    @param outputDir: The empty output directory.
+    @return: Tupel of True if the benchmark succeeded (False otherwise) and the peak memory in bytes.
+    """
+    memory = PeakMemory()
+    memory.start()
+    succeeded = runBenchmark(benchmark, files, outputDir)
+    return succeeded, memory.stop()
+
+def getTrackpointCount(benchmark, files):
+    """
+    Get the number of trackpoints processed by a benchmark.
+    
+    @param benchmark: The benchmark name, see L{BENCHMARKS}.
+    @param files: Tupel of .tk1 file name, .tk2 file names and .tk3 file names, see L{generateFiles()}.
+    @return: The number of trackpoints.
+    """
+    tk1FileName, tk2FileNames, tk3FileNames = files
+    fileNames = [tk1FileName] + tk2FileNames + tk3FileNames if benchmark == "parse" else [tk1FileName]
+    return sum(readTKFile(fileName).getTrackpointCount() for fileName in fileNames)
+
+def measure(benchmark, files, workDir, repeats, pool):
+    """
+    Time a benchmark and measure its peak memory.
+    
+    Every run writes into a new output directory. The peak memory is measured in an extra run in a new worker
+    process of the pool, see L{measurePeakMemory()}.
+    
+    @param benchmark: The benchmark name, see L{BENCHMARKS}.
+    @param files: Tupel of .tk1 file name, .tk2 file names and .tk3 file names, see L{generateFiles()}.
+    @param workDir: The directory for the output directories.
+    @param repeats: The number of timed runs.
+    @param pool: The process pool replacing its worker after every task or None to skip the memory measurement.
+    @return: Tupel of the time of the fastest run in seconds and the peak memory in bytes (None if not measured);
+             None if the benchmark failed.
+    """
+    times = []
+    peak = None
+    for run in range(repeats + (pool != None)):
+        outputDir = tempfile.mkdtemp(dir = workDir)
+        try:
+            if run == repeats:
+                succeeded, peak = pool.apply(measurePeakMemory, (benchmark, files, outputDir))
+            else:
+                gc.collect()
+                startTime = time.perf_counter()
+                succeeded = runBenchmark(benchmark, files, outputDir)
+                times.append(time.perf_counter() - startTime)
+        finally:
+            shutil.rmtree(outputDir)
+        if not succeeded:
+            return None
+    return min(times), peak
+
+def parseList(value, convert):
+    """
+    Parse a comma separated option value.
+    
+    @param value: The option value.
+    @param convert: The conversion function for each item.
+    @return: The list of converted items; None if an item is invalid.
+    """
+    try:
+        return [convert(item) for item in value.split(",")]
+    except ValueError:
+        return None
+
+def usage():
+    """
+    Print program usage.
+    """
+    executable = os.path.split(sys.argv[0])[1]
+    print("%s Version %s (C) 2026 The Wintec Tools contributors" % (executable, VERSION))
+    print("Benchmark the Wintec tools with synthetic TK files.\n")
+    print("Usage: %s [-s points,...] [-t tracks] [-l 1|2] [-r repeats] [-b benchmark,...] [--no-memory]"
+          % executable)
+    print("       %s -g directory [-s points,...] [-t tracks] [-l 1|2]" % executable)
+    print("-s: Numbers of trackpoints of the generated .tk1 files (default: %s)."
+          % ",".join(str(scale) for scale in DEFAULT_SCALES))
+    print("-t: Number of tracks per .tk1 file (default: %i)." % DEFAULT_TRACKS)
+    print("-l: Log version of the generated files (default: both).")
+    print("-r: Number of timed runs per benchmark; the fastest is reported (default: %i)." % DEFAULT_REPEATS)
+    print("-b: Benchmarks to run (default: %s)." % ",".join(BENCHMARKS))
+    print("--no-memory: Don't measure the peak memory.")
+    print("-g: Only generate the .tk1, .tk2 and .tk3 files into the directory.")
+
+def main():
+    """
+    The main method.
+    """
+    # pylint: disable-msg=R0912,R0914,R0915
+    scales = DEFAULT_SCALES
+    trackCount = DEFAULT_TRACKS
+    logVersions = (1.0, 2.0)
+    repeats = DEFAULT_REPEATS
+    benchmarks = BENCHMARKS
+    memory = True
+    generateDir = None
+
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], "?hs:t:l:r:b:g:", ["no-memory"])
+    except getopt.GetoptError:
+        # print help information and exit:
+        usage()
+        sys.exit(2)
+
+    if len(args) > 0:
+        usage()
+        sys.exit(1)
+
+    for o, a in opts:
+        if o in ("-h", "-?"):
+            usage()
+            sys.exit()
+        if o == "-s":
+            scales = parseList(a, int)
+            if scales == None or min(scales) < 1:
+                print("The numbers of trackpoints must be positive integers!")
+                sys.exit(5)
+        if o == "-t":
+            trackCount = int(a)
+            if trackCount < 1:
+                print("The number of tracks must be at least 1!")
+                sys.exit(5)
+        if o == "-l":
+            if a not in ("1", "2"):
+                print("The log version must be 1 or 2!")
+                sys.exit(5)
+            logVersions = (float(a),)
+        if o == "-r":
+            repeats = int(a)
+            if repeats < 1:
+                print("The number of runs must be at least 1!")
+                sys.exit(5)
+        if o == "-b":
+            benchmarks = parseList(a, str)
+            for benchmark in benchmarks:
+                if benchmark not in BENCHMARKS:
+                    print("Unknown benchmark %s!" % benchmark)
+                    sys.exit(5)
+        if o == "--no-memory":
+            memory = False
+        if o == "-g":
+            generateDir = a
+
+    if generateDir:
+        if not os.path.exists(generateDir):
+            print("Output directory %s doesn't exist!" % generateDir)
+            sys.exit(3)
+        # Every file set starts on a new day, so the canonical file names don't collide.
+        day = 0
+        for scale in scales:
+            for logVersion in logVersions:
+                tk1FileName, tk2FileNames, tk3FileNames = generateFiles(generateDir, scale, trackCount, logVersion,
+                                                                        START_TIMESTAMP + day * 86400)
+                print("Create %s (%i .tk2 and %i .tk3 files)" % (tk1FileName, len(tk2FileNames), len(tk3FileNames)))
+                day += (scale * MOTION_PROFILES[-1][1] + trackCount * TRACK_GAP) // 86400 + 1
+        return
+
+    print("Python %s, %i timed runs per benchmark" % (sys.version.split()[0], repeats))
+    print("%-9s %9s %7s %9s %12s %9s" % ("benchmark", "points", "version", "seconds", "points/s", "peak MiB"))
+    workDir = tempfile.mkdtemp(prefix = "tkbench")
+    pool = multiprocessing.get_context("spawn").Pool(1, maxtasksperchild = 1) if memory else None
+    try:
+        for scale in scales:
+            for logVersion in logVersions:
+                filesDir = tempfile.mkdtemp(dir = workDir)
+                files = generateFiles(filesDir, scale, trackCount, logVersion)
+                for benchmark in benchmarks:
+                    result = measure(benchmark, files, workDir, repeats, pool)
+                    if result == None:
+                        print("Benchmark %s failed!" % benchmark)
+                        sys.exit(6)
+                    seconds, peak = result
+                    count = getTrackpointCount(benchmark, files)
+                    print("%-9s %9i %7.1f %9.4f %12.0f %9s" % (benchmark, count, logVersion, seconds, count / seconds,
+                                                              "-" if peak == None else "%.1f" % (peak / 1048576.0)))
+                    sys.stdout.flush()
+                shutil.rmtree(filesDir)
+    finally:
+        if pool != None:
+            pool.terminate()
+        shutil.rmtree(workDir, ignore_errors = True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,478 @@
+#################################################################################
+##
+## tkgeotag.py - Geotag photos with the positions of Wintec TK file tracklogs.
+##
+## Copyright (c) 2026 The Wintec Tools contributors
+##
+#################################################################################
+##
+## This program is free software; you can redistribute it and/or modify
+## it under the terms of the GNU General Public License as published by
+## the Free Software Foundation; either version 2 of the License, or
+## (at your option) any later version.
+##
+## This program is distributed in the hope that it will be useful,
+## but WITHOUT ANY WARRANTY; without even the implied warranty of
+## MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+## GNU General Public License for more details.
+##
+## You should have received a copy of the GNU General Public License
+## along with this program; if not, write to the Free Software
+## Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA
+##
+#################################################################################
+## Requirements                                                                ##
+#################################################################################
+##
+## Python 3.10 or later:
+## <http://www.python.org>
+##
+#################################################################################
+## Program information:                                                        ##
+#################################################################################
+##
+## - The photo time is read from the EXIF DateTimeOriginal tag of JPEG files.
+## - The camera clock is assumed to run in local time. Use -t or --autotz to
+##   set the timezone and --offset to correct a camera clock drift.
+## - The positions are written to a CSV file and optionally into the EXIF
+##   GPS tags of the photos.
+##
+#################################################################################
+## Support                                                                     ##
+#################################################################################
+##
+## The latest version of the wintec tools is available on Github
+## <https://github.com/BlinxFox/WintecTools>
+##
+## If you have bug reports, patches or some questions, please create an
+## issue on Github:
+## <https://github.com/BlinxFox/WintecTools>
+##
+#################################################################################
+
+"""
+Geotag photos with the positions of Wintec TK file tracklogs.
+"""
+
+from bisect import bisect_right
+from calendar import timegm
+import csv
+import getopt
+from glob import glob
+from itertools import accumulate
+from math import isnan
+import os
+from pytz import utc
+import struct
+import sys
+import time
+
+from winteclib import VERSION, readTKFile, parseTimezone, determineTimezone, globTKFiles
+
+EXIF_MARKER = b'Exif\x00\x00'
+""" The identification marker at the beginning of the EXIF APP1 segment. """
+
+EXIF_HEADER_READ_SIZE = 128 * 1024
+""" The number of bytes read from the beginning of a photo to find the EXIF DateTimeOriginal tag. """
+
+EXIF_DATETIME_FORMAT = "%Y:%m:%d %H:%M:%S"
+""" The strptime format string of EXIF date/time tags. """
+
+TAG_DATETIME = 0x0132
+TAG_EXIF_IFD = 0x8769
+TAG_GPS_IFD = 0x8825
+TAG_DATETIME_ORIGINAL = 0x9003
+
+TYPE_BYTE = 1
+TYPE_ASCII = 2
+TYPE_LONG = 4
+TYPE_RATIONAL = 5
+
+DEFAULT_MAXGAP = 300
+""" The default maximum time in seconds between two trackpoints to interpolate a position between them. """
+
+CSV_COLUMNS = ["photo", "time", "latitude", "longitude", "altitude"]
+""" The header line of the CSV output. """
+
+def findExifSegment(data):
+    """
+    Find the EXIF APP1 segment in JPEG data.
+
+    @param data: The JPEG data (at least the beginning of the file).
+    @return: Tupel of segment start, segment end and start of the TIFF structure; None if no EXIF segment found.
+    """
+    if data[:2] != b'\xff\xd8':
+        return None
+    pos = 2
+    while pos + 4 <= len(data):
+        if data[pos] != 0xff:
+            return None
+        marker = data[pos + 1]
+        if marker == 0xda or marker == 0xd9:
+            # Start of scan or end of image: no more metadata segments.
+            return None
+        length = struct.unpack('>H', data[pos + 2:pos + 4])[0]
+        if marker == 0xe1 and data[pos + 4:pos + 10] == EXIF_MARKER:
+            return pos, pos + 2 + length, pos + 10
+        pos += 2 + length
+    return None
+
+def readIfd(tiff, offset, byteOrder):
+    """
+    Read the entries of an image file directory.
+
+    @param tiff: The TIFF structure of the EXIF segment.
+    @param offset: The offset of the IFD in the TIFF structure.
+    @param byteOrder: The struct byte order character.
+    @return: Tupel of a dictionary tag -> (type, count, raw value field) and the offset of the next IFD.
+    """
+    count = struct.unpack(byteOrder + 'H', tiff[offset:offset + 2])[0]
+    entries = {}
+    for entryStart in range(offset + 2, offset + 2 + count * 12, 12):
+        tag, fieldType, valueCount = struct.unpack(byteOrder + 'HHI', tiff[entryStart:entryStart + 8])
+        entries[tag] = (fieldType, valueCount, tiff[entryStart + 8:entryStart + 12])
+    nextStart = offset + 2 + count * 12
+    nextIfd = struct.unpack(byteOrder + 'I', tiff[nextStart:nextStart + 4])[0]
+    return entries, nextIfd
+
+def readAscii(tiff, entry, byteOrder):
+    """
+    Read the value of an ASCII IFD entry.
+
+    @param tiff: The TIFF structure of the EXIF segment.
+    @param entry: The IFD entry as returned by L{readIfd()}.
+    @param byteOrder: The struct byte order character.
+    @return: The value as string.
+    """
+    _, valueCount, value = entry
+    if valueCount > 4:
+        offset = struct.unpack(byteOrder + 'I', value)[0]
+        value = tiff[offset:offset + valueCount]
+    return value[:valueCount].split(b'\x00')[0].decode('ascii', 'replace')
+
+def readExifDateTime(fileName):
+    """
+    Read the date and time a photo was taken from the EXIF data of a JPEG file.
+
+    The DateTimeOriginal tag is preferred; the DateTime tag of the main image is used as fallback.
+
+    @param fileName: The name of the JPEG file.
+    @return: The camera date and time as string in EXIF format; None if not available.
+    """
+    f = open(fileName, "rb")
+    data = f.read(EXIF_HEADER_READ_SIZE)
+    f.close()
+    segment = findExifSegment(data)
+    if segment == None:
+        return None
+    _, segmentEnd, tiffStart = segment
+    tiff = data[tiffStart:segmentEnd]
+    byteOrder = '<' if tiff[:2] == b'II' else '>'
+    try:
+        ifd0, _ = readIfd(tiff, struct.unpack(byteOrder + 'I', tiff[4:8])[0], byteOrder)
+        if TAG_EXIF_IFD in ifd0:
+            exifIfd, _ = readIfd(tiff, struct.unpack(byteOrder + 'I', ifd0[TAG_EXIF_IFD][2])[0], byteOrder)
+            if TAG_DATETIME_ORIGINAL in exifIfd:
+                return readAscii(tiff, exifIfd[TAG_DATETIME_ORIGINAL], byteOrder)
+        if TAG_DATETIME in ifd0:
+            return readAscii(tiff, ifd0[TAG_DATETIME], byteOrder)
+    except struct.error:
+        # Truncated or corrupt EXIF data.
+        pass
+    return None
+
+def toRational(value, denominator):
+    """
+    Convert a non negative number into an EXIF rational.
+
+    @param value: The number.
+    @param denominator: The denominator of the rational.
+    @return: Tupel of numerator and denominator.
+    """
+    return int(round(value * denominator)), denominator
+
+def createGpsIfd(latitude, longitude, altitude, timestamp, offset, byteOrder):
+    """
+    Create a GPS image file directory.
+
+    @param latitude: The latitude in decimal degrees.
+    @param longitude: The longitude in decimal degrees.
+    @param altitude: The altitude in meters.
+    @param timestamp: The UTC time of the photo as seconds since the epoch.
+    @param offset: The offset of the created IFD in the TIFF structure.
+    @param byteOrder: The struct byte order character.
+    @return: The GPS IFD as array of bytes.
+    """
+    # pylint: disable-msg=R0914
+    utcTime = time.gmtime(timestamp)
+    latDegrees, latMinutes = divmod(abs(latitude) * 60, 60)
+    lonDegrees, lonMinutes = divmod(abs(longitude) * 60, 60)
+    fields = [(0x0000, TYPE_BYTE, 4, bytes([2, 3, 0, 0])),
+              (0x0001, TYPE_ASCII, 2, b'N\x00' if latitude >= 0 else b'S\x00'),
+              (0x0002, TYPE_RATIONAL, 3, struct.pack(byteOrder + 'IIIIII', int(latDegrees), 1,
+                                                     *toRational(latMinutes, 1000000) + (0, 1))),
+              (0x0003, TYPE_ASCII, 2, b'E\x00' if longitude >= 0 else b'W\x00'),
+              (0x0004, TYPE_RATIONAL, 3, struct.pack(byteOrder + 'IIIIII', int(lonDegrees), 1,
+                                                     *toRational(lonMinutes, 1000000) + (0, 1))),
+              (0x0005, TYPE_BYTE, 1, bytes([0 if altitude >= 0 else 1])),
+              (0x0006, TYPE_RATIONAL, 1, struct.pack(byteOrder + 'II', *toRational(abs(altitude), 10))),
+              (0x0007, TYPE_RATIONAL, 3, struct.pack(byteOrder + 'IIIIII', utcTime.tm_hour, 1, utcTime.tm_min, 1,
+                                                     utcTime.tm_sec, 1)),
+              (0x001d, TYPE_ASCII, 11, time.strftime("%Y:%m:%d", utcTime).encode("ascii") + b'\x00')]
+    entries = b''
+    values = b''
+    valuesStart = offset + 2 + len(fields) * 12 + 4
+    for tag, fieldType, valueCount, value in fields:
+        entries += struct.pack(byteOrder + 'HHI', tag, fieldType, valueCount)
+        if len(value) <= 4:
+            entries += value + bytes(4 - len(value))
+        else:
+            entries += struct.pack(byteOrder + 'I', valuesStart + len(values))
+            values += value
+    return struct.pack(byteOrder + 'H', len(fields)) + entries + struct.pack(byteOrder + 'I', 0) + values
+
+def writeExifGps(fileName, latitude, longitude, altitude, timestamp):
+    """
+    Write the GPS position into the EXIF data of a JPEG file.
+
+    The existing EXIF data is not moved: a new GPS IFD and a copy of IFD0 with the GPS IFD pointer are appended to
+    the TIFF structure, so all offsets of the existing tags (including maker notes) stay valid.
+
+    @param fileName: The name of the JPEG file.
+    @param latitude: The latitude in decimal degrees.
+    @param longitude: The longitude in decimal degrees.
+    @param altitude: The altitude in meters.
+    @param timestamp: The UTC time of the photo as seconds since the epoch.
+    @return: True if the GPS tags were written; False if the file has no usable EXIF segment.
+    """
+    f = open(fileName, "rb")
+    data = f.read()
+    f.close()
+    segment = findExifSegment(data)
+    if segment == None:
+        return False
+    segmentStart, segmentEnd, tiffStart = segment
+    tiff = data[tiffStart:segmentEnd]
+    byteOrder = '<' if tiff[:2] == b'II' else '>'
+    ifd0, nextIfd = readIfd(tiff, struct.unpack(byteOrder + 'I', tiff[4:8])[0], byteOrder)
+    if len(tiff) % 2:
+        tiff += b'\x00'
+    gpsIfd = createGpsIfd(latitude, longitude, altitude, timestamp, len(tiff), byteOrder)
+    if len(gpsIfd) % 2:
+        gpsIfd += b'\x00'
+    ifd0Offset = len(tiff) + len(gpsIfd)
+    ifd0[TAG_GPS_IFD] = (TYPE_LONG, 1, struct.pack(byteOrder + 'I', len(tiff)))
+    newIfd0 = struct.pack(byteOrder + 'H', len(ifd0))
+    for tag in sorted(ifd0.keys()):
+        fieldType, valueCount, value = ifd0[tag]
+        newIfd0 += struct.pack(byteOrder + 'HHI', tag, fieldType, valueCount) + value
+    newIfd0 += struct.pack(byteOrder + 'I', nextIfd)
+    tiff = tiff[:4] + struct.pack(byteOrder + 'I', ifd0Offset) + tiff[8:] + gpsIfd + newIfd0
+    segmentLength = 2 + len(EXIF_MARKER) + len(tiff)
+    if segmentLength > 0xffff:
+        return False
+    data = data[:segmentStart] + b'\xff\xe1' + struct.pack('>H', segmentLength) + EXIF_MARKER + tiff + \
+           data[segmentEnd:]
+    f = open(fileName, "wb")
+    f.write(data)
+    f.close()
+    return True
+
+def convertCameraTime(cameraTime, timezone, cameraOffset):
+    """
+    Convert the camera date and time into UTC.
+
+    @param cameraTime: The camera date and time as string in EXIF format.
+    @param timezone: The timezone of the camera clock.
+    @param cameraOffset: The camera clock error in seconds (camera time minus GPS time).
+    @return: The UTC time as seconds since the epoch.
+    """
+    localTimestamp = timegm(time.strptime(cameraTime, EXIF_DATETIME_FORMAT))
+    return localTimestamp - int(timezone.utcoffset(None).total_seconds()) - cameraOffset
+
+def locatePhotos(tkfiles, photoTimes, maxGap = DEFAULT_MAXGAP):
+    """
+    Determine the positions for a batch of photo times.
+
+    The candidate tracks of every photo time are the tracks whose time range contains it, found by a binary
+    search over the track start times. As tracks may overlap, earlier tracks are searched as long as the latest
+    end time of the tracks up to them isn't before the photo time. The positions are interpolated with one
+    L{Track.interpolate()} call per track, starting with the latest-starting candidate; photo times within a
+    logging pause of that track are tried with the next candidate. No position is returned for photo times
+    outside of all tracks or within a logging pause longer than maxGap seconds of all candidate tracks.
+
+    @param tkfiles: A list of TK files with track data.
+    @param photoTimes: The UTC photo times as seconds since the epoch.
+    @param maxGap: The maximum time in seconds between two trackpoints to interpolate between them.
+    @return: A list with a tupel of latitude, longitude and altitude or None for every photo time.
+    """
+    tracks = []
+    for tkfile in tkfiles:
+        for track in tkfile.tracks():
+            if track.getTrackPointCount() > 0:
+                tracks.append(track)
+    tracks.sort(key=lambda track: track.getColumns().timestamps[0])
+    trackStarts = [track.getColumns().timestamps[0] for track in tracks]
+    trackEnds = [track.getColumns().timestamps[-1] for track in tracks]
+    latestEnds = list(accumulate(trackEnds, max))
+
+    # Map of photo number and the list of its candidate track numbers, the latest-starting track first.
+    candidates = {}
+    for photoNumber, photoTime in enumerate(photoTimes):
+        trackNumber = bisect_right(trackStarts, photoTime) - 1
+        while trackNumber >= 0 and latestEnds[trackNumber] >= photoTime:
+            if trackEnds[trackNumber] >= photoTime:
+                candidates.setdefault(photoNumber, []).append(trackNumber)
+            trackNumber -= 1
+
+    results = [None] * len(photoTimes)
+    while candidates:
+        queries = {}
+        for photoNumber, trackNumbers in candidates.items():
+            queries.setdefault(trackNumbers.pop(0), []).append(photoNumber)
+        for trackNumber, photoNumbers in queries.items():
+            latitudes, longitudes, altitudes, _, _ = tracks[trackNumber].interpolate([photoTimes[photoNumber]
+                                                                                     for photoNumber in photoNumbers],
+                                                                                    maxGap)
+            for photoNumber, latitude, longitude, altitude in zip(photoNumbers, latitudes, longitudes, altitudes):
+                if not isnan(latitude):
+                    results[photoNumber] = (latitude, longitude, altitude)
+        candidates = dict([(photoNumber, trackNumbers) for photoNumber, trackNumbers in candidates.items()
+                           if trackNumbers and results[photoNumber] == None])
+    return results
+
+def writeCsv(outputFile, photos, photoTimes, positions):
+    """
+    Write the photo positions as CSV.
+
+    @param outputFile: The file to write to.
+    @param photos: The photo file names.
+    @param photoTimes: The UTC photo times as seconds since the epoch.
+    @param positions: The positions returned by L{locatePhotos()}.
+    """
+    writer = csv.writer(outputFile, lineterminator="\n")
+    writer.writerow(CSV_COLUMNS)
+    for photo, photoTime, position in zip(photos, photoTimes, positions):
+        timeString = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(photoTime))
+        if position == None:
+            writer.writerow([photo, timeString, "", "", ""])
+        else:
+            writer.writerow([photo, timeString, "%.7f" % position[0], "%.7f" % position[1], "%i" % position[2]])
+
+def usage():
+    """
+    Print program usage.
+    """
+    executable = os.path.split(sys.argv[0])[1]
+    print("%s Version %s (C) 2026 The Wintec Tools contributors" % (executable, VERSION))
+    print("Geotag photos with the positions of Wintec TK file tracklogs.\n")
+    print("Usage: %s -p <photos> [-o filename] [-t +hh:mm|--autotz] [--offset seconds] [--maxgap seconds]"
+          % executable)
+    print("[--exif] <tk files>")
+    print("-p: Photo files (JPEG), can be used multiple times.")
+    print("-o: Write positions to CSV file (default: standard output).")
+    print("-t: Timezone of the camera clock (offset to UTC).")
+    print("--autotz: Determine timezone of the camera clock from first trackpoint.")
+    print("--offset: Camera clock error in seconds (camera time minus GPS time).")
+    print("--maxgap: Maximum time in seconds between trackpoints to interpolate (default: %i)." % DEFAULT_MAXGAP)
+    print("--exif: Write the positions into the EXIF GPS tags of the photos.")
+
+def main():
+    """
+    The main method.
+    """
+    # pylint: disable-msg=R0912,R0914,R0915
+    photoPatterns = []
+    filename = None
+    timezone = None
+    autotimezone = False
+    cameraOffset = 0
+    maxGap = DEFAULT_MAXGAP
+    writeExif = False
+
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], "?hp:o:t:", ["autotz", "offset=", "maxgap=", "exif"])
+    except getopt.GetoptError:
+        # print help information and exit:
+        usage()
+        sys.exit(2)
+    if len(args) == 0:
+        usage()
+        sys.exit(1)
+
+    for o, a in opts:
+        if o in ("-h", "-?"):
+            usage()
+            sys.exit()
+        if o == "-p":
+            photoPatterns.append(a)
+        if o == "-o":
+            filename = a
+        if o == "-t":
+            timezone = parseTimezone(a)
+            if timezone == None:
+                print("Timzone string doesn't match pattern +hh:mm!")
+                sys.exit(4)
+        if o == "--autotz":
+            autotimezone = True
+        if o == "--offset":
+            cameraOffset = int(a)
+        if o == "--maxgap":
+            maxGap = int(a)
+        if o == "--exif":
+            writeExif = True
+
+    if len(photoPatterns) == 0:
+        usage()
+        sys.exit(1)
+
+    tkfiles = []
+    for arg in args:
+        for tkFileName in globTKFiles(arg):
+            tkfile = readTKFile(tkFileName)
+            if tkfile != None:
+                tkfiles.append(tkfile)
+    if len(tkfiles) == 0:
+        print("No TK files found!")
+        sys.exit(3)
+    tkfiles.sort(key=lambda x: x.getFirstTrackpoint().getDateTimeField())
+
+    if autotimezone:
+        timezone = determineTimezone(tkfiles[0].getFirstTrackpoint())
+    elif timezone == None:
+        timezone = utc
+
+    photos = []
+    photoTimes = []
+    for pattern in photoPatterns:
+        for photo in sorted(glob(pattern)):
+            cameraTime = readExifDateTime(photo)
+            if cameraTime == None:
+                print("%s has no EXIF date/time, skipped." % photo, file=sys.stderr)
+                continue
+            photos.append(photo)
+            photoTimes.append(convertCameraTime(cameraTime, timezone, cameraOffset))
+
+    positions = locatePhotos(tkfiles, photoTimes, maxGap)
+
+    if filename:
+        print("Create %s" % filename)
+        outputFile = open(filename, "w", newline="")
+    else:
+        outputFile = sys.stdout
+    try:
+        writeCsv(outputFile, photos, photoTimes, positions)
+    finally:
+        if outputFile != sys.stdout:
+            outputFile.close()
+
+    if writeExif:
+        for photo, photoTime, position in zip(photos, photoTimes, positions):
+            if position != None and not writeExifGps(photo, position[0], position[1], position[2], photoTime):
+                print("Can't write EXIF GPS tags to %s!" % photo, file=sys.stderr)
+
+    located = len([position for position in positions if position != None])
+    print("Located %i of %i photos." % (located, len(photos)), file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,370 @@
+#################################################################################
+##
+## tkheatmap.py - Create trackpoint density heatmaps from Wintec TK files.
+##
+## Copyright (c) 2026 The Wintec Tools contributors
+##
+#################################################################################
+##
+## This program is free software; you can redistribute it and/or modify
+## it under the terms of the GNU General Public License as published by
+## the Free Software Foundation; either version 2 of the License, or
+## (at your option) any later version.
+##
+## This program is distributed in the hope that it will be useful,
+## but WITHOUT ANY WARRANTY; without even the implied warranty of
+## MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+## GNU General Public License for more details.
+##
+## You should have received a copy of the GNU General Public License
+## along with this program; if not, write to the Free Software
+## Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA
+##
+#################################################################################
+## Requirements                                                                ##
+#################################################################################
+##
+## Python 3.10 or later:
+## <http://www.python.org>
+##
+#################################################################################
+## Program information:                                                        ##
+#################################################################################
+##
+## - The trackpoints are counted in the cells of a Web Mercator or lat/lon
+##   grid, track by track, so the memory usage only depends on the grid size.
+## - PNG output uses a logarithmic color scale with transparent empty cells,
+##   raw output contains the counts as 32 bit integers with an ENVI header.
+##   Both get a world file for GIS tools.
+## - Monthly heatmaps: use the monthly pack files of tkpack.py as input.
+##
+#################################################################################
+## Support                                                                     ##
+#################################################################################
+##
+## The latest version of the wintec tools is available on Github
+## <https://github.com/BlinxFox/WintecTools>
+##
+## If you have bug reports, patches or some questions, please create an
+## issue on Github:
+## <https://github.com/BlinxFox/WintecTools>
+##
+#################################################################################
+
+"""
+Create trackpoint density heatmaps from Wintec TK files.
+"""
+
+from array import array
+from collections import Counter
+import getopt
+from math import log, pi
+import multiprocessing
+import os
+import struct
+import sys
+import zlib
+
+from winteclib import VERSION, MERCATOR_MAXLATITUDE, TKFileReference, globTKFiles, projectToMercator
+
+HEATMAP_PROJECTIONS = ("latlon", "mercator")
+""" The grid projections of L{HeatmapGrid}: geographic coordinates or Web Mercator. """
+
+MERCATOR_RADIUS = 6378137.0
+""" The earth radius of the Web Mercator projection (EPSG:3857) in metres. """
+
+class HeatmapGrid:
+    """
+    This class counts trackpoints in the cells of a raster grid.
+    
+    The cells of the trackpoints of a track are computed in one list comprehension and counted by a Counter, like a
+    bincount. The counts of a track or a file are merged into the grid afterwards, so the memory usage only
+    depends on the grid size and not on the number of trackpoints.
+    """
+
+    def __init__(self, bounds, width, height = None, projection = "mercator"):
+        """
+        Constructor.
+        
+        @param bounds: Tupel of minimum longitude, minimum latitude, maximum longitude and maximum latitude in degrees.
+        @param width: The number of columns.
+        @param height: The number of rows; None to derive it from the aspect ratio of the projected bounds.
+        @param projection: The grid projection, see L{HEATMAP_PROJECTIONS}.
+        """
+        self.bounds = bounds
+        self.projection = projection
+        minLongitude, minLatitude, maxLongitude, maxLatitude = [int(round(value * 10000000)) for value in bounds]
+        if projection == "mercator":
+            (self.left, self.right), (self.top, self.bottom) = projectToMercator((maxLatitude, minLatitude),
+                                                                                 (minLongitude, maxLongitude))
+        else:
+            self.left, self.right, self.top, self.bottom = minLongitude, maxLongitude, maxLatitude, minLatitude
+        if height == None:
+            height = max(1, int(round(width * abs(self.bottom - self.top) / (self.right - self.left))))
+        self.width = width
+        self.height = height
+        self.scaleX = width / float(self.right - self.left)
+        self.scaleY = height / float(self.bottom - self.top)
+        self.counts = None
+
+    def countCells(self, latitudes, longitudes):
+        """
+        Count the trackpoints per grid cell.
+        
+        @param latitudes: The latitudes scaled by 1e7, e.g. L{TrackColumns.latitudes}.
+        @param longitudes: The longitudes scaled by 1e7.
+        @return: A Counter of cell numbers (row * width + column) and trackpoint counts; points outside of the grid
+                 are ignored.
+        """
+        if self.projection == "mercator":
+            xs, ys = projectToMercator(latitudes, longitudes)
+        else:
+            xs, ys = longitudes, latitudes
+        left, top, scaleX, scaleY, width, height = (self.left, self.top, self.scaleX, self.scaleY, self.width,
+                                                    self.height)
+        columns = [(x - left) * scaleX for x in xs]
+        rows = [(y - top) * scaleY for y in ys]
+        return Counter([int(row) * width + int(column) for column, row in zip(columns, rows)
+                        if 0 <= column < width and 0 <= row < height])
+
+    def addCounts(self, counts):
+        """
+        Add cell counts to the grid.
+        
+        @param counts: A Counter of cell numbers and trackpoint counts as returned by L{countCells()}.
+        """
+        if self.counts == None:
+            self.counts = array('I', bytes(4 * self.width * self.height))
+        gridCounts = self.counts
+        for cell, count in counts.items():
+            gridCounts[cell] = min(gridCounts[cell] + count, 0xffffffff)
+
+    def getPixelSize(self):
+        """
+        Get the size of a grid cell in degrees (latlon) or metres (mercator).
+        
+        @return: Tupel of width and height of a cell; the height is negative, as the rows go from north to south.
+        """
+        if self.projection == "mercator":
+            scale = 2 * pi * MERCATOR_RADIUS
+            return scale / self.scaleX, -scale / self.scaleY
+        return 1 / (self.scaleX * 10000000.0), 1 / (self.scaleY * 10000000.0)
+
+    def getOrigin(self):
+        """
+        Get the coordinates of the north west corner of the grid in degrees (latlon) or metres (mercator).
+        
+        @return: Tupel of x and y.
+        """
+        if self.projection == "mercator":
+            scale = 2 * pi * MERCATOR_RADIUS
+            return (self.left - 0.5) * scale, (0.5 - self.top) * scale
+        return self.left / 10000000.0, self.top / 10000000.0
+
+    def writeWorldFile(self, fileName):
+        """
+        Write a world file with the georeference of the grid for GIS tools.
+        
+        @param fileName: The name of the world file, e.g. heatmap.pgw for heatmap.png.
+        """
+        pixelWidth, pixelHeight = self.getPixelSize()
+        x, y = self.getOrigin()
+        f = open(fileName, "w")
+        f.write("%.10f\n0\n0\n%.10f\n%.10f\n%.10f\n" % (pixelWidth, pixelHeight, x + pixelWidth / 2,
+                                                        y + pixelHeight / 2))
+        f.close()
+
+    def writeRaw(self, fileName):
+        """
+        Write the counts as raw little endian 32 bit integers, row by row from north to south, with an ENVI header
+        file (fileName + ".hdr") and a world file (fileName + ".wld").
+        
+        @param fileName: The name of the raw file.
+        """
+        counts = self.counts if self.counts != None else array('I', bytes(4 * self.width * self.height))
+        if sys.byteorder != "little":
+            counts = array('I', counts)
+            counts.byteswap()
+        f = open(fileName, "wb")
+        counts.tofile(f)
+        f.close()
+        pixelWidth, pixelHeight = self.getPixelSize()
+        x, y = self.getOrigin()
+        f = open(fileName + ".hdr", "w")
+        f.write("ENVI\ndescription = {Wintec trackpoint counts, %s grid}\nsamples = %i\nlines = %i\nbands = 1\n"
+                "header offset = 0\nfile type = ENVI Standard\ndata type = 13\ninterleave = bsq\nbyte order = 0\n"
+                % ("EPSG:3857" if self.projection == "mercator" else "EPSG:4326", self.width, self.height))
+        if self.projection != "mercator":
+            f.write("map info = {Geographic Lat/Lon, 1, 1, %.10f, %.10f, %.10f, %.10f, WGS-84}\n"
+                    % (x, y, pixelWidth, -pixelHeight))
+        f.close()
+        self.writeWorldFile(fileName + ".wld")
+
+    def writePng(self, fileName):
+        """
+        Write the grid as PNG image with logarithmic color scale and a world file (.pgw). Empty cells are transparent.
+        
+        @param fileName: The name of the PNG file.
+        """
+        counts = self.counts if self.counts != None else array('I', bytes(4 * self.width * self.height))
+        maximum = max(counts) if counts else 0
+        scale = 254 / log(1 + maximum) if maximum > 0 else 0
+        levels = {0: 0}
+
+        def getLevel(count):
+            """ Get the palette index of a count. """
+            level = levels.get(count)
+            if level == None:
+                level = levels[count] = 1 + int(log(1 + count) * scale)
+            return level
+
+        compressor = zlib.compressobj(6)
+        imageData = []
+        emptyRow = bytes(self.width + 1)
+        for rowStart in range(0, self.width * self.height, self.width):
+            row = counts[rowStart:rowStart + self.width]
+            imageData.append(compressor.compress(b"\x00" + bytes(map(getLevel, row)) if any(row) else emptyRow))
+        imageData.append(compressor.flush())
+        palette = bytearray(3 * 256)
+        for level in range(1, 256):
+            # Blue over red to yellow.
+            value = (level - 1) / 254.0
+            palette[3 * level:3 * level + 3] = bytes([int(255 * min(1.0, 2 * value)),
+                                                      int(255 * max(0.0, 2 * value - 1)),
+                                                      int(255 * max(0.0, 1 - 2 * value))])
+        transparency = bytes([0] + [255] * 255)
+
+        def createChunk(chunkType, data):
+            """ Create a PNG chunk. """
+            return struct.pack(">I", len(data)) + chunkType + data + struct.pack(">I", zlib.crc32(chunkType + data))
+
+        f = open(fileName, "wb")
+        f.write(b"\x89PNG\r\n\x1a\n")
+        f.write(createChunk(b"IHDR", struct.pack(">IIBBBBB", self.width, self.height, 8, 3, 0, 0, 0)))
+        f.write(createChunk(b"PLTE", bytes(palette)))
+        f.write(createChunk(b"tRNS", transparency))
+        f.write(createChunk(b"IDAT", b"".join(imageData)))
+        f.write(createChunk(b"IEND", b""))
+        f.close()
+        self.writeWorldFile(os.path.splitext(fileName)[0] + ".pgw")
+
+def countFile(task):
+    """
+    Count the trackpoints of a TK file per grid cell. Runs in a worker process.
+    
+    @param task: Tupel of file name and L{HeatmapGrid} without counts.
+    @return: Tupel of file name, Counter of cell numbers and trackpoint count; None instead of the Counter if the
+             file isn't a valid TK file.
+    """
+    fileName, grid = task
+    reference = TKFileReference(fileName)
+    if not reference.isValid():
+        return fileName, None, 0
+    counts = Counter()
+    trackpointCount = 0
+    for extent in reference.getTrackExtents():
+        columns = reference.readTrack(extent).getColumns()
+        counts.update(grid.countCells(columns.latitudes, columns.longitudes))
+        trackpointCount += len(columns)
+    return fileName, counts, trackpointCount
+
+def usage():
+    """
+    Print program usage.
+    """
+    executable = os.path.split(sys.argv[0])[1]
+    print("%s Version %s (C) 2026 The Wintec Tools contributors" % (executable, VERSION))
+    print("Create trackpoint density heatmaps from Wintec TK files.\n")
+    print("Usage: %s [-o filename] [-g mercator|latlon] [-b minlon,minlat,maxlon,maxlat] [-W width] [-H height]\n"
+          "       [-j jobs] <tk files>" % executable)
+    print("-o: Output file; .png for an image, other extensions for raw counts (default: heatmap.png).")
+    print("-g: Grid projection (default: mercator).")
+    print("-b: Grid bounds in degrees (default: whole world).")
+    print("-W: Grid width in pixels (default: 2048).")
+    print("-H: Grid height in pixels (default: derived from the bounds).")
+    print("-j, --jobs: Number of worker processes (default: 1).")
+
+def main():
+    """
+    The main method.
+    """
+    # pylint: disable-msg=R0912
+    outputFileName = "heatmap.png"
+    projection = "mercator"
+    bounds = None
+    width = 2048
+    height = None
+    jobs = 1
+
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], "?ho:g:b:W:H:j:", ["jobs="])
+    except getopt.GetoptError:
+        # print help information and exit:
+        usage()
+        sys.exit(2)
+    if len(args) == 0:
+        usage()
+        sys.exit(1)
+
+    for o, a in opts:
+        if o in ("-h", "-?"):
+            usage()
+            sys.exit()
+        if o == "-o":
+            outputFileName = a
+        if o == "-g":
+            projection = a
+            if projection not in HEATMAP_PROJECTIONS:
+                print("Unknown grid projection %s!" % projection)
+                sys.exit(5)
+        if o == "-b":
+            try:
+                bounds = tuple([float(value) for value in a.split(",")])
+            except ValueError:
+                bounds = ()
+            if len(bounds) != 4 or bounds[0] >= bounds[2] or bounds[1] >= bounds[3]:
+                print("Bounds don't match pattern minlon,minlat,maxlon,maxlat!")
+                sys.exit(5)
+        if o == "-W":
+            width = int(a)
+        if o == "-H":
+            height = int(a)
+        if o in ("-j", "--jobs"):
+            jobs = int(a)
+            if jobs < 1:
+                print("The number of jobs must be at least 1!")
+                sys.exit(5)
+
+    if bounds == None:
+        maxLatitude = MERCATOR_MAXLATITUDE if projection == "mercator" else 90.0
+        bounds = (-180.0, -maxLatitude, 180.0, maxLatitude)
+    grid = HeatmapGrid(bounds, width, height, projection)
+
+    tasks = []
+    for arg in args:
+        for tkFileName in globTKFiles(arg):
+            tasks.append((tkFileName, grid))
+
+    pool = multiprocessing.Pool(jobs) if jobs > 1 else None
+    trackpointCount = 0
+    try:
+        for fileName, counts, fileTrackpointCount in (pool.imap_unordered(countFile, tasks) if pool
+                                                      else map(countFile, tasks)):
+            if counts == None:
+                print("%s is not a valid TK file!" % fileName)
+                continue
+            grid.addCounts(counts)
+            trackpointCount += fileTrackpointCount
+    finally:
+        if pool:
+            pool.close()
+            pool.join()
+
+    print("Create %s (%ix%i, %i trackpoints)" % (outputFileName, grid.width, grid.height, trackpointCount))
+    if outputFileName.lower().endswith(".png"):
+        grid.writePng(outputFileName)
+    else:
+        grid.writeRaw(outputFileName)
+
+if __name__ == "__main__":
+    main()
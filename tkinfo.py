@@ -47,11 +47,11 @@ Display TK file information and set the user comment string for .tk2/.tk3 files.
 """
 
 import getopt
-from glob import glob
 import os
 import sys
 
-from winteclib import VERSION, readTKFile, TK1File, parseTimezone, determineTimezone
+from winteclib import VERSION, readTKFile, TK1File, parseTimezone, determineTimezone, globTKFiles, \
+    splitPackPath, getCompression, CompressedFile
 
 def usage():
     """
@@ -100,10 +100,13 @@ def main():
             autotimezone = True
     
     for arg in args:
-        for tkFileName in glob(arg):
+        for tkFileName in globTKFiles(arg):
             tkfile = readTKFile(tkFileName)
             modified = False
-            if not isinstance(tkfile, TK1File):
+            if splitPackPath(tkFileName)[1] != None:
+                if comment != None or timezone != None or autotimezone == True:
+                    print("%s is a pack member and can't be modified!" % tkFileName)
+            elif not isinstance(tkfile, TK1File):
                 if comment != None:
                     tkfile.setComment(comment)
                     modified = True
@@ -115,6 +118,8 @@ def main():
                     modified = True
             if modified:
                 f = open(tkFileName, "wb")
+                if getCompression(tkFileName) != None:
+                    f = CompressedFile(f, getCompression(tkFileName))
                 tkfile.write(f)
                 f.close()
             print("Filename: %s" % tkFileName)
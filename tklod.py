@@ -0,0 +1,331 @@
+#################################################################################
+##
+## tklod.py - Create level of detail sidecar files for Wintec TK files.
+##
+## Copyright (c) 2026 The Wintec Tools contributors
+##
+#################################################################################
+##
+## This program is free software; you can redistribute it and/or modify
+## it under the terms of the GNU General Public License as published by
+## the Free Software Foundation; either version 2 of the License, or
+## (at your option) any later version.
+##
+## This program is distributed in the hope that it will be useful,
+## but WITHOUT ANY WARRANTY; without even the implied warranty of
+## MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+## GNU General Public License for more details.
+##
+## You should have received a copy of the GNU General Public License
+## along with this program; if not, write to the Free Software
+## Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA
+##
+#################################################################################
+## Requirements                                                                ##
+#################################################################################
+##
+## Python 3.10 or later:
+## <http://www.python.org>
+##
+#################################################################################
+## Program information:                                                        ##
+#################################################################################
+##
+## - The sidecar file <tk file>.lod contains for every track the indices of
+##   the trackpoints kept by the Douglas-Peucker simplification with the
+##   tolerances 1m, 2m, 4m, ... up to the level with the fixed points only.
+## - Map viewers select the level for their resolution with
+##   TKLodPyramid.selectLevel() and read only the trackpoints of
+##   this level, see loadLodPyramid().
+##
+#################################################################################
+## Support                                                                     ##
+#################################################################################
+##
+## The latest version of the wintec tools is available on Github
+## <https://github.com/BlinxFox/WintecTools>
+##
+## If you have bug reports, patches or some questions, please create an
+## issue on Github:
+## <https://github.com/BlinxFox/WintecTools>
+##
+#################################################################################
+
+"""
+Create level of detail sidecar files for Wintec TK files.
+"""
+
+import getopt
+from math import log2
+import os
+import struct
+import sys
+import zlib
+
+from winteclib import VERSION, LOD_EXTENSION, TKFileReference, globTKFiles, hashTKFile, rankPolyline, encodeDeltas, \
+    decodeDeltas
+
+LOD_MARKER = b"WintecLod02\x00\x00\x00\x00\x00"
+""" The identification marker at the beginning of a level of detail sidecar file. """
+
+LOD_BASE_TOLERANCE = 1.0
+""" The simplification tolerance in metres of the finest level of detail. """
+
+LOD_MAXLEVELS = 24
+""" The maximum number of levels of detail per track. """
+
+LOD_HEADER = struct.Struct("<Q32sdI")
+""" The sidecar header after the marker: TK file length, SHA-256 hash of the TK file, base tolerance and track
+count. """
+
+class TKLodPyramid:
+    """
+    This class holds a level of detail pyramid of the tracks of a TK file for map display.
+    
+    Level n of a track is the sorted list of the indices of the trackpoints kept by the Douglas-Peucker algorithm
+    with the tolerance base tolerance * 2^n. Unlike L{Track.simplify()} push log points aren't kept, so the coarse
+    levels contain only a few points per track. The levels of a track end with the first level containing only the
+    first and the last trackpoint.
+    The pyramid is stored in a sidecar file next to the TK file (file name + L{LOD_EXTENSION}), see
+    L{createLodPyramid()} and L{loadLodPyramid()}.
+    """
+
+    def __init__(self, reference, contentHash, baseTolerance, levels):
+        """
+        Constructor.
+        
+        @param reference: The L{TKFileReference} of the TK file.
+        @param contentHash: The SHA-256 hash of the TK file as hex string, see L{hashTKFile()}.
+        @param baseTolerance: The tolerance of level 0 in metres.
+        @param levels: A list with the list of levels for every track; every level is a list of indices.
+        """
+        self.reference = reference
+        self.contentHash = contentHash
+        self.baseTolerance = baseTolerance
+        self.levels = levels
+        self.extents = None
+
+    def getTolerance(self, level):
+        """
+        Get the simplification tolerance of a level.
+        
+        @param level: The level.
+        @return: The tolerance in metres.
+        """
+        return self.baseTolerance * 2 ** level
+
+    def selectLevel(self, resolution):
+        """
+        Select the coarsest level which doesn't deviate more than the map resolution from the tracks.
+        
+        @param resolution: The map resolution in metres per pixel.
+        @return: The level or None if the resolution needs all trackpoints.
+        """
+        if resolution < self.baseTolerance:
+            return None
+        return min(int(log2(resolution / self.baseTolerance) + 1e-9), LOD_MAXLEVELS - 1)
+
+    def getTrackCount(self):
+        """
+        Get the number of tracks.
+        
+        @return: The number of tracks.
+        """
+        return len(self.levels)
+
+    def getIndices(self, trackNumber, level):
+        """
+        Get the indices of the trackpoints of a track for a level.
+        
+        @param trackNumber: The number of the track in the file, starting with 0.
+        @param level: The level; levels beyond the coarsest level of the track return the coarsest level.
+        @return: The sorted list of indices.
+        """
+        levels = self.levels[trackNumber]
+        return levels[min(level, len(levels) - 1)]
+
+    def readTrack(self, trackNumber, level):
+        """
+        Read the trackpoints of a track for a level, see L{TKFileReference.readTrack()}.
+        
+        @param trackNumber: The number of the track in the file, starting with 0.
+        @param level: The level or None to read all trackpoints.
+        @return: The L{Track}.
+        """
+        if self.extents == None:
+            self.extents = self.reference.getTrackExtents()
+        if level == None:
+            return self.reference.readTrack(self.extents[trackNumber])
+        return self.reference.readTrack(self.extents[trackNumber], self.getIndices(trackNumber, level))
+
+    def tracks(self, resolution):
+        """
+        A generator which iterates over the tracks for a map resolution.
+        
+        @param resolution: The map resolution in metres per pixel, see L{selectLevel()}.
+        @return: Next L{Track}.
+        """
+        level = self.selectLevel(resolution)
+        for trackNumber in range(self.getTrackCount()):
+            yield self.readTrack(trackNumber, level)
+
+    def write(self, fileName):
+        """
+        Write the pyramid to a sidecar file.
+        
+        @param fileName: The name of the sidecar file.
+        """
+        body = []
+        for levels in self.levels:
+            body.append(struct.pack("<I", len(levels)))
+            for indices in levels:
+                body.append(struct.pack("<I", len(indices)))
+                body.append(encodeDeltas(indices))
+        f = open(fileName, "wb")
+        f.write(LOD_MARKER)
+        f.write(LOD_HEADER.pack(self.reference.length, bytes.fromhex(self.contentHash), self.baseTolerance,
+                                len(self.levels)))
+        f.write(zlib.compress(b"".join(body)))
+        f.close()
+
+def getLodFileName(fileName):
+    """
+    Get the name of the level of detail sidecar file of a TK file.
+    
+    @param fileName: The name of the TK file or pack member.
+    @return: The name of the sidecar file.
+    """
+    return fileName + LOD_EXTENSION
+
+def createLodPyramid(reference, baseTolerance = LOD_BASE_TOLERANCE):
+    """
+    Compute the level of detail pyramid of a TK file and write the sidecar file.
+    
+    The importance of the trackpoints is computed once per track by L{rankPolyline()}, every level is a threshold
+    of the importance.
+    
+    @param reference: The L{TKFileReference} of the TK file.
+    @param baseTolerance: The tolerance of level 0 in metres.
+    @return: The L{TKLodPyramid}.
+    """
+    allLevels = []
+    for extent in reference.getTrackExtents():
+        xs, ys, _ = reference.readTrack(extent).getProjection()
+        importance = rankPolyline(xs, ys)
+        fixedCount = importance.count(float('inf'))
+        levels = []
+        for level in range(LOD_MAXLEVELS):
+            tolerance = baseTolerance * 2 ** level
+            indices = [index for index, value in enumerate(importance) if value > tolerance]
+            levels.append(indices)
+            if len(indices) == fixedCount:
+                break
+        allLevels.append(levels)
+    pyramid = TKLodPyramid(reference, hashTKFile(reference.getFileName()), baseTolerance, allLevels)
+    pyramid.write(getLodFileName(reference.getFileName()))
+    return pyramid
+
+def loadLodPyramid(reference):
+    """
+    Read the level of detail pyramid of a TK file from its sidecar file.
+    
+    @param reference: The L{TKFileReference} of the TK file.
+    @return: The L{TKLodPyramid} or None if the sidecar file is missing or was created for another file content.
+    """
+    fileName = getLodFileName(reference.getFileName())
+    if not os.path.exists(fileName):
+        return None
+    f = open(fileName, "rb")
+    data = f.read()
+    f.close()
+    if data[:len(LOD_MARKER)] != LOD_MARKER:
+        return None
+    length, contentHash, baseTolerance, trackCount = \
+        LOD_HEADER.unpack(data[len(LOD_MARKER):len(LOD_MARKER) + LOD_HEADER.size])
+    if length != reference.length:
+        return None
+    contentHash = contentHash.hex()
+    if contentHash != hashTKFile(reference.getFileName()):
+        return None
+    body = zlib.decompress(data[len(LOD_MARKER) + LOD_HEADER.size:])
+    pos = 0
+    allLevels = []
+    for _ in range(trackCount):
+        levelCount = struct.unpack("<I", body[pos:pos + 4])[0]
+        pos += 4
+        levels = []
+        for _ in range(levelCount):
+            count = struct.unpack("<I", body[pos:pos + 4])[0]
+            indices, pos = decodeDeltas(body, pos + 4, count)
+            levels.append(indices)
+        allLevels.append(levels)
+    return TKLodPyramid(reference, contentHash, baseTolerance, allLevels)
+
+def usage():
+    """
+    Print program usage.
+    """
+    executable = os.path.split(sys.argv[0])[1]
+    print("%s Version %s (C) 2026 The Wintec Tools contributors" % (executable, VERSION))
+    print("Create level of detail sidecar files for Wintec TK files.\n")
+    print("Usage: %s [-t metres] [-f] [-r metres] <tk files>" % executable)
+    print("-t: Tolerance of the finest level (default: %g)." % LOD_BASE_TOLERANCE)
+    print("-f: Recreate existing sidecar files.")
+    print("-r: Print the trackpoint counts for a map resolution in metres per pixel.")
+
+def main():
+    """
+    The main method.
+    """
+    # pylint: disable-msg=R0912
+    baseTolerance = None
+    force = False
+    resolution = None
+
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], "?ht:fr:")
+    except getopt.GetoptError:
+        # print help information and exit:
+        usage()
+        sys.exit(2)
+    if len(args) == 0:
+        usage()
+        sys.exit(1)
+
+    for o, a in opts:
+        if o in ("-h", "-?"):
+            usage()
+            sys.exit()
+        if o == "-t":
+            baseTolerance = float(a)
+            if baseTolerance <= 0:
+                print("The tolerance must be greater than 0!")
+                sys.exit(5)
+        if o == "-f":
+            force = True
+        if o == "-r":
+            resolution = float(a)
+
+    totalCount = 0
+    totalRead = 0
+    for arg in args:
+        for tkFileName in globTKFiles(arg):
+            reference = TKFileReference(tkFileName)
+            if not reference.isValid():
+                print("%s is not a valid TK file!" % tkFileName)
+                continue
+            pyramid = None if force else loadLodPyramid(reference)
+            if pyramid == None or baseTolerance not in (None, pyramid.baseTolerance):
+                print("Create %s" % getLodFileName(tkFileName))
+                pyramid = createLodPyramid(reference, baseTolerance if baseTolerance else LOD_BASE_TOLERANCE)
+            if resolution == None:
+                continue
+            level = pyramid.selectLevel(resolution)
+            for trackNumber, extent in enumerate(reference.getTrackExtents()):
+                totalCount += extent[1]
+                totalRead += extent[1] if level == None else len(pyramid.getIndices(trackNumber, level))
+    if resolution != None:
+        print("%i of %i trackpoints needed for %g metres per pixel" % (totalRead, totalCount, resolution))
+
+if __name__ == "__main__":
+    main()
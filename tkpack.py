@@ -0,0 +1,207 @@
+#################################################################################
+##
+## tkpack.py - Consolidate Wintec TK2/TK3 files into monthly pack files.
+##
+## Copyright (c) 2026 The Wintec Tools contributors
+##
+#################################################################################
+##
+## This program is free software; you can redistribute it and/or modify
+## it under the terms of the GNU General Public License as published by
+## the Free Software Foundation; either version 2 of the License, or
+## (at your option) any later version.
+##
+## This program is distributed in the hope that it will be useful,
+## but WITHOUT ANY WARRANTY; without even the implied warranty of
+## MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+## GNU General Public License for more details.
+##
+## You should have received a copy of the GNU General Public License
+## along with this program; if not, write to the Free Software
+## Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA
+##
+#################################################################################
+## Requirements                                                                ##
+#################################################################################
+##
+## Python 3.10 or later:
+## <http://www.python.org>
+##
+#################################################################################
+## Program information:                                                        ##
+#################################################################################
+##
+## - The files are grouped by the month (UTC) of their first trackpoint and
+##   added to the pack file YYYY-MM.tkp, existing packs are extended.
+## - The files are stored unchanged, so packing doesn't cost any read
+##   performance. The pack directory contains the header and the first
+##   trackpoint of every member, see winteclib.TKPack.
+## - The other tools read pack members as <pack>#<member>, e.g.
+##   tktogpx.py 2008-05.tkp#20080501_*.tk2, or all members of a pack with
+##   tktogpx.py 2008-05.tkp
+##
+#################################################################################
+## Support                                                                     ##
+#################################################################################
+##
+## The latest version of the wintec tools is available on Github
+## <https://github.com/BlinxFox/WintecTools>
+##
+## If you have bug reports, patches or some questions, please create an
+## issue on Github:
+## <https://github.com/BlinxFox/WintecTools>
+##
+#################################################################################
+
+"""
+Consolidate Wintec TK2/TK3 files into monthly pack files.
+"""
+
+import getopt
+from glob import glob
+import os
+import sys
+
+from winteclib import VERSION, PACK_SEPARATOR, TK1File, TKFileReference, TKPackWriter, getPack, globTKFiles, \
+    openTKFile
+
+PACK_FILENAME_TEMPLATE = "%Y-%m.tkp"
+""" The strftime format string for the pack file names; the tracks of every month go into one pack file. """
+
+def packFiles(tkFileNames, outputDir, remove):
+    """
+    Add TK2/TK3 files to the pack files of their months.
+    
+    @param tkFileNames: The names of the TK files.
+    @param outputDir: The output directory or None.
+    @param remove: True to delete the files after packing.
+    """
+    months = {}
+    for tkFileName in tkFileNames:
+        reference = TKFileReference(tkFileName)
+        if not reference.isValid():
+            print("%s is not a valid TK file!" % tkFileName)
+            continue
+        if reference.getFileClass() == TK1File:
+            print("%s is a TK1 file, skipped." % tkFileName)
+            continue
+        packName = reference.getFirstTrackpoint().getDateTime().strftime(PACK_FILENAME_TEMPLATE)
+        if outputDir:
+            packName = os.path.join(outputDir, packName)
+        months.setdefault(packName, []).append(tkFileName)
+
+    for packName in sorted(months):
+        writer = TKPackWriter(packName)
+        packed = []
+        try:
+            for tkFileName in months[packName]:
+                name = os.path.basename(tkFileName)
+                f = open(tkFileName, "rb")
+                data = f.read()
+                f.close()
+                if writer.addFile(name, data):
+                    print("Add %s to %s" % (name, packName))
+                    packed.append(tkFileName)
+                else:
+                    print("%s is already in %s, skipped." % (name, packName))
+        finally:
+            writer.close()
+        if remove:
+            for tkFileName in packed:
+                os.remove(tkFileName)
+
+def listFiles(packNames):
+    """
+    Print the members of pack files.
+    
+    @param packNames: The names of the pack files.
+    """
+    for packName in packNames:
+        for member in getPack(packName).getMembers():
+            print("%s%s%s %10i bytes" % (packName, PACK_SEPARATOR, member.name, member.length))
+
+def extractFiles(patterns, outputDir):
+    """
+    Restore TK files from pack files.
+    
+    @param patterns: The pack files or pack members, e.g. 2008-05.tkp#*.tk2.
+    @param outputDir: The output directory or None.
+    """
+    for pattern in patterns:
+        for memberName in globTKFiles(pattern):
+            fileName = memberName[memberName.rindex(PACK_SEPARATOR) + 1:]
+            if outputDir:
+                fileName = os.path.join(outputDir, fileName)
+            print("Create %s" % fileName)
+            f, offset, length = openTKFile(memberName)
+            f.seek(offset)
+            data = f.read(length)
+            f.close()
+            f = open(fileName, "wb")
+            f.write(data)
+            f.close()
+
+def usage():
+    """
+    Print program usage.
+    """
+    executable = os.path.split(sys.argv[0])[1]
+    print("%s Version %s (C) 2026 The Wintec Tools contributors" % (executable, VERSION))
+    print("Consolidate Wintec TK2/TK3 files into monthly pack files.\n")
+    print("Usage: %s [-d outputdir] [-r] <tk files>" % executable)
+    print("       %s -x [-d outputdir] <pack files or pack#member patterns>" % executable)
+    print("       %s -l <pack files>" % executable)
+    print("-r: Delete the files after packing.")
+    print("-x: Extract files from pack files.")
+    print("-l: List pack contents.")
+    print("-d: Use output directory.")
+
+def main():
+    """
+    The main method.
+    """
+    command = None
+    remove = False
+    outputDir = None
+
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], "?hrxld:")
+    except getopt.GetoptError:
+        # print help information and exit:
+        usage()
+        sys.exit(2)
+
+    for o, a in opts:
+        if o in ("-h", "-?"):
+            usage()
+            sys.exit()
+        if o in ("-x", "-l"):
+            command = o
+        if o == "-r":
+            remove = True
+        if o == "-d":
+            outputDir = a
+
+    if len(args) == 0:
+        usage()
+        sys.exit(1)
+
+    if outputDir and not os.path.exists(outputDir):
+        print("Output directory %s doesn't exist!" % outputDir)
+        sys.exit(3)
+
+    if command == "-l":
+        packNames = []
+        for arg in args:
+            packNames += sorted(glob(arg))
+        listFiles(packNames)
+    elif command == "-x":
+        extractFiles(args, outputDir)
+    else:
+        tkFileNames = []
+        for arg in args:
+            tkFileNames += sorted(glob(arg))
+        packFiles(tkFileNames, outputDir, remove)
+
+if __name__ == "__main__":
+    main()
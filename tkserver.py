@@ -0,0 +1,447 @@
+#################################################################################
+##
+## tkserver.py - Local HTTP service converting Wintec TK files to GPX, NMEA or JSON.
+##
+## Copyright (c) 2026 The Wintec Tools contributors
+##
+#################################################################################
+##
+## This program is free software; you can redistribute it and/or modify
+## it under the terms of the GNU General Public License as published by
+## the Free Software Foundation; either version 2 of the License, or
+## (at your option) any later version.
+##
+## This program is distributed in the hope that it will be useful,
+## but WITHOUT ANY WARRANTY; without even the implied warranty of
+## MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+## GNU General Public License for more details.
+##
+## You should have received a copy of the GNU General Public License
+## along with this program; if not, write to the Free Software
+## Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA
+##
+#################################################################################
+## Requirements                                                                ##
+#################################################################################
+##
+## Python 3.10 or later:
+## <http://www.python.org>
+##
+#################################################################################
+## Program information:                                                        ##
+#################################################################################
+##
+## - POST /gpx, /nmea or /json with the TK file as request body, or
+##   GET /gpx?path=<file> for files below the --root directory.
+## - Query parameters: simplify=<metres>, tz=+hh:mm or autotz=1 (gpx only).
+## - The responses are streamed with chunked transfer encoding.
+## - With -j n the listening socket is shared by n preforked worker
+##   processes, each keeping the modules and caches loaded.
+##
+#################################################################################
+## Support                                                                     ##
+#################################################################################
+##
+## The latest version of the wintec tools is available on Github
+## <https://github.com/BlinxFox/WintecTools>
+##
+## If you have bug reports, patches or some questions, please create an
+## issue on Github:
+## <https://github.com/BlinxFox/WintecTools>
+##
+#################################################################################
+
+"""
+Local HTTP service converting Wintec TK files to GPX, NMEA or JSON.
+"""
+
+import getopt
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import io
+import json
+import os
+import signal
+import socketserver
+import sys
+from urllib.parse import parse_qs, urlsplit
+
+from winteclib import VERSION, COORDINATE_SCALE, FILEMARKERLEN, TK1File, formatScaledColumn, getTKFileClass, \
+    parseTimezone, readTKFile
+import tktogpx
+import tktonmea
+
+CONTENT_TYPES = {"gpx": "application/gpx+xml", "nmea": "text/plain; charset=us-ascii",
+                 "json": "application/json"}
+""" The output formats and their content types. """
+
+CHUNK_SIZE = 64 * 1024
+""" The size in bytes of the chunks of a streamed response. """
+
+MAX_REQUEST_SIZE = 256 * 1024 * 1024
+""" The maximum size in bytes of a posted TK file. """
+
+class ChunkedWriter:
+    """
+    A text output file writing the response body with chunked transfer encoding.
+    """
+
+    def __init__(self, wfile):
+        """
+        Constructor.
+        
+        @param wfile: The binary output stream of the response.
+        """
+        self.wfile = wfile
+        self.buffer = []
+        self.size = 0
+
+    def write(self, text):
+        """
+        Write text; a chunk is sent when L{CHUNK_SIZE} bytes are collected.
+        
+        @param text: The text to write.
+        """
+        data = text.encode("utf-8")
+        self.buffer.append(data)
+        self.size += len(data)
+        if self.size >= CHUNK_SIZE:
+            self.flush()
+
+    def flush(self, last = False):
+        """
+        Send the collected data as a chunk.
+        
+        @param last: True to append the last chunk, which ends the response.
+        """
+        data = b"%x\r\n%s\r\n" % (self.size, b"".join(self.buffer)) if self.size else b""
+        if last:
+            data += b"0\r\n\r\n"
+        if data:
+            self.wfile.write(data)
+        self.buffer = []
+        self.size = 0
+
+    def close(self):
+        """
+        Send the remaining data and the last chunk.
+        """
+        self.flush(True)
+        self.wfile.flush()
+
+def writeJson(tkfile, outputFile, tolerance = None):
+    """
+    Write the tracks of a TK file as JSON.
+    
+    Every track has the footer values and columns of times (UTC seconds since the epoch), latitudes, longitudes
+    and altitudes; the coordinates are formatted from the integer fields.
+    
+    @param tkfile: The TK1File, TK2File or TK3File.
+    @param outputFile: The file to write to.
+    @param tolerance: The simplification tolerance in metres; None to write all trackpoints.
+    """
+    outputFile.write('{"device": %s, "logVersion": %.1f, "tracks": [' %
+                     (json.dumps(tkfile.getDeviceName().decode("latin-1")), tkfile.getLogVersion()))
+    for trackNumber, track in enumerate(tkfile.tracks()):
+        if tolerance:
+            track = track.simplify(tolerance)
+        columns = track.getColumns()
+        outputFile.write('%s\n{"track": %i, "trackpoints": %i, "duration": %i, "length": %r, ' %
+                         ("," if trackNumber else "", trackNumber + 1, len(columns), track.getTrackDuration(),
+                          track.getTrackLength()))
+        outputFile.write('"time": [%s], "lat": [%s], "lon": [%s], "alt": [%s]}' %
+                         (",".join(["%i" % timestamp for timestamp in columns.timestamps]),
+                          ",".join(formatScaledColumn(columns.latitudes, COORDINATE_SCALE, 7)),
+                          ",".join(formatScaledColumn(columns.longitudes, COORDINATE_SCALE, 7)),
+                          ",".join(["%i" % altitude for altitude in columns.altitudes])))
+    outputFile.write("\n]}\n")
+
+def convert(tkfile, outputFormat, query, outputFile):
+    """
+    Convert a TK file.
+    
+    @param tkfile: The TK1File, TK2File or TK3File.
+    @param outputFormat: The output format, see L{CONTENT_TYPES}.
+    @param query: The query parameters as dictionary of lists.
+    @param outputFile: The file to write to.
+    """
+    tolerance = float(query["simplify"][0]) if "simplify" in query else None
+    if outputFormat == "gpx":
+        usetimezone = False
+        if isinstance(tkfile, TK1File):
+            if "tz" in query:
+                tkfile.setTimezone(parseTimezone(query["tz"][0]))
+                usetimezone = True
+            if "autotz" in query:
+                tkfile.setAutotimezone(True)
+                usetimezone = True
+        tktogpx.createGpxFile(outputFile, [tkfile], usetimezone, 1, tolerance)
+    elif outputFormat == "nmea":
+        tktonmea.createNmeaFile([tkfile], outputFile, tolerance)
+    else:
+        writeJson(tkfile, outputFile, tolerance)
+
+class ConversionRequestHandler(BaseHTTPRequestHandler):
+    """
+    Handle conversion requests, see the program information.
+    """
+
+    protocol_version = "HTTP/1.1"
+    # Small responses are written as headers and a single chunk, which must not wait for the client's ACK.
+    disable_nagle_algorithm = True
+    server_version = "tkserver/" + VERSION
+
+    def parseRequest(self):
+        """
+        Parse path and query of the request.
+        
+        @return: Tupel of output format and query dictionary; None if the format is unknown.
+        """
+        url = urlsplit(self.path)
+        outputFormat = url.path.strip("/")
+        if outputFormat not in CONTENT_TYPES:
+            self.send_error(404, "Unknown format, use /gpx, /nmea or /json")
+            return None
+        query = parse_qs(url.query)
+        try:
+            if "simplify" in query and float(query["simplify"][0]) <= 0:
+                raise ValueError
+            if "tz" in query and parseTimezone(query["tz"][0]) == None:
+                raise ValueError
+        except ValueError:
+            self.send_error(400, "Invalid simplify or tz parameter")
+            return None
+        return outputFormat, query
+
+    def sendConversion(self, tkfile, outputFormat, query):
+        """
+        Stream the converted TK file.
+        
+        @param tkfile: The TK1File, TK2File or TK3File.
+        @param outputFormat: The output format.
+        @param query: The query parameters.
+        """
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPES[outputFormat])
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        outputFile = ChunkedWriter(self.wfile)
+        convert(tkfile, outputFormat, query, outputFile)
+        outputFile.close()
+
+    def do_POST(self): # pylint: disable-msg=C0103
+        """
+        Convert the TK file posted as request body.
+        """
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+        except ValueError:
+            length = -1
+        if length < 0:
+            self.send_error(400, "Invalid Content-Length")
+            self.close_connection = True
+            return
+        if length > MAX_REQUEST_SIZE:
+            self.send_error(413)
+            self.close_connection = True
+            return
+        request = self.parseRequest()
+        if request == None:
+            # The unread request body would be parsed as next request.
+            self.close_connection = True
+            return
+        data = self.rfile.read(length)
+        fileClass = getTKFileClass(data[:FILEMARKERLEN])
+        if fileClass == None:
+            self.send_error(400, "Not a valid TK file")
+            return
+        tkfile = fileClass()
+        try:
+            tkfile.read(io.BytesIO(data))
+        except AssertionError:
+            self.send_error(400, "Damaged TK file")
+            return
+        self.sendConversion(tkfile, *request)
+
+    def do_GET(self): # pylint: disable-msg=C0103
+        """
+        Convert a TK file below the root directory, see the path query parameter.
+        """
+        request = self.parseRequest()
+        if request == None:
+            return
+        outputFormat, query = request
+        root = self.server.root
+        if root == None or "path" not in query:
+            self.send_error(400, "Reading files needs the path parameter and the --root option of the server")
+            return
+        fileName = os.path.realpath(os.path.join(root, query["path"][0]))
+        if os.path.commonpath([root, fileName]) != root or not os.path.isfile(fileName.split("#")[0]):
+            self.send_error(404)
+            return
+        try:
+            tkfile = readTKFile(fileName)
+        except AssertionError:
+            self.send_error(400, "Damaged TK file")
+            return
+        if tkfile == None:
+            self.send_error(400, "Not a valid TK file")
+            return
+        self.sendConversion(tkfile, outputFormat, query)
+
+    def address_string(self):
+        """
+        Get the client address for the log; Unix socket clients have no address.
+        
+        @return: The client address.
+        """
+        if isinstance(self.client_address, tuple):
+            return self.client_address[0]
+        return "local"
+
+    def log_message(self, format, *args): # pylint: disable-msg=W0622
+        """
+        Log a request unless the server is quiet.
+        """
+        if not self.server.quiet:
+            BaseHTTPRequestHandler.log_message(self, format, *args)
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    A threading HTTP server listening on a Unix socket.
+    """
+
+    daemon_threads = True
+
+def createServer(address, socketName):
+    """
+    Create the server socket.
+    
+    @param address: Tupel of host and port.
+    @param socketName: The name of the Unix socket; None to listen on address.
+    @return: The server.
+    """
+    if socketName:
+        if os.path.exists(socketName):
+            os.remove(socketName)
+        return UnixHTTPServer(socketName, ConversionRequestHandler)
+    return ThreadingHTTPServer(address, ConversionRequestHandler)
+
+def serve(server, jobs):
+    """
+    Serve requests until interrupted.
+    
+    With more than one job, worker processes are forked which accept the connections of the shared socket.
+    
+    @param server: The server.
+    @param jobs: The number of worker processes.
+    """
+    if jobs == 1:
+        server.serve_forever()
+        return
+    children = []
+    for _ in range(jobs):
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGINT, signal.SIG_IGN)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            server.serve_forever()
+            os._exit(0)
+        children.append(pid)
+    try:
+        for pid in children:
+            os.waitpid(pid, 0)
+    finally:
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except OSError:
+                pass
+
+def stopServing(signum, frame):
+    """
+    Signal handler stopping the server like Ctrl-C.
+    
+    @param signum: The signal number.
+    @param frame: The current stack frame.
+    """
+    raise KeyboardInterrupt
+
+def usage():
+    """
+    Print program usage.
+    """
+    executable = os.path.split(sys.argv[0])[1]
+    print("%s Version %s (C) 2026 The Wintec Tools contributors" % (executable, VERSION))
+    print("Local HTTP service converting Wintec TK files to GPX, NMEA or JSON.\n")
+    print("Usage: %s [-p port] [-b address] [-s socket] [-r root] [-j jobs] [-q]" % executable)
+    print("-p: TCP port (default: 8201).")
+    print("-b: Address to listen on (default: 127.0.0.1).")
+    print("-s: Listen on a Unix socket instead of a TCP port.")
+    print("-r, --root: Allow GET requests for files below this directory.")
+    print("-j, --jobs: Number of worker processes (default: 1).")
+    print("-q: Don't log requests.")
+
+def main():
+    """
+    The main method.
+    """
+    # pylint: disable-msg=R0912
+    port = 8201
+    host = "127.0.0.1"
+    socketName = None
+    root = None
+    jobs = 1
+    quiet = False
+
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], "?hp:b:s:r:j:q", ["root=", "jobs="])
+    except getopt.GetoptError:
+        # print help information and exit:
+        usage()
+        sys.exit(2)
+
+    for o, a in opts:
+        if o in ("-h", "-?"):
+            usage()
+            sys.exit()
+        if o == "-p":
+            port = int(a)
+        if o == "-b":
+            host = a
+        if o == "-s":
+            socketName = a
+        if o in ("-r", "--root"):
+            root = os.path.realpath(a)
+        if o in ("-j", "--jobs"):
+            jobs = int(a)
+            if jobs < 1:
+                print("The number of jobs must be at least 1!")
+                sys.exit(5)
+        if o == "-q":
+            quiet = True
+
+    if len(args) != 0:
+        usage()
+        sys.exit(1)
+
+    if root and not os.path.isdir(root):
+        print("Root directory %s doesn't exist!" % root)
+        sys.exit(3)
+
+    server = createServer((host, port), socketName)
+    server.root = root
+    server.quiet = quiet
+    print("Serving on %s" % (socketName if socketName else "http://%s:%i/" % (host, port)))
+    sys.stdout.flush()
+    signal.signal(signal.SIGTERM, stopServing)
+    try:
+        serve(server, jobs)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if socketName and os.path.exists(socketName):
+            os.remove(socketName)
+
+if __name__ == "__main__":
+    main()
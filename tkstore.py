@@ -0,0 +1,396 @@
+#################################################################################
+##
+## tkstore.py - Keep repeated Wintec device downloads in a deduplicating track store.
+##
+## Copyright (c) 2026 The Wintec Tools contributors
+##
+#################################################################################
+##
+## This program is free software; you can redistribute it and/or modify
+## it under the terms of the GNU General Public License as published by
+## the Free Software Foundation; either version 2 of the License, or
+## (at your option) any later version.
+##
+## This program is distributed in the hope that it will be useful,
+## but WITHOUT ANY WARRANTY; without even the implied warranty of
+## MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+## GNU General Public License for more details.
+##
+## You should have received a copy of the GNU General Public License
+## along with this program; if not, write to the Free Software
+## Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA
+##
+#################################################################################
+## Requirements                                                                ##
+#################################################################################
+##
+## Python 3.10 or later:
+## <http://www.python.org>
+##
+#################################################################################
+## Program information:                                                        ##
+#################################################################################
+##
+## - Every track is stored once in a file named by the SHA-256 hash of its
+##   trackpoints, see TKStore.
+## - Partial tracks overlapping a stored track are merged by timestamp.
+## - The manifest maps every download to its tracks.
+##
+#################################################################################
+## Support                                                                     ##
+#################################################################################
+##
+## The latest version of the wintec tools is available on Github
+## <https://github.com/BlinxFox/WintecTools>
+##
+## If you have bug reports, patches or some questions, please create an
+## issue on Github:
+## <https://github.com/BlinxFox/WintecTools>
+##
+#################################################################################
+
+"""
+Keep repeated Wintec device downloads in a deduplicating track store.
+"""
+
+import getopt
+import hashlib
+import json
+import os
+import struct
+import sys
+
+from winteclib import VERSION, Trackpoint, TrackColumns, TK1File, globTKFiles, readTKFile, splitTrackdata
+
+STORE_MANIFEST = "manifest.json"
+""" The name of the manifest file in a track store directory. """
+
+STORE_TRACKDIR = "tracks"
+""" The name of the directory with the track files in a track store directory. """
+
+STORE_EXTENSION = ".trk"
+""" The file name extension of the track files in a track store. """
+
+def markTrackStart(trackdata):
+    """
+    Set the trackstart flag of the first trackpoint and clear it for all other trackpoints.
+    
+    @param trackdata: The trackdata of a single track as array of bytes.
+    @return: The trackdata with the corrected trackstart flags.
+    """
+    trackpoints = splitTrackdata(trackdata)
+    for index, trackpoint in enumerate(trackpoints):
+        pointType = struct.unpack('<H', trackpoint[0x00:0x02])[0]
+        flag = Trackpoint.TRACKSTART if index == 0 else 0
+        if pointType & Trackpoint.TRACKSTART != flag:
+            trackpoints[index] = struct.pack('<H', pointType ^ Trackpoint.TRACKSTART) + trackpoint[0x02:]
+    return b"".join(trackpoints)
+
+class TKStore:
+    """
+    This class represents a content addressed track store, which keeps every track only once.
+
+    Every track is stored in a file named by the SHA-256 hash of its trackpoints. A track overlapping in time with a
+    stored track of the same device is merged with it by timestamp, so the partial track of an earlier download and
+    the complete track of a later one result in a single track. The manifest maps every download (an added file) to
+    its tracks and keeps device and time range of every track.
+    """
+
+    def __init__(self, directory):
+        """
+        Constructor. The store directory is created, if it doesn't exist.
+        
+        @param directory: The store directory.
+        """
+        self.directory = directory
+        self.downloads = []
+        self.tracks = {}
+        self.replaced = set()
+        trackDirectory = os.path.join(directory, STORE_TRACKDIR)
+        if not os.path.exists(trackDirectory):
+            os.makedirs(trackDirectory)
+        manifestName = os.path.join(directory, STORE_MANIFEST)
+        if os.path.exists(manifestName):
+            f = open(manifestName, "r", encoding = "utf-8")
+            manifest = json.load(f)
+            f.close()
+            self.downloads = manifest["downloads"]
+            self.tracks = manifest["tracks"]
+        self.names = set([download["name"] for download in self.downloads])
+
+    def getTrackFileName(self, trackHash):
+        """
+        Get the name of the file containing a track.
+        
+        @param trackHash: The hash of the track.
+        @return: The file name.
+        """
+        return os.path.join(self.directory, STORE_TRACKDIR, trackHash[:2], trackHash + STORE_EXTENSION)
+
+    def readTrack(self, trackHash):
+        """
+        Read the trackdata of a track.
+        
+        @param trackHash: The hash of the track.
+        @return: The trackdata as array of bytes.
+        """
+        f = open(self.getTrackFileName(trackHash), "rb")
+        trackdata = f.read()
+        f.close()
+        return trackdata
+
+    def writeTrack(self, device, trackdata):
+        """
+        Store a track, which doesn't overlap with another stored track.
+        
+        @param device: The device name, info and serial of the track as list.
+        @param trackdata: The trackdata as array of bytes.
+        @return: The hash of the track.
+        """
+        trackHash = hashlib.sha256(trackdata).hexdigest()
+        fileName = self.getTrackFileName(trackHash)
+        if not os.path.exists(os.path.dirname(fileName)):
+            os.makedirs(os.path.dirname(fileName))
+        f = open(fileName + ".tmp", "wb")
+        f.write(trackdata)
+        f.close()
+        os.replace(fileName + ".tmp", fileName)
+        timestamps = TrackColumns(trackdata).timestamps
+        self.tracks[trackHash] = {"device": device, "start": min(timestamps), "end": max(timestamps),
+                                  "count": len(timestamps)}
+        self.replaced.discard(trackHash)
+        return trackHash
+
+    def addTrack(self, device, trackdata):
+        """
+        Add a track. The track is merged with all stored tracks of the device overlapping in time.
+        
+        @param device: The device name, info and serial of the track as list.
+        @param trackdata: The trackdata as array of bytes.
+        @return: Tupel of the hash of the stored track and the number of new trackpoints.
+        """
+        trackdata = markTrackStart(trackdata)
+        trackHash = hashlib.sha256(trackdata).hexdigest()
+        if trackHash in self.tracks:
+            return trackHash, 0
+        timestamps = TrackColumns(trackdata).timestamps
+        start = min(timestamps)
+        end = max(timestamps)
+        overlapping = sorted([otherHash for otherHash, track in self.tracks.items()
+                              if track["device"] == device and track["start"] <= end and start <= track["end"]],
+                             key = lambda otherHash: self.tracks[otherHash]["start"])
+        if not overlapping:
+            return self.writeTrack(device, trackdata), len(timestamps)
+        # Keep the stored trackpoint, if both tracks contain a trackpoint with the same timestamp.
+        trackpoints = {}
+        for otherHash in overlapping:
+            otherTrackdata = self.readTrack(otherHash)
+            for timestamp, trackpoint in zip(TrackColumns(otherTrackdata).timestamps,
+                                             splitTrackdata(otherTrackdata)):
+                trackpoints.setdefault(timestamp, trackpoint)
+        storedCount = len(trackpoints)
+        for timestamp, trackpoint in zip(timestamps, splitTrackdata(trackdata)):
+            trackpoints.setdefault(timestamp, trackpoint)
+        if len(trackpoints) == storedCount and len(overlapping) == 1:
+            return overlapping[0], 0
+        mergedHash = self.writeTrack(device, markTrackStart(b"".join([trackpoints[timestamp]
+                                                                      for timestamp in sorted(trackpoints)])))
+        for otherHash in overlapping:
+            if otherHash != mergedHash:
+                del self.tracks[otherHash]
+                self.replaced.add(otherHash)
+        for download in self.downloads:
+            hashes = []
+            for otherHash in download["tracks"]:
+                if otherHash in overlapping:
+                    otherHash = mergedHash
+                if otherHash not in hashes:
+                    hashes.append(otherHash)
+            download["tracks"] = hashes
+        return mergedHash, len(trackpoints) - storedCount
+
+    def addFile(self, name, tkfile):
+        """
+        Add all tracks of a wintec file as new download.
+        
+        @param name: The download name.
+        @param tkfile: The L{TK1File}, L{TK2File} or L{TK3File}.
+        @return: The number of new trackpoints or None, if the store already contains a download with this name.
+        """
+        if name in self.names:
+            return None
+        device = [value.decode("latin-1") for value in (tkfile.getDeviceName(), tkfile.getDeviceInfo(),
+                                                        tkfile.getDeviceSerial())]
+        download = {"name": name, "device": device, "tracks": []}
+        self.downloads.append(download)
+        self.names.add(name)
+        newCount = 0
+        for track in tkfile.tracks():
+            if track.trackpointCount == 0:
+                continue
+            trackHash, count = self.addTrack(device, track.getTrackData())
+            newCount += count
+            if trackHash not in download["tracks"]:
+                download["tracks"].append(trackHash)
+        return newCount
+
+    def getDevices(self):
+        """
+        Get the devices of the stored tracks.
+        
+        @return: A sorted list of device name, info and serial lists.
+        """
+        return sorted(set([tuple(track["device"]) for track in self.tracks.values()]))
+
+    def getTrackHashes(self, device):
+        """
+        Get the tracks of a device ordered by time.
+        
+        @param device: The device name, info and serial.
+        @return: A list of track hashes.
+        """
+        hashes = [trackHash for trackHash, track in self.tracks.items() if tuple(track["device"]) == tuple(device)]
+        return sorted(hashes, key = lambda trackHash: self.tracks[trackHash]["start"])
+
+    def getSize(self):
+        """
+        Get the number of stored trackpoints.
+        
+        @return: The number of trackpoints.
+        """
+        return sum([track["count"] for track in self.tracks.values()])
+
+    def close(self):
+        """
+        Write the manifest and remove the files of tracks replaced by merged tracks.
+        """
+        manifestName = os.path.join(self.directory, STORE_MANIFEST)
+        f = open(manifestName + ".tmp", "w", encoding = "utf-8")
+        json.dump({"downloads": self.downloads, "tracks": self.tracks}, f, indent = 1, sort_keys = True)
+        f.close()
+        os.replace(manifestName + ".tmp", manifestName)
+        for trackHash in self.replaced:
+            fileName = self.getTrackFileName(trackHash)
+            os.remove(fileName)
+            if not os.listdir(os.path.dirname(fileName)):
+                os.rmdir(os.path.dirname(fileName))
+        self.replaced = set()
+
+def addFiles(storeDir, tkFileNames):
+    """
+    Add TK files as downloads to a track store.
+    
+    @param storeDir: The store directory.
+    @param tkFileNames: The names of the TK files.
+    """
+    store = TKStore(storeDir)
+    try:
+        for tkFileName in tkFileNames:
+            tkfile = readTKFile(tkFileName)
+            if tkfile == None:
+                continue
+            name = os.path.basename(tkFileName)
+            count = store.addFile(name, tkfile)
+            if count == None:
+                print("%s is already stored, skipped." % name)
+            else:
+                print("Add %s (%i of %i trackpoints are new)" % (name, count, tkfile.getTrackpointCount()))
+    finally:
+        store.close()
+
+def listDownloads(storeDir):
+    """
+    Print the downloads of a track store.
+    
+    @param storeDir: The store directory.
+    """
+    store = TKStore(storeDir)
+    for download in store.downloads:
+        count = sum([store.tracks[trackHash]["count"] for trackHash in download["tracks"]])
+        print("%-40s %-20s %5i tracks %8i trackpoints" % (download["name"], download["device"][0],
+                                                          len(download["tracks"]), count))
+    print("%i downloads, %i unique tracks, %i unique trackpoints" % (len(store.downloads), len(store.tracks),
+                                                                     store.getSize()))
+
+def exportTracks(storeDir, outputDir):
+    """
+    Write the unique tracks of every device into a TK1 file.
+    
+    @param storeDir: The store directory.
+    @param outputDir: The output directory or None.
+    """
+    store = TKStore(storeDir)
+    for device in store.getDevices():
+        trackdata = b"".join([store.readTrack(trackHash) for trackHash in store.getTrackHashes(device)])
+        tk1 = TK1File()
+        tk1.init(*([value.encode("latin-1") for value in device] + [trackdata]))
+        fileName = tk1.createFilename()
+        if outputDir:
+            fileName = os.path.join(outputDir, fileName)
+        print("Create %s (%i tracks)" % (fileName, tk1.getTrackCount()))
+        f = open(fileName, "wb")
+        tk1.write(f)
+        f.close()
+
+def usage():
+    """
+    Print program usage.
+    """
+    executable = os.path.split(sys.argv[0])[1]
+    print("%s Version %s (C) 2026 The Wintec Tools contributors" % (executable, VERSION))
+    print("Keep repeated Wintec device downloads in a deduplicating track store.\n")
+    print("Usage: %s -a <store directory> <tk files>" % executable)
+    print("       %s -x [-d outputdir] <store directory>" % executable)
+    print("       %s -l <store directory>" % executable)
+    print("-a: Add files to the store; the store is created if it doesn't exist.")
+    print("-x: Write the unique tracks of every device into a TK1 file.")
+    print("-l: List the stored downloads.")
+    print("-d: Use output directory.")
+
+def main():
+    """
+    The main method.
+    """
+    command = None
+    outputDir = None
+
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], "?haxld:")
+    except getopt.GetoptError:
+        # print help information and exit:
+        usage()
+        sys.exit(2)
+
+    for o, a in opts:
+        if o in ("-h", "-?"):
+            usage()
+            sys.exit()
+        if o in ("-a", "-x", "-l"):
+            command = o
+        if o == "-d":
+            outputDir = a
+
+    if command == None or len(args) == 0 or (command == "-a" and len(args) < 2):
+        usage()
+        sys.exit(1)
+
+    if outputDir and not os.path.exists(outputDir):
+        print("Output directory %s doesn't exist!" % outputDir)
+        sys.exit(3)
+
+    storeDir = args[0]
+    if command == "-a":
+        tkFileNames = []
+        for arg in args[1:]:
+            tkFileNames += sorted(globTKFiles(arg))
+        addFiles(storeDir, tkFileNames)
+    elif not os.path.exists(storeDir):
+        print("Store %s doesn't exist!" % storeDir)
+        sys.exit(3)
+    elif command == "-l":
+        listDownloads(storeDir)
+    else:
+        exportTracks(storeDir, outputDir)
+
+if __name__ == "__main__":
+    main()
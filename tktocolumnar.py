@@ -0,0 +1,155 @@
+#################################################################################
+##
+## tktocolumnar.py - Convert gps tracklogs from Wintec TK files into columnar
+##                   files (Parquet, Arrow or NumPy) for data analysis.
+##
+## Copyright (c) 2026 The Wintec Tools contributors
+##
+#################################################################################
+##
+## This program is free software; you can redistribute it and/or modify
+## it under the terms of the GNU General Public License as published by
+## the Free Software Foundation; either version 2 of the License, or
+## (at your option) any later version.
+##
+## This program is distributed in the hope that it will be useful,
+## but WITHOUT ANY WARRANTY; without even the implied warranty of
+## MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+## GNU General Public License for more details.
+##
+## You should have received a copy of the GNU General Public License
+## along with this program; if not, write to the Free Software
+## Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA
+##
+#################################################################################
+## Requirements                                                                ##
+#################################################################################
+##
+## Python 3.10 or later:
+## <http://www.python.org>
+##
+## Optional Python libraries:
+## pyarrow for Parquet and Arrow output <https://arrow.apache.org/>
+## Without pyarrow .npz files are written, which can be read by numpy.
+##
+#################################################################################
+## Program information:                                                        ##
+#################################################################################
+##
+## - The output is partitioned by date (UTC): every day gets a directory
+##   date=YYYY-MM-DD with one or more part-NNNNN files.
+## - The tracks are read and written one at a time.
+## - Read the output with pandas.read_parquet(outputdir) or, for .npz files,
+##   pandas.DataFrame(dict(numpy.load(partfile))).
+##
+#################################################################################
+## Support                                                                     ##
+#################################################################################
+##
+## The latest version of the wintec tools is available on Github
+## <https://github.com/BlinxFox/WintecTools>
+##
+## If you have bug reports, patches or some questions, please create an
+## issue on Github:
+## <https://github.com/BlinxFox/WintecTools>
+##
+#################################################################################
+
+"""
+Convert gps tracklogs from Wintec TK files into columnar files (Parquet, Arrow or NumPy) for data analysis.
+"""
+
+import getopt
+import os
+import sys
+
+from winteclib import VERSION, COLUMNAR_FORMATS, ColumnarWriter, TKFileReference, importPyarrow, \
+    globTKFiles
+
+def writeColumnar(references, writer):
+    """
+    Write the tracks of the TK files track by track.
+    
+    @param references: The sorted list of L{TKFileReference} objects.
+    @param writer: The L{ColumnarWriter}.
+    """
+    for reference in references:
+        fileName = os.path.basename(reference.getFileName())
+        logVersion = reference.getLogVersion()
+        for trackNumber, extent in enumerate(reference.getTrackExtents()):
+            writer.writeTrack(fileName, trackNumber, reference.readTrack(extent), logVersion)
+
+def usage():
+    """
+    Print program usage.
+    """
+    executable = os.path.split(sys.argv[0])[1]
+    print("%s Version %s (C) 2026 The Wintec Tools contributors" % (executable, VERSION))
+    print("Convert gps tracklogs from Wintec TK files into columnar files (Parquet, Arrow or NumPy) for data "
+          "analysis.\n")
+    print("Usage: %s [-d outputdir] [-f parquet|arrow|npz] <tk files>" % executable)
+    print("-d: Use output directory.")
+    print("-f: Output format (default: parquet if pyarrow is installed; npz otherwise).")
+
+def main():
+    """
+    The main method.
+    """
+    # pylint: disable-msg=R0912
+    outputDir = None
+    fileFormat = None
+
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], "?hd:f:")
+    except getopt.GetoptError:
+        # print help information and exit:
+        usage()
+        sys.exit(2)
+    if len(args) == 0:
+        usage()
+        sys.exit(1)
+
+    for o, a in opts:
+        if o in ("-h", "-?"):
+            usage()
+            sys.exit()
+        if o == "-d":
+            outputDir = a
+        if o == "-f":
+            fileFormat = a
+            if fileFormat not in COLUMNAR_FORMATS:
+                print("Unknown output format %s!" % fileFormat)
+                sys.exit(5)
+
+    if fileFormat == None:
+        fileFormat = "parquet" if importPyarrow() != None else "npz"
+    elif fileFormat != "npz" and importPyarrow() == None:
+        print("The %s format needs pyarrow, please install it or use -f npz!" % fileFormat)
+        sys.exit(5)
+
+    if outputDir and not os.path.exists(outputDir):
+        print("Output directory %s doesn't exist!" % outputDir)
+        sys.exit(3)
+
+    references = []
+    for arg in args:
+        for tkFileName in globTKFiles(arg):
+            reference = TKFileReference(tkFileName)
+            if not reference.isValid():
+                print("%s is not a valid TK file!" % tkFileName)
+                continue
+            references.append(reference)
+    if len(references) == 0:
+        print("No TK files found!")
+        sys.exit(1)
+
+    references.sort(key=lambda x: x.getFirstTrackpoint().getDateTime())
+    writer = ColumnarWriter(outputDir, fileFormat)
+    try:
+        writeColumnar(references, writer)
+    finally:
+        writer.close()
+    print("Wrote %i trackpoints" % writer.trackpointCount)
+
+if __name__ == "__main__":
+    main()
@@ -55,13 +55,15 @@ Convert gps tracklogs from Wintec TK file into a single GPS eXchange file.
 
 from datetime import datetime
 import getopt
-from glob import glob
 import os
 from pytz import utc
 import sys
+from time import gmtime, strftime
 
-from winteclib import VERSION, DATETIME_FILENAME_TEMPLATE, readTKFile, calculateVincentyDistance, createOutputFile, \
-    parseTimezone, TK1File
+from winteclib import VERSION, DATETIME_FILENAME_TEMPLATE, OUTPUT_BUFFER_SIZE, COORDINATE_SCALE, \
+    COMPRESSION_EXTENSIONS, calculateVincentyDistance, createOutputFile, formatScaled, formatScaledColumn, \
+    getCompression, getOutputFileName, importZstandard, parseTimezone, ConversionCache, TK1File, TKFileReference, \
+    TKFileSequence, TKTrackMerge, globTKFiles
 
 # pylint: disable-msg=C0301
 
@@ -78,17 +80,17 @@ xsi:schemaLocation = "http://www.topografix.com/GPX/1/1 http://www.topografix.co
 
 METADATA = \
 """<metadata>
-<bounds maxlat="%(maxlat).6f" maxlon="%(maxlon).6f" minlat="%(minlat).6f" minlon="%(minlon).6f"/>
+<bounds maxlat="%(maxlat)s" maxlon="%(maxlon)s" minlat="%(minlat)s" minlon="%(minlon)s"/>
 </metadata>
 """
 """ Metadata template. """
 
 WAYPOINT = \
-"""<wpt lat="%(lat).6f" lon="%(lon).6f">
- <ele>%(ele).6f</ele>
+"""<wpt lat="%(wptlat)s" lon="%(wptlon)s">
+ <ele>%(ele)s</ele>
  <time>%(datetime)s</time>
  <name>Push Log Point #%(pushpoint)i</name>
- <desc>Lat.=%(lat).7f, Long.=%(lon).7f, Alt.=%(ele)im, Speed=%(speed)iKm/h, Course=%(bearing)ideg%(timezone)s.</desc>
+ <desc>Lat.=%(lat)s, Long.=%(lon)s, Alt.=%(alt)sm, Speed=%(speed)iKm/h, Course=%(bearing)ideg%(timezone)s.</desc>
  <sym>Waypoint</sym>
  <type>Other</type>
 <extensions>
@@ -109,10 +111,10 @@ TRACK_HEADER = \
 """ Track header template. """
 
 FIRST_TRACKPOINT = \
-"""<trkpt lat="%(lat).7f" lon="%(lon).7f">
- <ele>%(ele).6f</ele>
+"""<trkpt lat="%(lat)s" lon="%(lon)s">
+ <ele>%(ele)s</ele>
  <time>%(datetime)s</time>
- <desc>Lat.=%(lat).7f, Long.=%(lon).7f, Alt.=%(ele)im%(timezone)s.</desc>
+ <desc>Lat.=%(lat)s, Long.=%(lon)s, Alt.=%(alt)sm%(timezone)s.</desc>
 <extensions>%(temppressure)s
 </extensions>
 </trkpt>
@@ -120,10 +122,10 @@ FIRST_TRACKPOINT = \
 """ Template for first trackpoint. """
 
 TRACKPOINT = \
-"""<trkpt lat="%(lat).7f" lon="%(lon).7f">
- <ele>%(ele).6f</ele>
+"""<trkpt lat="%(lat)s" lon="%(lon)s">
+ <ele>%(ele)s</ele>
  <time>%(datetime)s</time>
- <desc>Lat.=%(lat).7f, Long.=%(lon).7f, Alt.=%(ele)im, Speed=%(speed)iKm/h, Course=%(bearing)ideg%(timezone)s.</desc>
+ <desc>Lat.=%(lat)s, Long.=%(lon)s, Alt.=%(alt)sm, Speed=%(speed)iKm/h, Course=%(bearing)ideg%(timezone)s.</desc>
 <extensions>%(temppressure)s
 </extensions>
 </trkpt>
@@ -160,33 +162,37 @@ def writeMetadata(tkfiles, outputFile):
     """
     Write metadata.
     
+    The bounds are computed in a separate pass over the files, so tkfiles may be a L{TKFileSequence}.
+    
     @param tkfiles: A list of TK files with track data.
     @param outputFile: The file to write to.
     """
-    maxLat = 0.0
-    maxLon = 0.0
+    maxLat = None
+    maxLon = None
     minLat = None
     minLon = None
     for tkfile in tkfiles:
         for track in tkfile.tracks():
-            for point in track.trackpoints():
-                latitude = point.getLatitude()
-                longitude = point.getLongitude()
-                if latitude > maxLat:
-                    maxLat = latitude
-                
-                if longitude > maxLon:
-                    maxLon = longitude
-                
-                if minLat is None or latitude < minLat:
-                    minLat = latitude
-                
-                if minLon is None or longitude < minLon:
-                    minLon = longitude
-                # FIXME: Time Machine X uses values higher than the maximum/lower than the minimum.
-                #        I have no idea how these values are computed.
+            if track.getTrackPointCount() == 0:
+                continue
+            columns = track.getColumns()
+            latitudes = columns.latitudes
+            longitudes = columns.longitudes
+            if maxLat is None or max(latitudes) > maxLat:
+                maxLat = max(latitudes)
+            if maxLon is None or max(longitudes) > maxLon:
+                maxLon = max(longitudes)
+            if minLat is None or min(latitudes) < minLat:
+                minLat = min(latitudes)
+            if minLon is None or min(longitudes) < minLon:
+                minLon = min(longitudes)
+            # FIXME: Time Machine X uses values higher than the maximum/lower than the minimum.
+            #        I have no idea how these values are computed.
 
-    values = {"minlat": minLat, "minlon": minLon, "maxlat": maxLat, "maxlon": maxLon}
+    if maxLat is None:
+        maxLat = maxLon = minLat = minLon = 0
+    values = {"minlat": formatScaled(minLat, COORDINATE_SCALE, 6), "minlon": formatScaled(minLon, COORDINATE_SCALE, 6),
+              "maxlat": formatScaled(maxLat, COORDINATE_SCALE, 6), "maxlon": formatScaled(maxLon, COORDINATE_SCALE, 6)}
     outputFile.write(METADATA % values)
 
 def writeWaypoints(tkfiles, outputFile, usetimezone):
@@ -227,64 +233,153 @@ def writeWaypoints(tkfiles, outputFile, usetimezone):
                     else:
                         tz = utc
                         timezone = ""
-                    values = {"lat": point.getLatitude(), "lon": point.getLongitude(),
+                    latitude = point.getLatitudeField()
+                    longitude = point.getLongitudeField()
+                    altitude = int(point.getAltitude())
+                    values = {"wptlat": formatScaled(latitude, COORDINATE_SCALE, 6),
+                              "wptlon": formatScaled(longitude, COORDINATE_SCALE, 6),
+                              "lat": formatScaled(latitude, COORDINATE_SCALE, 7),
+                              "lon": formatScaled(longitude, COORDINATE_SCALE, 7),
                               "datetime": point.getDateTime(tz).strftime('%Y-%m-%dT%H:%M:%SZ'), "pushpoint": pushPoint,
-                              "ele": point.getAltitude(), "speed": speed, "bearing": bearing + 0.5,
-                              "temppressure": temppressure, "timezone": timezone}
+                              "ele": formatScaled(altitude, 0, 6), "alt": formatScaled(altitude, 0, 0),
+                              "speed": speed, "bearing": bearing + 0.5, "temppressure": temppressure,
+                              "timezone": timezone}
                     outputFile.write(WAYPOINT % values)
                 
                 previousPoint = point
 
-def writeTracks(tkfiles, outputFile, usetimezone):
+def renderTrack(track, trackNumber, logVersion, usetimezone):
+    """
+    Render the <trk> fragment of a single track.
+    
+    The coordinates and elevations are formatted from the integer columns of the track in one go,
+    see L{formatScaledColumn()}.
+    
+    @param track: The L{Track} to render.
+    @param trackNumber: The number of the track in the gpx file.
+    @param logVersion: The log version of the TK file containing the track.
+    @return: The <trk> fragment as string.
+    """
+    # pylint: disable-msg=R0914
+    minutes, seconds = divmod(track.getTrackDuration(), 60)
+    hours, minutes = divmod(minutes, 60)
+    values = {"track": trackNumber, "trackpoints": track.getTrackPointCount(), "hours": hours,
+              "minutes": minutes, "seconds": seconds, "distance": track.getTrackLength()}
+    fragment = [TRACK_HEADER % values]
+    if usetimezone: 
+        tz = track.getTimezone()
+        timezone = datetime(2000, 1, 1, 0, 0, 0, tzinfo = tz).strftime(", TZ=%z")
+    else:
+        tz = utc
+        timezone = ""
+    offset = int(tz.utcoffset(datetime(2000, 1, 1)).total_seconds())
+    columns = track.getColumns()
+    timestamps = columns.timestamps
+    latitudes = formatScaledColumn(columns.latitudes, COORDINATE_SCALE, 7)
+    longitudes = formatScaledColumn(columns.longitudes, COORDINATE_SCALE, 7)
+    elevations = formatScaledColumn(columns.altitudes, 0, 6)
+    altitudes = formatScaledColumn(columns.altitudes, 0, 0)
+    for index in range(len(columns)):
+        speed = 0
+        bearing = 0
+        if index > 0:
+            distance, bearing = calculateVincentyDistance(columns.latitudes[index - 1] / 10000000.0,
+                                                          columns.longitudes[index - 1] / 10000000.0,
+                                                          columns.latitudes[index] / 10000000.0,
+                                                          columns.longitudes[index] / 10000000.0)
+            time = timestamps[index] - timestamps[index - 1]
+            if time != 0:
+                speed = distance / (time / float(60 * 60))
+        if logVersion != 2.0:
+            temppressure = ""
+        else:
+            trackpointType = columns.types[index]
+            temppressure = TEMPERATURE_PRESSURE % ({"extensiontype": "TrackPoint",
+                                                    "temperature": ((trackpointType & 0x007c) >> 2) * 2 - 10,
+                                                    "pressure": ((trackpointType & 0xff80) >> 7) + 589,})
+        values = {"lat": latitudes[index], "lon": longitudes[index],
+                  "datetime": strftime('%Y-%m-%dT%H:%M:%SZ', gmtime(timestamps[index] + offset)),
+                  "ele": elevations[index], "alt": altitudes[index],
+                  "speed": speed, "bearing": bearing + 0.5, "temppressure": temppressure, "timezone": timezone}
+        if index > 0:
+            fragment.append(TRACKPOINT % values)
+        else:
+            fragment.append(FIRST_TRACKPOINT % values)
+    fragment.append(TRACK_FOOTER)
+    return "".join(fragment)
+
+def renderTrackTask(task):
+    """
+    Render the <trk> fragment of a single track in a worker process.
+    
+    The task only contains the L{TKFileReference}, the file position of the track and the selected trackpoints,
+    the worker reads the track data itself.
+    
+    @param task: Tupel of L{TKFileReference}, track extent, trackpoint indices, track number, usetimezone flag and
+                 simplification tolerance.
+    @return: Tupel of the <trk> fragment as string, the original and the rendered trackpoint count.
+    """
+    reference, extent, indices, trackNumber, usetimezone, tolerance = task
+    return renderSimplifiedTrack(reference.readTrack(extent, indices), trackNumber, reference.getLogVersion(),
+                                 usetimezone, tolerance)
+
+def renderSimplifiedTrack(track, trackNumber, logVersion, usetimezone, tolerance):
+    """
+    Simplify and render a single track, see L{Track.simplify()} and L{renderTrack()}.
+    
+    @param track: The L{Track} to render.
+    @param trackNumber: The number of the track in the gpx file.
+    @param logVersion: The log version of the TK file containing the track.
+    @param tolerance: The simplification tolerance in metres; None to render all trackpoints.
+    @return: Tupel of the <trk> fragment as string, the original and the rendered trackpoint count.
+    """
+    simplified = track.simplify(tolerance) if tolerance else track
+    return (renderTrack(simplified, trackNumber, logVersion, usetimezone), track.getTrackPointCount(),
+            simplified.getTrackPointCount())
+
+def writeTracks(tkfiles, outputFile, usetimezone, jobs = 1, tolerance = None):
     """
     Write track data.
     
+    With more than one job the tracks of a L{TKFileSequence} are rendered by a pool of worker processes.
+    The fragments are written in track order, so the output is identical to the single job output.
+    
     @param tkfiles: A list of TK files with track data.
     @param outputFile: The file to write to.
+    @param jobs: The number of worker processes.
+    @param tolerance: The simplification tolerance in metres; None to write all trackpoints.
+    @return: Tupel of the original and the written trackpoint count.
     """
-    # pylint: disable-msg=R0914
     trackNumber = 0
+    count = 0
+    kept = 0
+    if jobs > 1 and isinstance(tkfiles, TKFileSequence):
+        tasks = []
+        for reference, extent, indices in tkfiles.selectTracks():
+            trackNumber += 1
+            tasks.append((reference, extent, indices, trackNumber, usetimezone, tolerance))
+        import multiprocessing # pylint: disable-msg=C0415
+        pool = multiprocessing.Pool(jobs)
+        try:
+            for fragment, trackpointCount, renderedCount in pool.imap(renderTrackTask, tasks):
+                outputFile.write(fragment)
+                count += trackpointCount
+                kept += renderedCount
+        finally:
+            pool.close()
+            pool.join()
+        return count, kept
+
     for tkfile in tkfiles:
         for track in tkfile.tracks():
-            previousPoint = None
             trackNumber += 1
-            minutes, seconds = divmod(track.getTrackDuration(), 60)
-            hours, minutes = divmod(minutes, 60)
-            values = {"track": trackNumber, "trackpoints": track.getTrackPointCount(), "hours": hours,
-                      "minutes": minutes, "seconds": seconds, "distance": track.getTrackLength()}
-            outputFile.write(TRACK_HEADER % values)
-            for point in track.trackpoints():
-                speed = 0
-                bearing = 0
-                if previousPoint:
-                    distance, bearing = calculateVincentyDistance(previousPoint.getLatitude(),
-                                                                  previousPoint.getLongitude(),
-                                                                  point.getLatitude(), point.getLongitude())
-                    timedelta = point.getDateTime() - previousPoint.getDateTime()
-                    time = timedelta.days * 24 * 60 * 60 + timedelta.seconds
-                    if time != 0:
-                        speed = distance / (time / float(60 * 60))
-                if tkfile.getLogVersion() != 2.0:
-                    temppressure = ""
-                else:
-                    temppressure = TEMPERATURE_PRESSURE % ({"extensiontype": "TrackPoint",
-                                                            "temperature": point.getTemperature(),
-                                                            "pressure": point.getAirPressure(),})
-                if usetimezone: 
-                    tz = track.getTimezone()
-                    timezone = datetime(2000, 1, 1, 0, 0, 0, tzinfo = tz).strftime(", TZ=%z")
-                else:
-                    tz = utc
-                    timezone = ""
-                values = {"lat": point.getLatitude(), "lon": point.getLongitude(),
-                          "datetime": point.getDateTime(tz).strftime('%Y-%m-%dT%H:%M:%SZ'), "ele": point.getAltitude(),
-                          "speed": speed, "bearing": bearing + 0.5, "temppressure": temppressure, "timezone": timezone}
-                if previousPoint:
-                    outputFile.write(TRACKPOINT % values)
-                else:
-                    outputFile.write(FIRST_TRACKPOINT % values)
-                previousPoint = point
-            outputFile.write(TRACK_FOOTER)
+            fragment, trackpointCount, renderedCount = renderSimplifiedTrack(track, trackNumber,
+                                                                             tkfile.getLogVersion(), usetimezone,
+                                                                             tolerance)
+            outputFile.write(fragment)
+            count += trackpointCount
+            kept += renderedCount
+    return count, kept
 
 def writeXmlFooter(outputFile):
     """
@@ -294,18 +389,26 @@ def writeXmlFooter(outputFile):
     """
     return outputFile.write(XML_FOOTER)
 
-def createGpxFile(outputFile, tkfiles, usetimezone):
+def createGpxFile(outputFile, tkfiles, usetimezone, jobs = 1, tolerance = None):
     """
     Create gpx file.
     
+    Every section iterates over tkfiles on its own, so a L{TKFileSequence} is read once per section and never
+    held in memory completely. A L{TKTrackMerge} merges the tracks in the first section only; the other sections
+    and the worker processes get the positions of the merged tracks.
+    
     @param outputFile: The gpx file handle.
     @param tkfiles: A list of TK files with track data.
+    @param jobs: The number of worker processes for rendering the tracks.
+    @param tolerance: The simplification tolerance in metres; None to write all trackpoints.
+    @return: Tupel of the original and the written trackpoint count.
     """
     writeXmlHeader(outputFile)
     writeMetadata(tkfiles, outputFile)
     writeWaypoints(tkfiles, outputFile, usetimezone)  
-    writeTracks(tkfiles, outputFile, usetimezone)
+    count, kept = writeTracks(tkfiles, outputFile, usetimezone, jobs, tolerance)
     writeXmlFooter(outputFile)
+    return count, kept
 
 def usage():
     """
@@ -314,13 +417,19 @@ def usage():
     executable = os.path.split(sys.argv[0])[1]
     print("%s Version %s (C) 2008 Steffen Siebert <siebert@steffensiebert.de>" % (executable, VERSION))
     print("Convert gps tracklogs from Wintec TK files into a single GPS eXchange file.\n")
-    print("Usage: %s [-d outputdir] [-o filename] [-t +hh:mm|--autotz] <tk files>" % executable)
+    print("Usage: %s [-d outputdir] [-o filename] [-z gz|xz|zst] [--threads n] [-t +hh:mm|--autotz]\n"
+          "       [-j jobs] [--simplify metres] [--force] <tk files>" % executable)
     print("-d: Use output directory.")
-    print("-o: Use output filename.")
+    print("-o: Use output filename; the extension .gz, .xz or .zst selects the compression.")
+    print("-z: Compress the output file with gzip, xz or zstandard.")
+    print("--threads: Number of compression threads (default: 1); 0 uses all processors.")
+    print("--simplify: Remove trackpoints deviating less than the given metres from the simplified track.")
     print("-t: .tk1     : Use timezone for local time (offset to UTC).")
     print("    .tk2/.tk3: Use timezone stored in tk-file.")
     print("--autotz: .tk1     : Determine timezone from first trackpoint.")
     print("          .tk2/.tk3: Use timezone stored in tk-file.")
+    print("-j, --jobs: Number of worker processes for rendering the tracks (default: 1).")
+    print("--force: Convert even if the files and options are unchanged since the last conversion.")
     print()
     print("Note: The time in .gpx files is defined as UTC. If you use the -t or --autotz")
     print("option, the time is converted to the timezone, but still marked as UTC.")
@@ -337,9 +446,15 @@ def main():
     timezone = None
     autotimezone = False
     usetimezone = False
+    jobs = 1
+    compression = None
+    threads = 1
+    tolerance = None
+    force = False
     
     try:
-        opts, args = getopt.getopt(sys.argv[1:], "?hd:o:t:", "autotz")
+        opts, args = getopt.getopt(sys.argv[1:], "?hd:o:z:t:j:", ["autotz", "jobs=", "threads=", "simplify=",
+                                                                   "force"])
     except getopt.GetoptError:
         # print help information and exit:
         usage()
@@ -356,6 +471,18 @@ def main():
             outputDir = a
         if o == "-o":
             filename = a
+        if o == "-z":
+            compression = a
+            if compression not in COMPRESSION_EXTENSIONS:
+                print("Unknown compression %s!" % compression)
+                sys.exit(5)
+        if o == "--threads":
+            threads = int(a)
+        if o == "--simplify":
+            tolerance = float(a)
+            if tolerance <= 0:
+                print("The simplification tolerance must be greater than 0!")
+                sys.exit(5)
         if o == "-t":
             timezone = parseTimezone(a)
             if timezone == None:
@@ -364,44 +491,74 @@ def main():
             usetimezone = True
         if o == "--autotz":
             usetimezone = autotimezone = True
+        if o == "--force":
+            force = True
+        if o in ("-j", "--jobs"):
+            jobs = int(a)
+            if jobs < 1:
+                print("The number of jobs must be at least 1!")
+                sys.exit(5)
+
+    if (compression == "zst" or (filename and getCompression(filename) == "zst")) and importZstandard() == None:
+        print("zst compression needs zstandard (pip install zstandard)!")
+        sys.exit(5)
 
     if outputDir and not os.path.exists(outputDir):
         print("Output directory %s doesn't exist!" % outputDir)
         sys.exit(3)
 
-    tkfiles = []
+    references = []
     for arg in args:
-        for tkFileName in glob(arg):
-            tkfile = readTKFile(tkFileName)
-            if isinstance(tkfile, TK1File):
-                if timezone:
-                    tkfile.setTimezone(timezone)
-                tkfile.setAutotimezone(autotimezone)
-            tkfiles.append(tkfile)
-
-    tkfiles.sort(key=lambda x: x.getFirstTrackpoint().getDateTime())
-    
+        for tkFileName in globTKFiles(arg):
+            reference = TKFileReference(tkFileName)
+            if not reference.isValid():
+                print("%s is not a valid TK file!" % tkFileName)
+                continue
+            if timezone:
+                reference.setTimezone(timezone)
+            reference.setAutotimezone(autotimezone)
+            references.append(reference)
+    if len(references) == 0:
+        print("No TK files found!")
+        sys.exit(1)
+
+    references.sort(key=lambda x: x.getFirstTrackpoint().getDateTime())
+    tkfiles = TKTrackMerge(references)
+    cache = ConversionCache(force = force)
+    # The number of jobs and compression threads doesn't change the output.
+    options = [(o, a) for o, a in opts if o not in ("--force", "-j", "--jobs", "--threads")]
+
+    if len(tkfiles) > 1:
+        dateString = tkfiles[0].getFirstTrackpoint().getDateTimeString()
+        dateString2 = tkfiles[-1].getFirstTrackpoint().getDateTimeString()
+        template, value = '%s-%s#%03i.gpx', (dateString, dateString2, len(tkfiles))
+    elif tkfiles[0].getFileClass() == TK1File:
+        dateString = tkfiles[0].getFirstTrackpoint().getDateTimeString()
+        dateString2 = tkfiles[0].getLastTrackpoint().getDateTimeString()
+        template, value = '%s-%s#%03i.gpx', (dateString, dateString2, tkfiles[0].getTrackCount())
+    else:
+        dateString = tkfiles[0].getFirstTrackpoint().getDateTimeString(DATETIME_FILENAME_TEMPLATE)
+        template, value = '%s.gpx', dateString
+
+    outputName = getOutputFileName(outputDir, filename, template, value, compression)
+    cacheKey = "tktogpx:%s" % os.path.abspath(outputName)
+    inputNames = [reference.getFileName() for reference in references]
+    if cache.isUnchanged(cacheKey, options, inputNames):
+        print("%s is up to date, skipped." % outputName)
+        cache.close()
+        return
+
     try:
-        if len(tkfiles) > 1:
-            dateString = tkfiles[0].getFirstTrackpoint().getDateTimeString()
-            dateString2 = tkfiles[-1].getFirstTrackpoint().getDateTimeString()
-            outputFile = createOutputFile(outputDir, filename, '%s-%s#%03i.gpx', (dateString, dateString2,
-                                                                                  len(tkfiles)))
-        else:
-            if isinstance(tkfiles[0], TK1File):
-                dateString = tkfiles[0].getFirstTrackpoint().getDateTimeString()
-                dateString2 = tkfiles[0].getLastTrackpoint().getDateTimeString()
-                outputFile = createOutputFile(outputDir, filename, '%s-%s#%03i.gpx', (dateString, dateString2,
-                                                                                      tkfiles[0].getTrackCount()))
-            else:
-                dateString = tkfiles[0].getFirstTrackpoint().getDateTimeString(DATETIME_FILENAME_TEMPLATE)
-                outputFile = createOutputFile(outputDir, filename, '%s.gpx', dateString)
-        if outputFile == None:
-            return
-        createGpxFile(outputFile, tkfiles, usetimezone)
+        outputFile = createOutputFile(outputDir, filename, template, value, buffering = OUTPUT_BUFFER_SIZE,
+                                      compression = compression, threads = threads)
+        count, kept = createGpxFile(outputFile, tkfiles, usetimezone, jobs, tolerance)
+        if tolerance:
+            print("Simplified %i trackpoints to %i (%.1f%%)" % (count, kept, 100.0 * kept / count if count else 100.0))
     finally:
         if outputFile != None:
             outputFile.close()
+    cache.update(cacheKey, options, inputNames, [outputName])
+    cache.close()
 
 if __name__ == "__main__":
     main()
@@ -54,18 +54,22 @@ Convert gps tracklogs from Wintec TK file into a single NMEA-0183 file.
 """
 
 import getopt
-from glob import glob
+import heapq
 import os
+import re
 import sys
+from time import perf_counter, sleep
 
-from winteclib import VERSION, DATETIME_FILENAME_TEMPLATE, readTKFile, calculateVincentyDistance, createOutputFile, \
-    TK1File
+from winteclib import VERSION, DATETIME_FILENAME_TEMPLATE, OUTPUT_BUFFER_SIZE, COMPRESSION_EXTENSIONS, \
+    createOutputFile, getCompression, getOutputFileName, importZstandard, globTKFiles, ConversionCache, TK1File, \
+    TKFileReference, TKTrackMerge, Track, Trackpoint
 
 # pylint: disable-msg=C0301
 
-GPRMC_TEMPLATE = "$GPRMC,%(timeString)s,A,%(lat)02i%(latMinutes)02.6f,%(ns)s,%(lon)03i%(lonMinutes)02.6f,%(ew)s,%(speed)2.1f,%(bearing)i.0,%(dateString)s,,,,"
+GPRMC_TEMPLATE = "$GPRMC,%s,A,%s,%s,%2.1f,%i.0,%s,,,,"
 """
-RMC - Recommended Minimum Navigation Information::
+RMC - Recommended Minimum Navigation Information, formatted with a tupel of time, latitude with N or S,
+longitude with E or W, speed, bearing and date::
 
                                                             12
         1         2 3       4 5        6 7   8   9    10  11|
@@ -87,9 +91,10 @@ RMC - Recommended Minimum Navigation Information::
  12) Checksum 
 """
 
-GPGGA_TEMPLATE = "$GPGGA,%(timeString)s,%(lat)02i%(latMinutes)02.6f,%(ns)s,%(lon)03i%(lonMinutes)02.6f,%(ew)s,1,,,%(altitude)i,M,,M,,"
+GPGGA_TEMPLATE = "$GPGGA,%s,%s,%s,1,,,%i,M,,M,,"
 """
-GGA - Global Positioning System Fix Data, Time, Position and fix related data fora GPS receiver::
+GGA - Global Positioning System Fix Data, Time, Position and fix related data fora GPS receiver, formatted with
+a tupel of time, latitude with N or S, longitude with E or W and altitude::
 
                                                       11
         1         2       3 4        5 6 7  8   9  10 |  12 13  14   15
@@ -120,6 +125,42 @@ GGA - Global Positioning System Fix Data, Time, Position and fix related data fo
  15) Checksum 
 """
 
+CHECKSUM_LANE = 128
+""" The number of bytes reserved per sentence for the bulk checksum calculation; a power of two. """
+
+CHECKSUM_BATCH = 4096
+""" The number of sentences per bulk checksum calculation. """
+
+CHECKSUM_STRINGS = ["*%02X" % checksum for checksum in range(256)]
+""" The formatted checksums. """
+
+SPIN_TIME = 0.002
+""" The time in seconds before a replay deadline spent in a busy loop instead of sleeping. """
+
+REPLAY_CHUNK = 64
+""" The number of trackpoints for which the sentences are created at once during a replay. """
+
+POLL_INTERVAL = 0.05
+""" The maximum time in seconds between two polls of the replay endpoints. """
+
+checksummasks = {} # pylint: disable-msg=C0103
+""" A map of lane count and the fold masks used by L{nmeaChecksums()}. """
+
+def formatNmeaCoordinate(value, degreeDigits):
+    """
+    Format a latitude or longitude field as NMEA degrees and minutes (dddmm.mmmmmm) without the hemisphere.
+    
+    The value is scaled by 1e7, so the minutes in units of 1e-6 are exactly the fractional degrees times six
+    and no float rounding is involved.
+    
+    @param value: The latitude or longitude field (decimal degrees scaled by 1e7).
+    @param degreeDigits: The number of degree digits, 2 for latitude and 3 for longitude.
+    @return: The formatted coordinate.
+    """
+    degrees, fraction = divmod(abs(value), 10000000)
+    minutes, minuteFraction = divmod(fraction * 6, 1000000)
+    return "%0*i%02i.%06i" % (degreeDigits, degrees, minutes, minuteFraction)
+
 def nmeaChecksum(string):
     """
     Calculate checksum of NMEA protocol string.
@@ -132,46 +173,352 @@ def nmeaChecksum(string):
         checksum = checksum ^ ord(char)
     return "*%02X" % checksum
 
-def createNmeaFile(tkfiles, outputFile):
+def getChecksumMasks(count):
+    """
+    Get the masks for folding a batch of checksum lanes, see L{nmeaChecksums()}.
+    
+    @param count: The number of lanes in the batch.
+    @return: A list of tupels of fold width in bits and mask.
+    """
+    if count not in checksummasks:
+        masks = []
+        width = CHECKSUM_LANE // 2
+        while width >= 1:
+            lane = bytes([0xff]) * width + bytes(CHECKSUM_LANE - width)
+            masks.append((width * 8, int.from_bytes(lane * count, 'little')))
+            width //= 2
+        checksummasks[count] = masks
+    return checksummasks[count]
+
+def nmeaChecksums(strings):
+    """
+    Calculate the checksums of a batch of NMEA protocol strings.
+    
+    Up to L{CHECKSUM_BATCH} strings are packed into lanes of L{CHECKSUM_LANE} bytes of a single integer.
+    XOR-folding the upper half of every lane onto its lower half until one byte is left computes all checksums
+    of the batch with a few big integer operations instead of a loop over every character.
+    
+    @param strings: A list of protocol strings to calculate checksums for.
+    @return: A list of NMEA checksums.
+    """
+    checksums = []
+    for batchStart in range(0, len(strings), CHECKSUM_BATCH):
+        batch = strings[batchStart:batchStart + CHECKSUM_BATCH]
+        if max(len(string) for string in batch) > CHECKSUM_LANE:
+            checksums.extend(nmeaChecksum(string) for string in batch)
+            continue
+        count = len(batch)
+        value = int.from_bytes("".join([string[1:].ljust(CHECKSUM_LANE, "\0") for string in batch]).encode("ascii"),
+                               'little')
+        for width, mask in getChecksumMasks(count):
+            value = (value ^ (value >> width)) & mask
+        checksums.extend([CHECKSUM_STRINGS[checksum]
+                          for checksum in value.to_bytes(count * CHECKSUM_LANE, 'little')[::CHECKSUM_LANE]])
+    return checksums
+
+def createNmeaSentences(track):
+    """
+    Create the GPRMC and GPGGA sentences for all trackpoints of a track.
+    
+    All fields are computed column by column from the L{TrackColumns} of the track: date and time are taken
+    directly from the bits of the date/time field, the coordinates are formatted from the integer fields and
+    speed and bearing are the motion columns of the track (see L{Track.getMotion()}).
+    
+    @param track: The L{Track}.
+    @return: A list of lines with two sentences per trackpoint.
+    """
+    columns = track.getColumns()
+    dateTimeFields = columns.dateTimeFields
+    speeds, bearings = track.getMotion()
+    dateStrings = ["%02i%02i%02i" % ((field >> 17) & 0x1f, (field >> 22) & 0x0f, field >> 26)
+                   for field in dateTimeFields]
+    timeStrings = ["%02i%02i%02i" % ((field >> 12) & 0x1f, (field >> 6) & 0x3f, field & 0x3f)
+                   for field in dateTimeFields]
+    latStrings = [formatNmeaCoordinate(latitude, 2) + (",N" if latitude >= 0 else ",S")
+                  for latitude in columns.latitudes]
+    lonStrings = [formatNmeaCoordinate(longitude, 3) + (",E" if longitude >= 0 else ",W")
+                  for longitude in columns.longitudes]
+    # Speed in knots. 1 knot = 1.852 kilometers per hour
+    knots = [speed / 1.852 for speed in speeds]
+
+    rmcSentences = [GPRMC_TEMPLATE % values
+                    for values in zip(timeStrings, latStrings, lonStrings, knots, bearings, dateStrings)]
+    ggaSentences = [GPGGA_TEMPLATE % values for values in zip(timeStrings, latStrings, lonStrings, columns.altitudes)]
+    rmcChecksums = nmeaChecksums(rmcSentences)
+    ggaChecksums = nmeaChecksums(ggaSentences)
+    lines = []
+    for rmc, rmcChecksum, gga, ggaChecksum in zip(rmcSentences, rmcChecksums, ggaSentences, ggaChecksums):
+        lines.append(rmc + rmcChecksum + "\n" + gga + ggaChecksum + "\n")
+    return lines
+
+def createNmeaFile(tkfiles, outputFile, tolerance = None):
     """
     Create nmea file.
     
+    The sentences are created track by track and every track is written as a single block.
+    
     @param tkfiles: A list of TK files with track data.
     @param outputFile: The nmea file handle.
+    @param tolerance: The simplification tolerance in metres (see L{Track.simplify()}); None to write all
+                      trackpoints.
+    @return: Tupel of the original and the written trackpoint count.
     """
+    count = 0
+    kept = 0
     for tkfile in tkfiles:
         for track in tkfile.tracks():
-            previousPoint = None
-            for trackpoint in track.trackpoints():
-                values = {}
-                dateTime = trackpoint.getDateTime()
-                values["dateString"] = dateTime.strftime('%d%m%y')
-                values["timeString"] = dateTime.strftime('%H%M%S')
-                latitude = trackpoint.getLatitude()
-                longitude = trackpoint.getLongitude()
-                values["lat"] = int(latitude)
-                values["lon"] = int(longitude)
-                values["altitude"] = trackpoint.getAltitude()
-                values["speed"] = 0
-                values["bearing"] = 0
-                if previousPoint:
-                    distance, values["bearing"] = calculateVincentyDistance(previousPoint.getLatitude(),
-                                                                            previousPoint.getLongitude(),
-                                                                            latitude, longitude)
-                    timedelta = dateTime - previousPoint.getDateTime()
-                    time = timedelta.days * 24 * 60 * 60 + timedelta.seconds
-                    if time != 0:
-                        # Speed in knots. 1 knot = 1.852 kilometers per hour
-                        values["speed"] = distance / (time / float(60*60)) / 1.852 
-                values["latMinutes"] = (latitude - int(latitude)) * 60.0
-                values["lonMinutes"] = (longitude - int(longitude)) * 60.0
-                values["ns"] = "N" if latitude >= 0 else "S"
-                values["ew"] = "E" if longitude >= 0 else "W"
-                line = GPRMC_TEMPLATE % values
-                outputFile.write(line + nmeaChecksum(line) + "\n")
-                line = GPGGA_TEMPLATE % values
-                outputFile.write(line + nmeaChecksum(line) + "\n")
-                previousPoint = trackpoint
+            count += track.getTrackPointCount()
+            if tolerance:
+                track = track.simplify(tolerance)
+            kept += track.getTrackPointCount()
+            outputFile.write("".join(createNmeaSentences(track)))
+    return count, kept
+
+class PtyEndpoint:
+    """
+    Replay endpoint writing sentences to a pseudo terminal.
+    
+    Like a gps device on a serial port, sentences are dropped while nobody reads the terminal,
+    unless the endpoint is blocking. A sentence is either written completely or dropped completely.
+    """
+
+    def __init__(self, blocking):
+        """
+        Constructor.
+        
+        @param blocking: True if writes should wait for the reader; False if sentences should be dropped.
+        """
+        import tty # pylint: disable-msg=C0415
+        self.master, self.slave = os.openpty()
+        tty.setraw(self.slave)
+        os.set_blocking(self.master, blocking)
+        self.name = os.ttyname(self.slave)
+        self.pending = b""
+
+    def getName(self):
+        """
+        Get the device name of the pseudo terminal.
+        
+        @return: The device name.
+        """
+        return self.name
+
+    def poll(self):
+        """
+        Write the rest of a partially written sentence.
+        """
+        self.flush()
+
+    def flush(self):
+        """
+        Write the pending data, which the reader didn't take yet.
+        
+        @return: True if all data is written; False otherwise.
+        """
+        while self.pending:
+            try:
+                written = os.write(self.master, self.pending)
+            except BlockingIOError:
+                return False
+            self.pending = self.pending[written:]
+        return True
+
+    def write(self, data):
+        """
+        Write data to the pseudo terminal. The data is dropped, if the previous data isn't written completely.
+        
+        @param data: The data as array of bytes.
+        """
+        if self.flush():
+            self.pending = data
+            self.flush()
+
+    def close(self):
+        """
+        Close the pseudo terminal.
+        """
+        os.close(self.master)
+        os.close(self.slave)
+
+class TcpEndpoint:
+    """
+    Replay endpoint sending sentences to all clients connected to a local TCP port.
+    
+    Sentences are dropped for clients which can't keep up with the replay, unless the endpoint is blocking.
+    A sentence is either sent completely or dropped completely. Clients closing the connection are removed.
+    """
+
+    def __init__(self, host, port, blocking):
+        """
+        Constructor.
+        
+        @param host: The address to listen on.
+        @param port: The TCP port to listen on.
+        @param blocking: True if writes should wait for slow clients; False if slow clients should be dropped.
+        """
+        import socket # pylint: disable-msg=C0415
+        self.server = socket.create_server((host, port))
+        self.server.setblocking(False)
+        self.name = "%s:%i" % (host, port)
+        self.blocking = blocking
+        self.clients = {}
+
+    def getName(self):
+        """
+        Get the address of the endpoint.
+        
+        @return: The address as host:port.
+        """
+        return self.name
+
+    def poll(self):
+        """
+        Accept pending client connections and send the rest of partially sent sentences.
+        """
+        while True:
+            try:
+                client, _ = self.server.accept()
+            except BlockingIOError:
+                break
+            client.setblocking(self.blocking)
+            self.clients[client] = b""
+        for client in list(self.clients.keys()):
+            self.send(client, None)
+
+    def send(self, client, data):
+        """
+        Send the pending data and new data to a client. The new data is dropped, if the pending data can't be sent
+        completely. The client is removed, if the connection fails.
+        
+        @param client: The client socket.
+        @param data: The new data as array of bytes or None.
+        """
+        try:
+            while True:
+                pending = self.clients[client]
+                if not pending:
+                    if data == None:
+                        return
+                    pending, data = data, None
+                self.clients[client] = pending[client.send(pending):]
+        except BlockingIOError:
+            pass
+        except OSError:
+            client.close()
+            del self.clients[client]
+
+    def write(self, data):
+        """
+        Send data to all connected clients.
+        
+        @param data: The data as array of bytes.
+        """
+        for client in list(self.clients.keys()):
+            self.send(client, data)
+
+    def close(self):
+        """
+        Close the server and all client connections.
+        """
+        for client in self.clients:
+            client.close()
+        self.server.close()
+
+def createReplayEndpoint(target, index, blocking):
+    """
+    Create the replay endpoint for an input file.
+    
+    @param target: The replay target: "pty" or "tcp:[host:]port".
+    @param index: The index of the input file; added to the TCP port.
+    @param blocking: True if the endpoint should wait for its readers.
+    @return: The endpoint; None if the target is invalid.
+    """
+    if target == "pty":
+        return PtyEndpoint(blocking)
+    match = re.match(r"^tcp:(?:(.*):)?([0-9]+)$", target)
+    if match:
+        return TcpEndpoint(match.group(1) or "localhost", int(match.group(2)) + index, blocking)
+    return None
+
+def nmeaStream(tkfile):
+    """
+    A generator which iterates over the NMEA sentences of a TK file.
+    
+    @param tkfile: The TK file.
+    @return: Next tupel of UTC time as seconds since the epoch and the sentences of a trackpoint.
+    """
+    for track in tkfile.tracks():
+        # Create the sentences in small chunks, so the replay of other files isn't delayed by long tracks.
+        # Every chunk starts with the last point of the previous chunk to get its speed and bearing right.
+        for chunkStart in range(0, track.getTrackPointCount(), REPLAY_CHUNK):
+            overlap = 1 if chunkStart > 0 else 0
+            count = min(REPLAY_CHUNK, track.getTrackPointCount() - chunkStart) + overlap
+            chunk = Track(track.trackdata, track.trackdataStart + (chunkStart - overlap) * Trackpoint.TRACKPOINTLEN,
+                          count, 0, 0, track.timezone, False)
+            timestamps = chunk.getColumns().timestamps[overlap:]
+            for timestamp, line in zip(timestamps, createNmeaSentences(chunk)[overlap:]):
+                yield timestamp, line.replace("\n", "\r\n").encode("ascii")
+
+def waitUntil(deadline, endpoints):
+    """
+    Wait for the deadline with low jitter.
+    
+    The endpoints are polled while sleeping. The last L{SPIN_TIME} seconds before the deadline are spent in a
+    busy loop, as sleeping is not precise enough for high replay speeds.
+    
+    @param deadline: The deadline as L{perf_counter()} value.
+    @param endpoints: The replay endpoints.
+    """
+    while True:
+        for endpoint in endpoints:
+            endpoint.poll()
+        remaining = deadline - perf_counter()
+        if remaining <= SPIN_TIME:
+            break
+        sleep(min(remaining - SPIN_TIME, POLL_INTERVAL))
+    while perf_counter() < deadline:
+        pass
+
+def replayNmea(tkfiles, endpoints, speed):
+    """
+    Replay the NMEA sentences of TK files in real time.
+    
+    Every TK file is replayed to its own endpoint. A single scheduler orders the sentences of all files by their
+    deadline, which is the time since the first trackpoint of the file divided by the speed factor.
+    
+    @param tkfiles: A list of TK files with track data.
+    @param endpoints: A list of replay endpoints, one for every TK file.
+    @param speed: The speed factor; 0 to replay as fast as possible.
+    @return: Tupel of the number of replayed trackpoints and the maximum lateness in seconds.
+    """
+    # pylint: disable-msg=R0914
+    streams = []
+    for index, (tkfile, endpoint) in enumerate(zip(tkfiles, endpoints)):
+        stream = nmeaStream(tkfile)
+        first = next(stream, None)
+        if first != None:
+            streams.append((index, first[0], first[1], stream, endpoint))
+    start = perf_counter()
+    queue = [(start,) + stream for stream in streams]
+    heapq.heapify(queue)
+    count = 0
+    maxLateness = 0.0
+    while queue:
+        deadline, index, origin, data, stream, endpoint = queue[0]
+        if speed:
+            waitUntil(deadline, endpoints)
+            maxLateness = max(maxLateness, perf_counter() - deadline)
+        else:
+            endpoint.poll()
+        endpoint.write(data)
+        count += 1
+        following = next(stream, None)
+        if following == None:
+            heapq.heappop(queue)
+        else:
+            deadline = start + (following[0] - origin) / speed if speed else start
+            heapq.heapreplace(queue, (deadline, index, origin, following[1], stream, endpoint))
+    return count, maxLateness
 
 def usage():
     """
@@ -180,9 +527,19 @@ def usage():
     executable = os.path.split(sys.argv[0])[1]
     print("%s Version %s (C) 2008 Steffen Siebert <siebert@steffensiebert.de>" % (executable, VERSION))
     print("Convert gps tracklogs from Wintec TK files into a single NMEA-0183 file.\n")
-    print("Usage: %s [-d outputdir] [-o filename] <tk files>" % executable)
+    print("Usage: %s [-d outputdir] [-o filename] [-z gz|xz|zst] [--threads n] [--simplify metres]\n"
+          "       [--force] <tk files>" % executable)
+    print("       %s --replay pty|tcp:[host:]port [--speed factor|--fast] <tk files>" % executable)
     print("-d: Use output directory.")
-    print("-o: Use output filename.")
+    print("-o: Use output filename; the extension .gz, .xz or .zst selects the compression.")
+    print("-z: Compress the output file with gzip, xz or zstandard.")
+    print("--threads: Number of compression threads (default: 1); 0 uses all processors.")
+    print("--simplify: Remove trackpoints deviating less than the given metres from the simplified track.")
+    print("--force: Convert even if the files and options are unchanged since the last conversion.")
+    print("--replay: Replay the sentences in real time to a pseudo terminal or to clients of a local TCP port.")
+    print("          Every file gets its own pseudo terminal or the next TCP port.")
+    print("--speed: Replay speed factor (default: 1).")
+    print("--fast: Replay as fast as possible and wait for the readers.")
 
 def main():
     """
@@ -191,9 +548,17 @@ def main():
     # pylint: disable-msg=R0912
     outputDir = None
     filename = None
+    replayTarget = None
+    speed = 1.0
+    fast = False
+    compression = None
+    threads = 1
+    tolerance = None
+    force = False
     
     try:
-        opts, args = getopt.getopt(sys.argv[1:], "?hd:o:")
+        opts, args = getopt.getopt(sys.argv[1:], "?hd:o:z:", ["replay=", "speed=", "fast", "threads=",
+                                                                     "simplify=", "force"])
     except getopt.GetoptError:
         # print help information and exit:
         usage()
@@ -210,39 +575,109 @@ def main():
             outputDir = a
         if o == "-o":
             filename = a
+        if o == "-z":
+            compression = a
+            if compression not in COMPRESSION_EXTENSIONS:
+                print("Unknown compression %s!" % compression)
+                sys.exit(5)
+        if o == "--threads":
+            threads = int(a)
+        if o == "--simplify":
+            tolerance = float(a)
+            if tolerance <= 0:
+                print("The simplification tolerance must be greater than 0!")
+                sys.exit(5)
+        if o == "--replay":
+            replayTarget = a
+        if o == "--speed":
+            speed = float(a)
+            if speed <= 0:
+                print("The replay speed factor must be greater than 0!")
+                usage()
+                sys.exit(5)
+        if o == "--fast":
+            fast = True
+        if o == "--force":
+            force = True
+
+    if (compression == "zst" or (filename and getCompression(filename) == "zst")) and importZstandard() == None:
+        print("zst compression needs zstandard (pip install zstandard)!")
+        sys.exit(5)
 
     if outputDir and not os.path.exists(outputDir):
         print("Output directory %s doesn't exist!" % outputDir)
         sys.exit(3)
 
-    tkfiles = []
+    references = []
     for arg in args:
-        for tkFileName in glob(arg):
-            tkfiles.append(readTKFile(tkFileName))
+        for tkFileName in globTKFiles(arg):
+            reference = TKFileReference(tkFileName)
+            if not reference.isValid():
+                print("%s is not a valid TK file!" % tkFileName)
+                continue
+            references.append(reference)
+    if len(references) == 0:
+        print("No TK files found!")
+        sys.exit(1)
 
-    tkfiles.sort(key=lambda x: x.getFirstTrackpoint().getDateTime())
+    references.sort(key=lambda x: x.getFirstTrackpoint().getDateTime())
+    tkfiles = TKTrackMerge(references)
+
+    if replayTarget:
+        endpoints = []
+        try:
+            for index, reference in enumerate(references):
+                endpoint = createReplayEndpoint(replayTarget, index, fast)
+                if endpoint == None:
+                    print("Replay target %s doesn't match pty or tcp:[host:]port!" % replayTarget)
+                    sys.exit(5)
+                print("Replay %s on %s" % (reference.getFileName(), endpoint.getName()))
+                endpoints.append(endpoint)
+            count, maxLateness = replayNmea([reference.load() for reference in references], endpoints,
+                                            0 if fast else speed)
+            print("Replayed %i trackpoints, maximum lateness %.3fms" % (count, maxLateness * 1000))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            for endpoint in endpoints:
+                endpoint.close()
+        return
     
+    cache = ConversionCache(force = force)
+    # The number of compression threads doesn't change the output.
+    options = [(o, a) for o, a in opts if o not in ("--force", "--threads")]
+    outputFile = None
+    if len(tkfiles) > 1:
+        dateString = tkfiles[0].getFirstTrackpoint().getDateTimeString()
+        dateString2 = tkfiles[-1].getFirstTrackpoint().getDateTimeString()
+        template, value = '%s-%s#%03i.nmea', (dateString, dateString2, len(tkfiles))
+    elif tkfiles[0].getFileClass() == TK1File:
+        dateString = tkfiles[0].getFirstTrackpoint().getDateTimeString()
+        dateString2 = tkfiles[0].getLastTrackpoint().getDateTimeString()
+        template, value = '%s-%s#%03i.nmea', (dateString, dateString2, tkfiles[0].getTrackCount())
+    else:
+        dateString = tkfiles[0].getFirstTrackpoint().getDateTimeString(DATETIME_FILENAME_TEMPLATE)
+        template, value = '%s.nmea', dateString
+
+    outputName = getOutputFileName(outputDir, filename, template, value, compression)
+    cacheKey = "tktonmea:%s" % os.path.abspath(outputName)
+    inputNames = [reference.getFileName() for reference in references]
+    if cache.isUnchanged(cacheKey, options, inputNames):
+        print("%s is up to date, skipped." % outputName)
+        cache.close()
+        return
+
     try:
-        if len(tkfiles) > 1:
-            dateString = tkfiles[0].getFirstTrackpoint().getDateTimeString()
-            dateString2 = tkfiles[-1].getFirstTrackpoint().getDateTimeString()
-            outputFile = createOutputFile(outputDir, filename, '%s-%s#%03i.nmea', (dateString, dateString2,
-                                                                                  len(tkfiles)))
-        else:
-            if isinstance(tkfiles[0], TK1File):
-                dateString = tkfiles[0].getFirstTrackpoint().getDateTimeString()
-                dateString2 = tkfiles[0].getLastTrackpoint().getDateTimeString()
-                outputFile = createOutputFile(outputDir, filename, '%s-%s#%03i.nmea', (dateString, dateString2,
-                                                                                      tkfiles[0].getTrackCount()))
-            else:
-                dateString = tkfiles[0].getFirstTrackpoint().getDateTimeString(DATETIME_FILENAME_TEMPLATE)
-                outputFile = createOutputFile(outputDir, filename, '%s.nmea', dateString)
-        if outputFile == None:
-            return
-        createNmeaFile(tkfiles, outputFile)
+        outputFile = createOutputFile(outputDir, filename, template, value, buffering = OUTPUT_BUFFER_SIZE,
+                                      compression = compression, threads = threads)
+        count, kept = createNmeaFile(tkfiles, outputFile, tolerance)
+        if tolerance:
+            print("Simplified %i trackpoints to %i (%.1f%%)" % (count, kept, 100.0 * kept / count if count else 100.0))
     finally:
         if outputFile != None:
             outputFile.close()
+    cache.update(cacheKey, options, inputNames, [outputName])
+    cache.close()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,209 @@
+#################################################################################
+##
+## tktosqlite.py - Load Wintec TK files into a SQLite database for ad-hoc queries.
+##
+## Copyright (c) 2026 The Wintec Tools contributors
+##
+#################################################################################
+##
+## This program is free software; you can redistribute it and/or modify
+## it under the terms of the GNU General Public License as published by
+## the Free Software Foundation; either version 2 of the License, or
+## (at your option) any later version.
+##
+## This program is distributed in the hope that it will be useful,
+## but WITHOUT ANY WARRANTY; without even the implied warranty of
+## MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+## GNU General Public License for more details.
+##
+## You should have received a copy of the GNU General Public License
+## along with this program; if not, write to the Free Software
+## Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA
+##
+#################################################################################
+## Requirements                                                                ##
+#################################################################################
+##
+## Python 3.10 or later:
+## <http://www.python.org>
+##
+#################################################################################
+## Program information:                                                        ##
+#################################################################################
+##
+## - Tables: files (one row per TK file with its SHA-256 content hash),
+##   tracks (footer values and time range of every track) and points.
+## - The points are indexed by time (points_time) and by position
+##   (R*Tree points_rtree, joined by id).
+## - Files are identified by content, loading a file twice or under another
+##   name doesn't add it again.
+##
+#################################################################################
+## Support                                                                     ##
+#################################################################################
+##
+## The latest version of the wintec tools is available on Github
+## <https://github.com/BlinxFox/WintecTools>
+##
+## If you have bug reports, patches or some questions, please create an
+## issue on Github:
+## <https://github.com/BlinxFox/WintecTools>
+##
+#################################################################################
+
+"""
+Load Wintec TK files into a SQLite database for ad-hoc queries.
+"""
+
+import getopt
+import hashlib
+import io
+import os
+import sqlite3
+import sys
+
+from winteclib import VERSION, FILEMARKERLEN, Trackpoint, getTKFileClass, globTKFiles, openTKFile
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (id INTEGER PRIMARY KEY, name TEXT, hash TEXT UNIQUE, device_name TEXT,
+    device_info TEXT, device_serial TEXT, log_version REAL, track_count INTEGER, trackpoint_count INTEGER);
+CREATE TABLE IF NOT EXISTS tracks (id INTEGER PRIMARY KEY, file_id INTEGER REFERENCES files (id),
+    track_number INTEGER, start_time INTEGER, end_time INTEGER, trackpoint_count INTEGER, duration INTEGER,
+    length REAL, pushpoint_count INTEGER);
+CREATE TABLE IF NOT EXISTS points (id INTEGER PRIMARY KEY, track_id INTEGER REFERENCES tracks (id), time INTEGER,
+    latitude REAL, longitude REAL, altitude INTEGER, flags INTEGER, temperature INTEGER, pressure INTEGER);
+CREATE VIRTUAL TABLE IF NOT EXISTS points_rtree USING rtree (id, min_lat, max_lat, min_lon, max_lon);
+CREATE INDEX IF NOT EXISTS tracks_file ON tracks (file_id);
+CREATE INDEX IF NOT EXISTS tracks_time ON tracks (start_time);
+CREATE INDEX IF NOT EXISTS points_track ON points (track_id);
+CREATE INDEX IF NOT EXISTS points_time ON points (time);
+"""
+
+def decodeText(value):
+    """
+    Decode a header string of a TK file.
+    
+    @param value: The header string as bytes.
+    @return: The string.
+    """
+    return value.decode("latin-1")
+
+def loadFile(connection, fileName):
+    """
+    Load a TK file into the database, unless a file with the same content is already loaded.
+    
+    @param connection: The database connection.
+    @param fileName: The name of the TK file.
+    @return: The number of loaded trackpoints; None if the file isn't a valid TK file; 0 if it is already loaded.
+    """
+    # pylint: disable-msg=R0914
+    f, offset, length = openTKFile(fileName)
+    f.seek(offset)
+    data = f.read(length)
+    f.close()
+    fileClass = getTKFileClass(data[:FILEMARKERLEN])
+    if fileClass == None:
+        return None
+    contentHash = hashlib.sha256(data).hexdigest()
+    if connection.execute("SELECT id FROM files WHERE hash = ?", (contentHash,)).fetchone():
+        return 0
+    tkfile = fileClass()
+    tkfile.read(io.BytesIO(data))
+    logVersion = tkfile.getLogVersion()
+    fileId = connection.execute("INSERT INTO files (name, hash, device_name, device_info, device_serial, "
+                                "log_version) VALUES (?, ?, ?, ?, ?, ?)",
+                                (os.path.basename(fileName), contentHash, decodeText(tkfile.getDeviceName()),
+                                 decodeText(tkfile.getDeviceInfo()), decodeText(tkfile.getDeviceSerial()),
+                                 logVersion)).lastrowid
+    pointId = connection.execute("SELECT COALESCE(MAX(id), 0) FROM points").fetchone()[0] + 1
+    trackCount = 0
+    trackpointCount = 0
+    for trackNumber, track in enumerate(tkfile.tracks()):
+        columns = track.getColumns()
+        count = len(columns)
+        if count == 0:
+            continue
+        types = columns.types
+        trackId = connection.execute("INSERT INTO tracks (file_id, track_number, start_time, end_time, "
+                                     "trackpoint_count, duration, length, pushpoint_count) "
+                                     "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                                     (fileId, trackNumber, columns.timestamps[0], columns.timestamps[-1], count,
+                                      track.getTrackDuration(), track.getTrackLength(),
+                                      sum([1 for pointType in types if pointType & Trackpoint.LOGPOINT]))).lastrowid
+        ids = range(pointId, pointId + count)
+        latitudes = [latitude / 10000000.0 for latitude in columns.latitudes]
+        longitudes = [longitude / 10000000.0 for longitude in columns.longitudes]
+        if logVersion == 2.0:
+            temperatures = [((pointType & 0x007c) >> 2) * 2 - 10 for pointType in types]
+            pressures = [((pointType & 0xff80) >> 7) + 589 for pointType in types]
+            flags = [pointType & 0x0003 for pointType in types]
+        else:
+            temperatures = pressures = [None] * count
+            flags = types
+        connection.executemany("INSERT INTO points VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                               zip(ids, [trackId] * count, columns.timestamps, latitudes, longitudes,
+                                   columns.altitudes, flags, temperatures, pressures))
+        connection.executemany("INSERT INTO points_rtree VALUES (?, ?, ?, ?, ?)",
+                               zip(ids, latitudes, latitudes, longitudes, longitudes))
+        pointId += count
+        trackCount += 1
+        trackpointCount += count
+    connection.execute("UPDATE files SET track_count = ?, trackpoint_count = ? WHERE id = ?",
+                       (trackCount, trackpointCount, fileId))
+    return trackpointCount
+
+def usage():
+    """
+    Print program usage.
+    """
+    executable = os.path.split(sys.argv[0])[1]
+    print("%s Version %s (C) 2026 The Wintec Tools contributors" % (executable, VERSION))
+    print("Load Wintec TK files into a SQLite database for ad-hoc queries.\n")
+    print("Usage: %s -o database <tk files>" % executable)
+    print("-o: SQLite database; new files are added to an existing database.")
+
+def main():
+    """
+    The main method.
+    """
+    databaseName = None
+
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], "?ho:")
+    except getopt.GetoptError:
+        # print help information and exit:
+        usage()
+        sys.exit(2)
+
+    for o, a in opts:
+        if o in ("-h", "-?"):
+            usage()
+            sys.exit()
+        if o == "-o":
+            databaseName = a
+
+    if databaseName == None or len(args) == 0:
+        usage()
+        sys.exit(1)
+
+    connection = sqlite3.connect(databaseName)
+    try:
+        connection.execute("PRAGMA journal_mode = WAL")
+        connection.execute("PRAGMA synchronous = NORMAL")
+        connection.executescript(SCHEMA)
+        for arg in args:
+            for tkFileName in globTKFiles(arg):
+                # Every file is loaded in its own transaction, so an interrupted run can simply be repeated.
+                with connection:
+                    count = loadFile(connection, tkFileName)
+                if count == None:
+                    print("%s is not a valid TK file!" % tkFileName)
+                elif count == 0:
+                    print("%s is already loaded, skipped." % tkFileName)
+                else:
+                    print("Load %s (%i trackpoints)" % (tkFileName, count))
+    finally:
+        connection.close()
+
+if __name__ == "__main__":
+    main()
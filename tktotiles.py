@@ -0,0 +1,652 @@
+#################################################################################
+##
+## tktotiles.py - Convert Wintec TK files into Mapbox vector tiles (MBTiles).
+##
+## Copyright (c) 2026 The Wintec Tools contributors
+##
+#################################################################################
+##
+## This program is free software; you can redistribute it and/or modify
+## it under the terms of the GNU General Public License as published by
+## the Free Software Foundation; either version 2 of the License, or
+## (at your option) any later version.
+##
+## This program is distributed in the hope that it will be useful,
+## but WITHOUT ANY WARRANTY; without even the implied warranty of
+## MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+## GNU General Public License for more details.
+##
+## You should have received a copy of the GNU General Public License
+## along with this program; if not, write to the Free Software
+## Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA
+##
+#################################################################################
+## Requirements                                                                ##
+#################################################################################
+##
+## Python 3.10 or later:
+## <http://www.python.org>
+##
+#################################################################################
+## Program information:                                                        ##
+#################################################################################
+##
+## - The tracks are projected to Web Mercator, simplified for every zoom
+##   level and cut into lines of the layer "tracks" with the properties
+##   file, track, time (UTC start time of the track) and source (the id of
+##   the converted file).
+## - The tiles are gzip compressed Mapbox vector tiles (version 2) in an
+##   MBTiles 1.3 SQLite file.
+## - The absolute paths and content hashes of the converted files are stored
+##   in the table wintec_sources. Running tktotiles.py again adds only new
+##   files and extends the existing tiles; the tracks of changed files are
+##   replaced.
+##
+#################################################################################
+## Support                                                                     ##
+#################################################################################
+##
+## The latest version of the wintec tools is available on Github
+## <https://github.com/BlinxFox/WintecTools>
+##
+## If you have bug reports, patches or some questions, please create an
+## issue on Github:
+## <https://github.com/BlinxFox/WintecTools>
+##
+#################################################################################
+
+"""
+Convert Wintec TK files into Mapbox vector tiles (MBTiles).
+"""
+
+import getopt
+import json
+import multiprocessing
+import os
+import sqlite3
+import sys
+from time import gmtime, strftime
+import zlib
+
+from winteclib import VERSION, TKFileReference, compressOutputBlock, globTKFiles, hashTKFile, projectToMercator, \
+    rankPolyline
+
+TILES_LAYER = "tracks"
+""" The name of the vector tile layer. """
+
+BATCH_SIZE = 32
+""" The number of files converted before the tiles are written, which limits the memory usage. """
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS metadata (name TEXT, value TEXT);
+CREATE TABLE IF NOT EXISTS tiles (zoom_level INTEGER, tile_column INTEGER, tile_row INTEGER, tile_data BLOB);
+CREATE UNIQUE INDEX IF NOT EXISTS tile_index ON tiles (zoom_level, tile_column, tile_row);
+CREATE TABLE IF NOT EXISTS wintec_sources (source INTEGER PRIMARY KEY, path TEXT UNIQUE, hash TEXT);
+"""
+
+TILE_EXTENT = 4096
+""" The coordinate range of a vector tile. """
+
+TILE_BUFFER = 64
+""" The width of the border in tile coordinates, which is included in a vector tile to avoid gaps at the edges. """
+
+def clipSegment(x0, y0, x1, y1, xmin, ymin, xmax, ymax):
+    """
+    Clip a line segment to a rectangle with the Liang-Barsky algorithm.
+    
+    @return: Tupel of the clipped start and end coordinates or None if the segment is outside of the rectangle.
+    """
+    # pylint: disable-msg=R0913
+    t0 = 0.0
+    t1 = 1.0
+    dx = x1 - x0
+    dy = y1 - y0
+    for p, q in ((-dx, x0 - xmin), (dx, xmax - x0), (-dy, y0 - ymin), (dy, ymax - y0)):
+        if p == 0:
+            if q < 0:
+                return None
+        else:
+            t = q / p
+            if p < 0:
+                if t > t1:
+                    return None
+                t0 = max(t0, t)
+            else:
+                if t < t0:
+                    return None
+                t1 = min(t1, t)
+    return x0 + t0 * dx, y0 + t0 * dy, x0 + t1 * dx, y0 + t1 * dy
+
+def cutTrack(xs, ys, importance, zoom, properties, tiles):
+    """
+    Simplify a track for a zoom level and cut it into vector tile lines.
+    
+    The track is simplified to the points with an importance (see L{rankPolyline()}) greater than one tile
+    coordinate unit. Every segment is clipped to the tiles it crosses, including the L{TILE_BUFFER}.
+    
+    @param xs: The x coordinates of the trackpoints from L{projectToMercator()}.
+    @param ys: The y coordinates of the trackpoints.
+    @param importance: The importance of the trackpoints in Mercator units.
+    @param zoom: The zoom level.
+    @param properties: The feature properties of the track.
+    @param tiles: A map of (zoom, x, y) tile keys and lists of features, a feature is a tupel of the properties and
+                  the list of lines; every line is a list of (x, y) tile coordinates.
+    """
+    # pylint: disable-msg=R0913,R0914
+    scale = float(TILE_EXTENT << zoom)
+    tolerance = 1 / scale
+    points = [(xs[index] * scale, ys[index] * scale) for index, value in enumerate(importance) if value > tolerance]
+    lines = {}
+    for (x0, y0), (x1, y1) in zip(points[:-1], points[1:]):
+        for tileX in range(int(min(x0, x1) - TILE_BUFFER) // TILE_EXTENT,
+                           int(max(x0, x1) + TILE_BUFFER) // TILE_EXTENT + 1):
+            for tileY in range(int(min(y0, y1) - TILE_BUFFER) // TILE_EXTENT,
+                               int(max(y0, y1) + TILE_BUFFER) // TILE_EXTENT + 1):
+                if not (0 <= tileX < 1 << zoom and 0 <= tileY < 1 << zoom):
+                    continue
+                left = tileX * TILE_EXTENT
+                top = tileY * TILE_EXTENT
+                clipped = clipSegment(x0 - left, y0 - top, x1 - left, y1 - top, -TILE_BUFFER, -TILE_BUFFER,
+                                      TILE_EXTENT + TILE_BUFFER, TILE_EXTENT + TILE_BUFFER)
+                if clipped == None:
+                    continue
+                start = (int(round(clipped[0])), int(round(clipped[1])))
+                end = (int(round(clipped[2])), int(round(clipped[3])))
+                tileLines = lines.setdefault((zoom, tileX, tileY), [])
+                if tileLines and tileLines[-1][-1] == start:
+                    if end != start:
+                        tileLines[-1].append(end)
+                else:
+                    tileLines.append([start, end])
+    for key, tileLines in lines.items():
+        tiles.setdefault(key, []).append((properties, tileLines))
+
+def encodeProtobufVarint(value):
+    """
+    Encode a non-negative integer as protocol buffers varint.
+    
+    @param value: The integer.
+    @return: The encoded integer as bytes.
+    """
+    data = bytearray()
+    while value >= 0x80:
+        data.append((value & 0x7f) | 0x80)
+        value >>= 7
+    data.append(value)
+    return bytes(data)
+
+def encodeProtobufField(field, value):
+    """
+    Encode a protocol buffers field.
+    
+    @param field: The field number.
+    @param value: An integer for varint fields; bytes for length delimited fields.
+    @return: The encoded field as bytes.
+    """
+    if isinstance(value, int):
+        return encodeProtobufVarint(field << 3) + encodeProtobufVarint(value)
+    return encodeProtobufVarint(field << 3 | 2) + encodeProtobufVarint(len(value)) + value
+
+def decodeProtobufFields(data):
+    """
+    A generator which iterates over the fields of a protocol buffers message.
+    
+    @param data: The encoded message.
+    @return: Next tupel of field number and value; an integer for varint fields, bytes for other fields.
+    """
+    pos = 0
+    while pos < len(data):
+        key, pos = decodeProtobufVarint(data, pos)
+        wireType = key & 0x07
+        if wireType == 0:
+            value, pos = decodeProtobufVarint(data, pos)
+        elif wireType == 2:
+            length, pos = decodeProtobufVarint(data, pos)
+            value = data[pos:pos + length]
+            pos += length
+        else:
+            length = 8 if wireType == 1 else 4
+            value = data[pos:pos + length]
+            pos += length
+        yield key >> 3, value
+
+def decodeProtobufVarint(data, pos):
+    """
+    Decode a protocol buffers varint.
+    
+    @param data: The encoded data.
+    @param pos: The position of the varint.
+    @return: Tupel of the value and the position after the varint.
+    """
+    value = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7f) << shift
+        if not byte & 0x80:
+            return value, pos
+        shift += 7
+
+def encodeVectorTileValue(value):
+    """
+    Encode a feature property value as Mapbox vector tile value message.
+    
+    @param value: A string or an integer.
+    @return: The encoded value message.
+    """
+    if isinstance(value, str):
+        return encodeProtobufField(1, value.encode("utf-8"))
+    return encodeProtobufField(6, value << 1 if value >= 0 else ((-value) << 1) - 1)
+
+class VectorTileLayer:
+    """
+    This class builds a layer of a Mapbox vector tile (version 2) with line features.
+    
+    The property values are kept as encoded value messages, so the layers of existing tiles can be extended
+    without decoding the values, see L{decodeVectorTile()}.
+    """
+
+    def __init__(self, name, extent = TILE_EXTENT):
+        """
+        Constructor.
+        
+        @param name: The layer name.
+        @param extent: The coordinate range of the tile.
+        """
+        self.name = name
+        self.extent = extent
+        self.keys = []
+        self.keyIndex = {}
+        self.values = []
+        self.valueIndex = {}
+        self.features = []
+
+    def getTag(self, key, value):
+        """
+        Get the key and value indices of a property.
+        
+        @param key: The property name.
+        @param value: The encoded value message.
+        @return: List of key index and value index.
+        """
+        if key not in self.keyIndex:
+            self.keyIndex[key] = len(self.keys)
+            self.keys.append(key)
+        if value not in self.valueIndex:
+            self.valueIndex[value] = len(self.values)
+            self.values.append(value)
+        return [self.keyIndex[key], self.valueIndex[value]]
+
+    def addFeature(self, properties, lines):
+        """
+        Add a line feature.
+        
+        @param properties: A map of property names and string or integer values.
+        @param lines: A list of lines; every line is a list of (x, y) tile coordinates.
+        """
+        tags = []
+        for key in sorted(properties):
+            tags += self.getTag(key, encodeVectorTileValue(properties[key]))
+        geometry = []
+        cursorX = cursorY = 0
+        for line in lines:
+            if len(line) < 2:
+                continue
+            for index, (x, y) in enumerate(line):
+                if index == 0:
+                    geometry.append(1 | 1 << 3)
+                elif index == 1:
+                    geometry.append(2 | (len(line) - 1) << 3)
+                dx = x - cursorX
+                dy = y - cursorY
+                geometry.append(dx << 1 if dx >= 0 else ((-dx) << 1) - 1)
+                geometry.append(dy << 1 if dy >= 0 else ((-dy) << 1) - 1)
+                cursorX = x
+                cursorY = y
+        if geometry:
+            self.features.append((tags, b"".join(map(encodeProtobufVarint, geometry))))
+
+    def addEncodedFeature(self, keys, values, feature):
+        """
+        Add a feature of an encoded layer.
+        
+        @param keys: The keys of the encoded layer.
+        @param values: The encoded value messages of the encoded layer.
+        @param feature: The encoded feature message.
+        """
+        tags = []
+        geometry = b""
+        for field, value in decodeProtobufFields(feature):
+            if field == 2:
+                pos = 0
+                while pos < len(value):
+                    keyNumber, pos = decodeProtobufVarint(value, pos)
+                    valueNumber, pos = decodeProtobufVarint(value, pos)
+                    tags += self.getTag(keys[keyNumber], values[valueNumber])
+            elif field == 4:
+                geometry = value
+        self.features.append((tags, geometry))
+
+    def encode(self):
+        """
+        Encode the layer.
+        
+        @return: The encoded layer message.
+        """
+        data = [encodeProtobufField(15, 2), encodeProtobufField(1, self.name.encode("utf-8"))]
+        for tags, geometry in self.features:
+            feature = encodeProtobufField(2, b"".join(map(encodeProtobufVarint, tags)))
+            feature += encodeProtobufField(3, 2) + encodeProtobufField(4, geometry)
+            data.append(encodeProtobufField(2, feature))
+        data += [encodeProtobufField(3, key.encode("utf-8")) for key in self.keys]
+        data += [encodeProtobufField(4, value) for value in self.values]
+        data.append(encodeProtobufField(5, self.extent))
+        return b"".join(data)
+
+def encodeVectorTile(layers):
+    """
+    Encode a Mapbox vector tile.
+    
+    @param layers: A list of L{VectorTileLayer} objects.
+    @return: The encoded tile.
+    """
+    return b"".join([encodeProtobufField(3, layer.encode()) for layer in layers])
+
+def decodeVectorTile(data):
+    """
+    Decode the layers of a Mapbox vector tile.
+    
+    @param data: The encoded tile.
+    @return: A list of L{VectorTileLayer} objects.
+    """
+    layers = []
+    for field, layerData in decodeProtobufFields(data):
+        if field != 3:
+            continue
+        name = ""
+        extent = TILE_EXTENT
+        keys = []
+        values = []
+        features = []
+        for layerField, value in decodeProtobufFields(layerData):
+            if layerField == 1:
+                name = value.decode("utf-8")
+            elif layerField == 2:
+                features.append(value)
+            elif layerField == 3:
+                keys.append(value.decode("utf-8"))
+            elif layerField == 4:
+                values.append(bytes(value))
+            elif layerField == 5:
+                extent = value
+        layer = VectorTileLayer(name, extent)
+        for feature in features:
+            layer.addEncodedFeature(keys, values, feature)
+        layers.append(layer)
+    return layers
+
+def mergeBounds(bounds, other):
+    """
+    Merge two bounds.
+    
+    @param bounds: List of minimum longitude, minimum latitude, maximum longitude and maximum latitude or None.
+    @param other: The other bounds or None.
+    @return: The bounds containing both bounds.
+    """
+    if bounds == None or other == None:
+        return other if bounds == None else bounds
+    return [min(bounds[0], other[0]), min(bounds[1], other[1]), max(bounds[2], other[2]), max(bounds[3], other[3])]
+
+def cutFile(task):
+    """
+    Cut the tracks of a TK file into vector tile lines. Runs in a worker process.
+    
+    @param task: Tupel of file name, source id, minimum and maximum zoom level.
+    @return: Tupel of the map of tile keys and features (see L{cutTrack()}) and the bounds of the tracks as list of
+             minimum longitude, minimum latitude, maximum longitude and maximum latitude scaled by 1e7; None if the
+             file isn't a valid TK file.
+    """
+    fileName, source, minZoom, maxZoom = task
+    reference = TKFileReference(fileName)
+    if not reference.isValid():
+        return None
+    name = os.path.basename(fileName)
+    tiles = {}
+    bounds = None
+    for trackNumber, extent in enumerate(reference.getTrackExtents()):
+        columns = reference.readTrack(extent).getColumns()
+        if len(columns) < 2:
+            continue
+        bounds = mergeBounds(bounds, [min(columns.longitudes), min(columns.latitudes), max(columns.longitudes),
+                                      max(columns.latitudes)])
+        xs, ys = projectToMercator(columns.latitudes, columns.longitudes)
+        importance = rankPolyline(xs, ys)
+        properties = {"file": name, "track": trackNumber, "source": source,
+                      "time": strftime("%Y-%m-%dT%H:%M:%SZ", gmtime(columns.timestamps[0]))}
+        for zoom in range(minZoom, maxZoom + 1):
+            cutTrack(xs, ys, importance, zoom, properties, tiles)
+    return tiles, bounds
+
+def encodeTile(task):
+    """
+    Add features to a tile and encode it. Runs in a worker process.
+    
+    @param task: Tupel of tile key, the gzip compressed data of the existing tile or None and the list of features.
+    @return: Tupel of tile key and gzip compressed tile data.
+    """
+    key, existingData, features = task
+    layers = decodeVectorTile(zlib.decompress(existingData, 47)) if existingData else []
+    matches = [layer for layer in layers if layer.name == TILES_LAYER]
+    if matches:
+        layer = matches[0]
+    else:
+        layer = VectorTileLayer(TILES_LAYER)
+        layers.append(layer)
+    for properties, lines in features:
+        layer.addFeature(properties, lines)
+    return key, compressOutputBlock("gz", encodeVectorTile(layers))
+
+def writeTiles(connection, tiles, pool):
+    """
+    Write new features into the tiles of an MBTiles file.
+    
+    @param connection: The database connection.
+    @param tiles: The map of tile keys and new features.
+    @param pool: The worker process pool or None.
+    @return: The number of written tiles.
+    """
+    # The existing tiles are read before the workers start, the connection can't be used by the pool threads.
+    tasks = []
+    for key, features in tiles.items():
+        zoom, tileX, tileY = key
+        row = connection.execute("SELECT tile_data FROM tiles WHERE zoom_level = ? AND tile_column = ? "
+                                 "AND tile_row = ?", (zoom, tileX, (1 << zoom) - 1 - tileY)).fetchone()
+        tasks.append((key, row[0] if row else None, features))
+
+    count = 0
+    results = pool.imap_unordered(encodeTile, tasks, 16) if pool else map(encodeTile, tasks)
+    for (zoom, tileX, tileY), data in results:
+        connection.execute("INSERT OR REPLACE INTO tiles VALUES (?, ?, ?, ?)",
+                           (zoom, tileX, (1 << zoom) - 1 - tileY, sqlite3.Binary(data)))
+        count += 1
+    return count
+
+def removeSources(connection, sources):
+    """
+    Remove the features of converted files from all tiles of an MBTiles file. Tiles without features are deleted.
+    
+    @param connection: The database connection.
+    @param sources: The set of source ids of the files.
+    """
+    keys = connection.execute("SELECT zoom_level, tile_column, tile_row FROM tiles").fetchall()
+    for key in keys:
+        data = connection.execute("SELECT tile_data FROM tiles WHERE zoom_level = ? AND tile_column = ? "
+                                  "AND tile_row = ?", key).fetchone()[0]
+        layers = decodeVectorTile(zlib.decompress(data, 47))
+        removed = False
+        for layer in layers:
+            if layer.name != TILES_LAYER or "source" not in layer.keyIndex:
+                continue
+            keyIndex = layer.keyIndex["source"]
+            valueIndices = set([layer.valueIndex[value] for value in map(encodeVectorTileValue, sources)
+                                if value in layer.valueIndex])
+            features = [(tags, geometry) for tags, geometry in layer.features
+                        if not any(tags[index] == keyIndex and tags[index + 1] in valueIndices
+                                   for index in range(0, len(tags), 2))]
+            removed = removed or len(features) != len(layer.features)
+            layer.features = features
+        if not removed:
+            continue
+        layers = [layer for layer in layers if layer.features]
+        if layers:
+            data = compressOutputBlock("gz", encodeVectorTile(layers))
+            connection.execute("UPDATE tiles SET tile_data = ? WHERE zoom_level = ? AND tile_column = ? "
+                               "AND tile_row = ?", (sqlite3.Binary(data),) + tuple(key))
+        else:
+            connection.execute("DELETE FROM tiles WHERE zoom_level = ? AND tile_column = ? AND tile_row = ?", key)
+
+def updateMetadata(connection, minZoom, maxZoom, bounds):
+    """
+    Update the metadata of an MBTiles file.
+    
+    @param connection: The database connection.
+    @param minZoom: The minimum zoom level.
+    @param maxZoom: The maximum zoom level.
+    @param bounds: The bounds of the new tracks (see L{cutFile()}) or None.
+    """
+    metadata = dict(connection.execute("SELECT name, value FROM metadata").fetchall())
+    if "bounds" in metadata:
+        oldBounds = [int(round(float(value) * 10000000)) for value in metadata["bounds"].split(",")]
+        bounds = mergeBounds(bounds, oldBounds)
+    if "minzoom" in metadata:
+        minZoom = min(minZoom, int(metadata["minzoom"]))
+        maxZoom = max(maxZoom, int(metadata["maxzoom"]))
+    metadata.update({"name": metadata.get("name", "Wintec tracks"), "format": "pbf", "type": "overlay",
+                     "version": "1.3", "minzoom": str(minZoom), "maxzoom": str(maxZoom),
+                     "json": json.dumps({"vector_layers": [{"id": TILES_LAYER, "minzoom": minZoom,
+                                                            "maxzoom": maxZoom,
+                                                            "fields": {"file": "String", "track": "Number",
+                                                                       "time": "String", "source": "Number"}}]})})
+    if bounds != None:
+        metadata["bounds"] = ",".join(["%.7f" % (value / 10000000.0) for value in bounds])
+    connection.execute("DELETE FROM metadata")
+    connection.executemany("INSERT INTO metadata VALUES (?, ?)", sorted(metadata.items()))
+
+def usage():
+    """
+    Print program usage.
+    """
+    executable = os.path.split(sys.argv[0])[1]
+    print("%s Version %s (C) 2026 The Wintec Tools contributors" % (executable, VERSION))
+    print("Convert Wintec TK files into Mapbox vector tiles (MBTiles).\n")
+    print("Usage: %s -o mbtiles [-z minzoom] [-Z maxzoom] [-j jobs] <tk files>" % executable)
+    print("-o: MBTiles output file; new and changed files are added to an existing MBTiles file.")
+    print("-z: Minimum zoom level (default: 0).")
+    print("-Z: Maximum zoom level (default: 14).")
+    print("-j, --jobs: Number of worker processes (default: 1).")
+
+def main():
+    """
+    The main method.
+    """
+    # pylint: disable-msg=R0912,R0914,R0915
+    outputFileName = None
+    minZoom = 0
+    maxZoom = 14
+    jobs = 1
+
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], "?ho:z:Z:j:", ["jobs="])
+    except getopt.GetoptError:
+        # print help information and exit:
+        usage()
+        sys.exit(2)
+
+    for o, a in opts:
+        if o in ("-h", "-?"):
+            usage()
+            sys.exit()
+        if o == "-o":
+            outputFileName = a
+        if o == "-z":
+            minZoom = int(a)
+        if o == "-Z":
+            maxZoom = int(a)
+        if o in ("-j", "--jobs"):
+            jobs = int(a)
+            if jobs < 1:
+                print("The number of jobs must be at least 1!")
+                sys.exit(5)
+
+    if outputFileName == None or len(args) == 0:
+        usage()
+        sys.exit(1)
+
+    if not 0 <= minZoom <= maxZoom <= 24:
+        print("The zoom levels must be in the range 0 to 24!")
+        sys.exit(5)
+
+    connection = sqlite3.connect(outputFileName)
+    connection.executescript(SCHEMA)
+    converted = dict([(path, (source, contentHash)) for source, path, contentHash
+                      in connection.execute("SELECT source, path, hash FROM wintec_sources")])
+    nextSource = max([source for source, _ in converted.values()] + [0]) + 1
+    replaced = set()
+    fileNames = []
+    for arg in args:
+        for tkFileName in globTKFiles(arg):
+            path = os.path.abspath(tkFileName)
+            try:
+                contentHash = hashTKFile(tkFileName)
+            except (IOError, AssertionError):
+                print("%s is not a valid TK file!" % tkFileName)
+                continue
+            if path in converted:
+                source, convertedHash = converted[path]
+                if convertedHash == contentHash:
+                    print("%s is already converted, skipped." % tkFileName)
+                    continue
+                if source != None:
+                    print("%s has changed, its tracks are replaced." % tkFileName)
+                    replaced.add(source)
+            converted[path] = (None, contentHash)
+            fileNames.append((tkFileName, path, contentHash, nextSource))
+            nextSource += 1
+
+    if replaced:
+        removeSources(connection, replaced)
+        connection.executemany("DELETE FROM wintec_sources WHERE source = ?", [(source,) for source in replaced])
+        connection.commit()
+
+    pool = multiprocessing.Pool(jobs) if jobs > 1 else None
+    try:
+        for batchStart in range(0, len(fileNames), BATCH_SIZE):
+            batch = fileNames[batchStart:batchStart + BATCH_SIZE]
+            tasks = [(fileName, source, minZoom, maxZoom) for fileName, _, _, source in batch]
+            tiles = {}
+            bounds = None
+            sources = []
+            for (fileName, path, contentHash, source), result in zip(batch, pool.imap(cutFile, tasks) if pool
+                                                                     else map(cutFile, tasks)):
+                if result == None:
+                    print("%s is not a valid TK file!" % fileName)
+                    continue
+                fileTiles, fileBounds = result
+                for key, features in fileTiles.items():
+                    tiles.setdefault(key, []).extend(features)
+                bounds = mergeBounds(bounds, fileBounds)
+                sources.append((source, path, contentHash))
+                print("Convert %s" % fileName)
+            count = writeTiles(connection, tiles, pool)
+            connection.executemany("INSERT INTO wintec_sources VALUES (?, ?, ?)", sources)
+            updateMetadata(connection, minZoom, maxZoom, bounds)
+            connection.commit()
+            print("Wrote %i tiles" % count)
+    finally:
+        if pool:
+            pool.close()
+            pool.join()
+        connection.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,498 @@
+#################################################################################
+##
+## tkwatch.py - Watch directories and run conversion pipelines on new Wintec TK files.
+##
+## Copyright (c) 2026 The Wintec Tools contributors
+##
+#################################################################################
+##
+## This program is free software; you can redistribute it and/or modify
+## it under the terms of the GNU General Public License as published by
+## the Free Software Foundation; either version 2 of the License, or
+## (at your option) any later version.
+##
+## This program is distributed in the hope that it will be useful,
+## but WITHOUT ANY WARRANTY; without even the implied warranty of
+## MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+## GNU General Public License for more details.
+##
+## You should have received a copy of the GNU General Public License
+## along with this program; if not, write to the Free Software
+## Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA
+##
+#################################################################################
+## Requirements                                                                ##
+#################################################################################
+##
+## Python 3.10 or later:
+## <http://www.python.org>
+##
+#################################################################################
+## Program information:                                                        ##
+#################################################################################
+##
+## - New and changed files are detected with inotify on Linux; other systems
+##   and --poll scan the directories periodically.
+## - Every pipeline step is a tool with its command line options, run in a
+##   pool of long-lived worker processes. Imported modules and the timezone
+##   cache of winteclib stay loaded between files.
+## - The metrics file is written in the Prometheus text format.
+##
+#################################################################################
+## Support                                                                     ##
+#################################################################################
+##
+## The latest version of the wintec tools is available on Github
+## <https://github.com/BlinxFox/WintecTools>
+##
+## If you have bug reports, patches or some questions, please create an
+## issue on Github:
+## <https://github.com/BlinxFox/WintecTools>
+##
+#################################################################################
+
+"""
+Watch directories and run conversion pipelines on new Wintec TK files.
+"""
+
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, wait
+import ctypes
+import ctypes.util
+import fnmatch
+import getopt
+import importlib
+import os
+import select
+import shlex
+import signal
+import struct
+import sys
+import time
+
+from winteclib import VERSION
+
+PIPELINE_TOOLS = ("tk1split", "tktogpx", "tktonmea", "tktosqlite")
+""" The tools usable as pipeline steps. """
+
+FILE_PATTERNS = ("*.tk1", "*.tk2", "*.tk3", "*.tk1.gz", "*.tk1.xz", "*.tk1.zst")
+""" The shell patterns of the watched files, compared case insensitive. """
+
+POLL_INTERVAL = 2.0
+""" The interval in seconds between two directory scans of the polling watcher. """
+
+METRICS_INTERVAL = 5.0
+""" The interval in seconds between two updates of the metrics file. """
+
+IN_CLOSE_WRITE = 0x00000008
+""" inotify event: a file opened for writing was closed. """
+
+IN_MOVED_TO = 0x00000080
+""" inotify event: a file was moved into the directory. """
+
+INOTIFY_EVENT = struct.Struct("iIII")
+""" The header of an inotify event: watch descriptor, mask, cookie and name length. """
+
+def isWatchedFile(fileName):
+    """
+    Test whether a file matches the L{FILE_PATTERNS}.
+    
+    @param fileName: The file name.
+    @return: True if the file is watched; False otherwise.
+    """
+    name = os.path.basename(fileName).lower()
+    return [pattern for pattern in FILE_PATTERNS if fnmatch.fnmatchcase(name, pattern)] != []
+
+def scanDirectories(directories):
+    """
+    Get size and modification time of all watched files.
+    
+    @param directories: The watched directories.
+    @return: A dictionary with the file name as key and tupel of size and modification time as value.
+    """
+    files = {}
+    for directory in directories:
+        for entry in os.scandir(directory):
+            if entry.is_file() and isWatchedFile(entry.name):
+                stat = entry.stat()
+                files[entry.path] = (stat.st_size, stat.st_mtime_ns)
+    return files
+
+class InotifyWatcher:
+    """
+    Watch directories with the Linux inotify interface. A file is reported when it is closed after writing or
+    moved into a watched directory, so files are never reported while they are still written.
+    """
+
+    def __init__(self, directories):
+        """
+        Constructor.
+        
+        @param directories: The directories to watch.
+        @raise OSError: If inotify isn't available.
+        """
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno = True)
+        if not hasattr(libc, "inotify_init1"):
+            raise OSError("inotify isn't available!")
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.directories = {}
+        for directory in directories:
+            wd = libc.inotify_add_watch(self.fd, os.fsencode(directory), IN_CLOSE_WRITE | IN_MOVED_TO)
+            if wd < 0:
+                os.close(self.fd)
+                raise OSError(ctypes.get_errno(), "inotify_add_watch failed for %s" % directory)
+            self.directories[wd] = directory
+
+    def wait(self, timeout):
+        """
+        Wait for new or changed files.
+        
+        @param timeout: The maximum time to wait in seconds.
+        @return: A list of file names.
+        """
+        fileNames = []
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return fileNames
+        try:
+            data = os.read(self.fd, 65536)
+        except BlockingIOError:
+            return fileNames
+        pos = 0
+        while pos < len(data):
+            wd, _, _, nameLength = INOTIFY_EVENT.unpack(data[pos:pos + INOTIFY_EVENT.size])
+            pos += INOTIFY_EVENT.size
+            name = os.fsdecode(data[pos:pos + nameLength].rstrip(b"\0"))
+            pos += nameLength
+            if wd in self.directories and isWatchedFile(name):
+                fileNames.append(os.path.join(self.directories[wd], name))
+        return fileNames
+
+    def close(self):
+        """
+        Stop watching.
+        """
+        os.close(self.fd)
+
+class PollingWatcher:
+    """
+    Watch directories by scanning them periodically. A new or changed file is reported, when its size and
+    modification time didn't change between two scans.
+    """
+
+    def __init__(self, directories, interval = POLL_INTERVAL):
+        """
+        Constructor.
+        
+        @param directories: The directories to watch.
+        @param interval: The interval in seconds between two scans.
+        """
+        self.directories = directories
+        self.interval = interval
+        self.files = scanDirectories(directories)
+        self.changed = {}
+        self.nextScan = time.time() + interval
+
+    def wait(self, timeout):
+        """
+        Wait for new or changed files.
+        
+        @param timeout: The maximum time to wait in seconds.
+        @return: A list of file names.
+        """
+        delay = self.nextScan - time.time()
+        if delay > timeout:
+            time.sleep(timeout)
+            return []
+        time.sleep(max(delay, 0))
+        self.nextScan = time.time() + self.interval
+        files = scanDirectories(self.directories)
+        fileNames = []
+        changed = {}
+        for fileName, state in files.items():
+            if self.files.get(fileName) == state:
+                continue
+            if self.changed.get(fileName) == state:
+                fileNames.append(fileName)
+                self.files[fileName] = state
+            else:
+                changed[fileName] = state
+        self.changed = changed
+        return fileNames
+
+    def close(self):
+        """
+        Stop watching.
+        """
+        pass
+
+class WatchMetrics:
+    """
+    This class collects queue depth, throughput and latency of the processed files.
+    """
+
+    def __init__(self):
+        """
+        Constructor.
+        """
+        self.queued = 0
+        self.running = 0
+        self.processed = 0
+        self.failed = 0
+        self.latencySum = 0.0
+        self.latencyMax = 0.0
+        self.processingSum = 0.0
+
+    def addResult(self, success, latency, processingTime):
+        """
+        Add the result of a processed file.
+        
+        @param success: True if all pipeline steps succeeded.
+        @param latency: The time in seconds from the arrival of the file to the end of the processing.
+        @param processingTime: The time in seconds spent in the pipeline.
+        """
+        self.processed += 1
+        if not success:
+            self.failed += 1
+        self.latencySum += latency
+        self.latencyMax = max(self.latencyMax, latency)
+        self.processingSum += processingTime
+
+    def format(self):
+        """
+        Format the metrics in the Prometheus text format.
+        
+        @return: The metrics as string.
+        """
+        lines = ["# TYPE tkwatch_queue_depth gauge", "tkwatch_queue_depth %i" % self.queued,
+                 "# TYPE tkwatch_running gauge", "tkwatch_running %i" % self.running,
+                 "# TYPE tkwatch_files_processed_total counter", "tkwatch_files_processed_total %i" % self.processed,
+                 "# TYPE tkwatch_files_failed_total counter", "tkwatch_files_failed_total %i" % self.failed,
+                 "# TYPE tkwatch_latency_seconds summary", "tkwatch_latency_seconds_sum %.6f" % self.latencySum,
+                 "tkwatch_latency_seconds_count %i" % self.processed,
+                 "# TYPE tkwatch_latency_seconds_max gauge", "tkwatch_latency_seconds_max %.6f" % self.latencyMax,
+                 "# TYPE tkwatch_processing_seconds summary",
+                 "tkwatch_processing_seconds_sum %.6f" % self.processingSum,
+                 "tkwatch_processing_seconds_count %i" % self.processed]
+        return "\n".join(lines) + "\n"
+
+    def write(self, fileName):
+        """
+        Write the metrics file. The file is replaced atomically.
+        
+        @param fileName: The name of the metrics file.
+        """
+        f = open(fileName + ".tmp", "w")
+        f.write(self.format())
+        f.close()
+        os.replace(fileName + ".tmp", fileName)
+
+def parseStep(step):
+    """
+    Parse a pipeline step.
+    
+    @param step: The tool name and its options, e.g. "tktogpx -d gpx".
+    @return: Tupel of tool name and list of options; None if the tool isn't a L{PIPELINE_TOOLS} tool.
+    """
+    arguments = shlex.split(step)
+    if len(arguments) == 0:
+        return None
+    tool = arguments[0]
+    if tool.endswith(".py"):
+        tool = tool[:-3]
+    if tool not in PIPELINE_TOOLS:
+        return None
+    return tool, arguments[1:]
+
+def stopWatching(signum, frame):
+    """
+    Signal handler stopping the daemon like Ctrl-C.
+    
+    @param signum: The signal number.
+    @param frame: The current stack frame.
+    """
+    raise KeyboardInterrupt
+
+def initWorker():
+    """
+    Import the pipeline tools once in every worker process. The workers are stopped by the daemon, not by signals.
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    for tool in PIPELINE_TOOLS:
+        importlib.import_module(tool)
+
+def runPipeline(task):
+    """
+    Run the pipeline steps for a single file in a worker process.
+    
+    Every step calls the main method of the tool with the options of the step and the file name as arguments.
+    tk1split is only run for .tk1 files.
+    
+    @param task: Tupel of the file name and the list of steps, see L{parseStep()}.
+    @return: Tupel of the file name, the list of failed tools and the processing time in seconds.
+    """
+    fileName, steps = task
+    startTime = time.time()
+    failed = []
+    for tool, options in steps:
+        if tool == "tk1split" and ".tk1" not in fileName.lower():
+            continue
+        module = importlib.import_module(tool)
+        argv = sys.argv
+        sys.argv = [tool + ".py"] + options + [fileName]
+        try:
+            module.main()
+        except SystemExit as exit:
+            if exit.code:
+                failed.append(tool)
+        except Exception as exception: # pylint: disable-msg=W0703
+            print("%s failed for %s: %s" % (tool, fileName, exception))
+            failed.append(tool)
+        finally:
+            sys.argv = argv
+        sys.stdout.flush()
+    return fileName, failed, time.time() - startTime
+
+def watch(watcher, steps, jobs, metricsFileName, initialFiles):
+    """
+    Process new and changed files until interrupted.
+    
+    Files are queued once; a file changed while it is processed is processed again afterwards.
+    At most jobs files are handed to the worker pool at a time.
+    
+    @param watcher: The L{InotifyWatcher} or L{PollingWatcher}.
+    @param steps: The list of pipeline steps, see L{parseStep()}.
+    @param jobs: The number of worker processes.
+    @param metricsFileName: The name of the metrics file or None.
+    @param initialFiles: The files to process at start.
+    """
+    # pylint: disable-msg=R0912
+    metrics = WatchMetrics()
+    queue = OrderedDict([(fileName, time.time()) for fileName in initialFiles])
+    running = {}
+    nextMetrics = 0
+    pool = ProcessPoolExecutor(jobs, initializer = initWorker)
+    try:
+        while True:
+            for fileName in watcher.wait(0.1 if running or queue else 1.0):
+                queue.setdefault(fileName, time.time())
+            for fileName in list(queue):
+                if len(running) >= jobs:
+                    break
+                if fileName in [task[0] for task in running.values()]:
+                    continue
+                arrival = queue.pop(fileName)
+                running[pool.submit(runPipeline, (fileName, steps))] = (fileName, arrival)
+            if running:
+                done, _ = wait(list(running), timeout = 0)
+                for future in done:
+                    fileName, arrival = running.pop(future)
+                    try:
+                        _, failed, processingTime = future.result()
+                    except Exception as exception: # pylint: disable-msg=W0703
+                        failed, processingTime = [str(exception)], 0.0
+                    latency = time.time() - arrival
+                    metrics.addResult(len(failed) == 0, latency, processingTime)
+                    if failed:
+                        print("Failed %s (%s)" % (fileName, ", ".join(failed)))
+                    else:
+                        print("Processed %s in %.2fs, latency %.2fs" % (fileName, processingTime, latency))
+            metrics.queued = len(queue)
+            metrics.running = len(running)
+            if metricsFileName and time.time() >= nextMetrics:
+                metrics.write(metricsFileName)
+                nextMetrics = time.time() + METRICS_INTERVAL
+            sys.stdout.flush()
+    finally:
+        watcher.close()
+        pool.shutdown(wait = True, cancel_futures = True)
+        if metricsFileName:
+            metrics.write(metricsFileName)
+
+def usage():
+    """
+    Print program usage.
+    """
+    executable = os.path.split(sys.argv[0])[1]
+    print("%s Version %s (C) 2026 The Wintec Tools contributors" % (executable, VERSION))
+    print("Watch directories and run conversion pipelines on new Wintec TK files.\n")
+    print("Usage: %s -p step [-p step ...] [-j jobs] [-m metricsfile] [--poll] [--existing] <directories>"
+          % executable)
+    print("-p: Pipeline step, the tool name and its options, e.g. -p 'tktogpx -d gpx'.")
+    print("    Tools: %s." % ", ".join(PIPELINE_TOOLS))
+    print("-j, --jobs: Number of worker processes (default: 1).")
+    print("-m: Write queue depth, throughput and latency to the metrics file (Prometheus text format).")
+    print("--poll: Scan the directories every %i seconds instead of using inotify." % POLL_INTERVAL)
+    print("--existing: Process the files already in the directories at start.")
+
+def main():
+    """
+    The main method.
+    """
+    # pylint: disable-msg=R0912
+    steps = []
+    jobs = 1
+    metricsFileName = None
+    poll = False
+    existing = False
+
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], "?hp:j:m:", ["jobs=", "poll", "existing"])
+    except getopt.GetoptError:
+        # print help information and exit:
+        usage()
+        sys.exit(2)
+
+    for o, a in opts:
+        if o in ("-h", "-?"):
+            usage()
+            sys.exit()
+        if o == "-p":
+            step = parseStep(a)
+            if step == None:
+                print("Unknown pipeline step %s!" % a)
+                sys.exit(5)
+            steps.append(step)
+        if o in ("-j", "--jobs"):
+            jobs = int(a)
+            if jobs < 1:
+                print("The number of jobs must be at least 1!")
+                sys.exit(5)
+        if o == "-m":
+            metricsFileName = a
+        if o == "--poll":
+            poll = True
+        if o == "--existing":
+            existing = True
+
+    if len(steps) == 0 or len(args) == 0:
+        usage()
+        sys.exit(1)
+
+    for directory in args:
+        if not os.path.isdir(directory):
+            print("Directory %s doesn't exist!" % directory)
+            sys.exit(3)
+
+    watcher = None
+    if not poll:
+        try:
+            watcher = InotifyWatcher(args)
+        except (OSError, AttributeError) as exception:
+            print("inotify isn't usable (%s), scanning the directories instead." % exception)
+    if watcher == None:
+        watcher = PollingWatcher(args)
+    initialFiles = sorted(scanDirectories(args)) if existing else []
+    print("Watching %s with %s" % (", ".join(args), watcher.__class__.__name__))
+    sys.stdout.flush()
+    signal.signal(signal.SIGTERM, stopWatching)
+    try:
+        watch(watcher, steps, jobs, metricsFileName, initialFiles)
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+#################################################################################
+##
+## wintec.py - Single entry point for the Wintec tools with fast startup.
+##
+## Copyright (c) 2026 The Wintec Tools contributors
+##
+#################################################################################
+##
+## This program is free software; you can redistribute it and/or modify
+## it under the terms of the GNU General Public License as published by
+## the Free Software Foundation; either version 2 of the License, or
+## (at your option) any later version.
+##
+## This program is distributed in the hope that it will be useful,
+## but WITHOUT ANY WARRANTY; without even the implied warranty of
+## MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+## GNU General Public License for more details.
+##
+## You should have received a copy of the GNU General Public License
+## along with this program; if not, write to the Free Software
+## Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA
+##
+#################################################################################
+## Requirements                                                                ##
+#################################################################################
+##
+## Python 3.10 or later:
+## <http://www.python.org>
+##
+#################################################################################
+## Program information:                                                        ##
+#################################################################################
+##
+## - wintec <subcommand> [options] runs the tool of the subcommand with the
+##   options, e.g. wintec gpx -d gpx track.tk1.
+## - Only the module of the given subcommand is imported.
+## - wintec --startup compares the start time of the subcommands and the
+##   scripts.
+##
+#################################################################################
+## Support                                                                     ##
+#################################################################################
+##
+## The latest version of the wintec tools is available on Github
+## <https://github.com/BlinxFox/WintecTools>
+##
+## If you have bug reports, patches or some questions, please create an
+## issue on Github:
+## <https://github.com/BlinxFox/WintecTools>
+##
+#################################################################################
+
+"""
+Single entry point for the Wintec tools with fast startup.
+
+Every subcommand runs the main method of a tool module, which is imported only when the subcommand is used.
+Unlike a script started directly, the imported module is loaded from its cached bytecode.
+"""
+
+import getopt
+import importlib
+import os
+import sys
+
+SUBCOMMANDS = (
+    ("readlog", "readlog", "Read gps tracklogs from the device into a .tk1 file."),
+    ("split", "tk1split", "Split .tk1 files into .tk2 and/or .tk3 files."),
+    ("rebuild", "tk1totk1", "Recalculate the footer data of a .tk1 file."),
+    ("info", "tkinfo", "Display TK file information."),
+    ("gpx", "tktogpx", "Convert TK files into a GPS eXchange file."),
+    ("nmea", "tktonmea", "Convert TK files into a NMEA-0183 file."),
+    ("geotag", "tkgeotag", "Geotag photos with the positions of TK files."),
+    ("fromgpx", "gpxtotk", "Convert GPS eXchange files into TK files."),
+    ("fromnmea", "nmeatotk", "Convert NMEA-0183 files into TK files."),
+    ("columnar", "tktocolumnar", "Convert TK files into columnar files."),
+    ("archive", "tkarchive", "Store TK files in a compact archive and restore them."),
+    ("pack", "tkpack", "Consolidate TK2/TK3 files into monthly pack files."),
+    ("lod", "tklod", "Create level of detail sidecar files."),
+    ("tiles", "tktotiles", "Convert TK files into Mapbox vector tiles."),
+    ("heatmap", "tkheatmap", "Create trackpoint density heatmaps."),
+    ("sqlite", "tktosqlite", "Load TK files into a SQLite database."),
+    ("store", "tkstore", "Keep device downloads in a deduplicating track store."),
+    ("watch", "tkwatch", "Watch directories and run conversion pipelines."),
+    ("serve", "tkserver", "Local HTTP service converting TK files."),
+)
+""" Tupels of subcommand, module name and description. """
+
+STARTUP_SUBCOMMANDS = ("readlog", "split", "info", "gpx", "nmea")
+""" The subcommands compared by --startup if none are given. """
+
+STARTUP_RUNS = 10
+""" The default number of runs per measurement of --startup. """
+
+def getModuleName(subcommand):
+    """
+    Get the module name of the subcommand.
+
+    @param subcommand: The subcommand or the name of the tool script.
+    @return: The module name or None if the subcommand is unknown.
+    """
+    if subcommand.endswith(".py"):
+        subcommand = subcommand[:-3]
+    for name, moduleName, _ in SUBCOMMANDS:
+        if subcommand in (name, moduleName):
+            return moduleName
+    return None
+
+def runSubcommand(moduleName, subcommand, arguments):
+    """
+    Import the tool module and run its main method with the arguments.
+
+    @param moduleName: The module name of the tool.
+    @param subcommand: The subcommand, shown as program name in the usage information of the tool.
+    @param arguments: The list of command line arguments for the tool.
+    """
+    module = importlib.import_module(moduleName)
+    sys.argv = ["%s %s" % (os.path.split(sys.argv[0])[1], subcommand)] + arguments
+    module.main()
+
+def measureStartup(command, runs, directory):
+    """
+    Measure the wall clock time of a command, ignoring its output.
+
+    The command runs once before the measurement, so the bytecode of the imported modules is cached.
+
+    @param command: The command as list of arguments.
+    @param runs: The number of measured runs.
+    @param directory: The working directory of the command.
+    @return: The median time in milliseconds; None if the command failed.
+    """
+    import statistics # pylint: disable-msg=C0415
+    import subprocess # pylint: disable-msg=C0415
+    import time # pylint: disable-msg=C0415
+    times = []
+    for run in range(runs + 1):
+        startTime = time.perf_counter()
+        result = subprocess.run(command, cwd = directory, stdout = subprocess.DEVNULL, stderr = subprocess.DEVNULL,
+                                check = False)
+        if result.returncode != 0:
+            return None
+        if run > 0:
+            times.append((time.perf_counter() - startTime) * 1000)
+    return statistics.median(times)
+
+def compareStartup(subcommands, runs):
+    """
+    Print the start time of the subcommands compared to importing the module and running the tool script.
+
+    Every variant prints the usage information of the tool (-h) in a new interpreter. A dummy file argument is
+    passed, as the tools exit with an error code, if no file is given.
+
+    @param subcommands: The list of subcommands.
+    @param runs: The number of runs per measurement.
+    """
+    directory = os.path.dirname(os.path.abspath(__file__))
+    python = sys.executable
+    print("Median of %i runs in ms, interpreter without imports: %.1f"
+          % (runs, measureStartup([python, "-c", "pass"], runs, directory)))
+    print("%-10s %10s %10s %10s" % ("subcommand", "import", "script", "wintec"))
+    for subcommand in subcommands:
+        moduleName = getModuleName(subcommand)
+        times = [measureStartup([python, "-c", "import %s" % moduleName], runs, directory),
+                 measureStartup([python, os.path.join(directory, moduleName + ".py"), "-h", "-"], runs, directory),
+                 measureStartup([python, os.path.join(directory, "wintec.py"), subcommand, "-h", "-"], runs,
+                                directory)]
+        print("%-10s %s" % (subcommand, " ".join(["%10s" % ("failed" if value == None else "%.1f" % value)
+                                                   for value in times])))
+
+def usage():
+    """
+    Print program usage.
+    """
+    from winteclib import VERSION # pylint: disable-msg=C0415
+    executable = os.path.split(sys.argv[0])[1]
+    print("%s Version %s (C) 2026 The Wintec Tools contributors" % (executable, VERSION))
+    print("Single entry point for the Wintec tools with fast startup.\n")
+    print("Usage: %s <subcommand> [options]" % executable)
+    print("       %s --startup [-n runs] [subcommands]" % executable)
+    print("--startup: Compare the start time of the subcommands and the tool scripts (default: %s)."
+          % ", ".join(STARTUP_SUBCOMMANDS))
+    print("-n: Number of runs per measurement (default: %i).\n" % STARTUP_RUNS)
+    print("Subcommands:")
+    for name, moduleName, description in SUBCOMMANDS:
+        print("  %-9s %s (%s.py)" % (name, description, moduleName))
+    print("\nUse %s <subcommand> -h for the options of a subcommand." % executable)
+
+def main():
+    """
+    The main method.
+    """
+    startup = False
+    runs = STARTUP_RUNS
+
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], "?hn:", ["startup"])
+    except getopt.GetoptError:
+        # print help information and exit:
+        usage()
+        sys.exit(2)
+
+    for o, a in opts:
+        if o in ("-h", "-?"):
+            usage()
+            sys.exit()
+        if o == "--startup":
+            startup = True
+        if o == "-n":
+            runs = int(a)
+            if runs < 1:
+                print("The number of runs must be at least 1!")
+                sys.exit(5)
+
+    if startup:
+        subcommands = args if len(args) > 0 else STARTUP_SUBCOMMANDS
+        for subcommand in subcommands:
+            if getModuleName(subcommand) == None:
+                print("Unknown subcommand %s!" % subcommand)
+                sys.exit(5)
+        compareStartup(subcommands, runs)
+        return
+
+    if len(args) == 0:
+        usage()
+        sys.exit(1)
+
+    moduleName = getModuleName(args[0])
+    if moduleName == None:
+        print("Unknown subcommand %s!" % args[0])
+        usage()
+        sys.exit(5)
+
+    runSubcommand(moduleName, args[0], args[1:])
+
+if __name__ == "__main__":
+    main()
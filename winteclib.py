@@ -48,19 +48,26 @@ The winteclib module contains classes and utility functions for the wintec tools
 
 # pylint: disable-msg=C0302
 
-from math import atan2, degrees, radians, sin, cos, tan, atan, sqrt, pi
+from math import atan2, degrees, radians, sin, cos, tan, atan, sqrt, pi, hypot, log
 
+from array import array
+from bisect import bisect_right
+from itertools import accumulate
+from operator import sub
 import datetime
+import fnmatch
+import glob
+import heapq
+import io
+import json
 import struct
-import locale
 import os
 from pytz import FixedOffset, timezone as gettimezone, utc, open_resource, ZERO, _FixedOffset
 import re
 from io import StringIO as StringIO
 import sys
 import time
-# import urllib2
-import zipfile
+import zlib
 
 VERSION = "2.1"
 """ The wintec tools version. """
@@ -79,6 +86,7 @@ def __pytz_open_resource(name):
     except IOError:
         zipfilename = os.path.join(os.path.split(os.path.dirname(__file__))[0], 'pytz.zip')
         if os.path.exists(zipfilename):
+            import zipfile # pylint: disable-msg=C0415
             z = zipfile.ZipFile(zipfilename)
             name_parts = name.lstrip('/').split('/')
             # We skip fhe name_parts validation as it already succeeded in __pytz_orig_open_resource()
@@ -106,15 +114,28 @@ if os.path.split(os.path.dirname(__file__))[1] == "library.zip":
 # Always monkeypatch _FixedOffset.dst().
 _FixedOffset.dst = __pytz_dst
         
-# Detect console encoding and decoding for converting the comment string from and to unicode.
-if sys.platform == 'win32':
-    CONSOLE_INPUT_ENCODING = 'mbcs'
-    CONSOLE_OUTPUT_ENCODING = getattr(sys.stdout, 'encoding')
-    if CONSOLE_OUTPUT_ENCODING == None:
-        CONSOLE_OUTPUT_ENCODING = locale.getdefaultlocale()[1]
-else:
-    CONSOLE_INPUT_ENCODING = locale.getdefaultlocale()[1] 
-    CONSOLE_OUTPUT_ENCODING = locale.getdefaultlocale()[1]
+def __getattr__(name):
+    """
+    Detect console encoding and decoding for converting the comment string from and to unicode.
+    CONSOLE_INPUT_ENCODING and CONSOLE_OUTPUT_ENCODING are resolved on first access, so importing this module
+    does not have to query the locale.
+
+    @param name: The name of the module attribute.
+    @return: The encoding name.
+    """
+    import locale # pylint: disable-msg=C0415
+    if name == 'CONSOLE_INPUT_ENCODING':
+        if sys.platform == 'win32':
+            return 'mbcs'
+        return locale.getdefaultlocale()[1]
+    if name == 'CONSOLE_OUTPUT_ENCODING':
+        encoding = None
+        if sys.platform == 'win32':
+            encoding = getattr(sys.stdout, 'encoding')
+        if encoding == None:
+            encoding = locale.getdefaultlocale()[1]
+        return encoding
+    raise AttributeError("module %r has no attribute %r" % (__name__, name))
 
 DATETIME_FILENAME_TEMPLATE = '%Y%m%d_%H%M%S'
 """ Date and time format template used for filenames. """
@@ -131,6 +152,18 @@ HARDWARE_VERSION = 1.0
 timezoneidcache = {} # pylint: disable-msg=C0103
 """ A map of (latitude, longitude) and timezone id. """
 
+EPOCH_ORDINAL = datetime.date(1970, 1, 1).toordinal()
+""" The proleptic Gregorian ordinal of the unix epoch. """
+
+daystartcache = {} # pylint: disable-msg=C0103
+""" A map of the date bits of a date/time field and the seconds since the epoch at midnight of that day. """
+
+datebitscache = {} # pylint: disable-msg=C0103
+""" A map of days since the epoch and the date bits of the date/time field of that day. """
+
+NEW_TRACK_GAP = 60
+""" The time in seconds without trackpoints after which imported or captured trackpoints start a new track. """
+
 # pylint: disable-msg=R0913,C0302
 
 class IllegalStateException(Exception):
@@ -162,6 +195,8 @@ class Track:
         self.timezone = timezone
         self.autotimezone = autotimezone
         self.autotimezoneresult = None
+        self.columns = None
+        self.motion = None
 
     def trackpoints(self):
         """
@@ -211,6 +246,155 @@ class Track:
         """
         return self.trackdata[self.trackdataStart:self.trackdataStart + self.trackpointCount * Trackpoint.TRACKPOINTLEN]
 
+    def getColumns(self):
+        """
+        Get the trackpoints of this track as L{TrackColumns}.
+        
+        The columns are decoded on first use and cached afterwards.
+        
+        @return: The L{TrackColumns} of this track.
+        """
+        if self.columns == None:
+            self.columns = TrackColumns(self.getTrackData())
+        return self.columns
+
+    def getMotion(self):
+        """
+        Get speed and bearing of every trackpoint as columns.
+        
+        The values of a trackpoint are those of the track segment from the previous trackpoint; the first trackpoint
+        has speed and bearing 0. The columns are computed on first use and cached afterwards.
+        
+        @return: Tupel of arrays with speeds in km/h and bearings in degrees.
+        """
+        if self.motion == None:
+            columns = self.getColumns()
+            latitudes = [latitude / 10000000.0 for latitude in columns.latitudes]
+            longitudes = [longitude / 10000000.0 for longitude in columns.longitudes]
+            timestamps = columns.timestamps
+            speeds = array('d', [0.0])
+            bearings = array('d', [0.0])
+            if len(latitudes) > 1:
+                distances, segmentBearings = zip(*map(calculateVincentyDistance, latitudes, longitudes,
+                                                      latitudes[1:], longitudes[1:]))
+                speeds.extend([distance / (duration / float(60 * 60)) if duration != 0 else 0.0
+                               for distance, duration in zip(distances, map(sub, timestamps[1:], timestamps))])
+                bearings.extend(segmentBearings)
+            self.motion = (speeds[:len(latitudes)], bearings[:len(latitudes)])
+        return self.motion
+
+    def interpolate(self, times, maxGap = None):
+        """
+        Interpolate the position, speed and bearing of this track for a batch of times.
+        
+        The position is linear interpolated between the two trackpoints surrounding a time, speed and bearing are
+        the values of the track segment between these trackpoints. The values are NaN for times outside of the
+        track and for times within a logging pause longer than maxGap seconds.
+        
+        @param times: An iterable of UTC times as seconds since the epoch.
+        @param maxGap: The maximum time in seconds between two trackpoints to interpolate between them;
+                       None for no limit.
+        @return: Tupel of arrays with latitudes, longitudes, altitudes, speeds in km/h and bearings in degrees.
+        """
+        # pylint: disable-msg=R0914
+        columns = self.getColumns()
+        timestamps = columns.timestamps
+        count = len(timestamps)
+        nan = float('nan')
+        latitudes = array('d')
+        longitudes = array('d')
+        altitudes = array('d')
+        speeds = array('d')
+        bearings = array('d')
+        segments = {}
+
+        def isSegment(start):
+            """ Test wether the trackpoints start and start + 1 form a segment usable for interpolation. """
+            return 0 <= start < count - 1 and (maxGap == None or timestamps[start + 1] - timestamps[start] <= maxGap)
+
+        def getSegmentMotion(start):
+            """ Get speed and bearing of the segment beginning at trackpoint start. """
+            if start not in segments:
+                distance, bearing = calculateVincentyDistance(columns.latitudes[start] / 10000000.0,
+                                                              columns.longitudes[start] / 10000000.0,
+                                                              columns.latitudes[start + 1] / 10000000.0,
+                                                              columns.longitudes[start + 1] / 10000000.0)
+                duration = timestamps[start + 1] - timestamps[start]
+                segments[start] = (distance / (duration / float(60 * 60)) if duration != 0 else 0.0, bearing)
+            return segments[start]
+
+        for queryTime in times:
+            index = bisect_right(timestamps, queryTime) - 1
+            if index >= 0 and timestamps[index] == queryTime:
+                # Exact match of a trackpoint.
+                fraction = 0.0
+                if isSegment(index):
+                    speed, bearing = getSegmentMotion(index)
+                elif isSegment(index - 1):
+                    speed, bearing = getSegmentMotion(index - 1)
+                else:
+                    speed, bearing = 0.0, 0.0
+            elif isSegment(index):
+                fraction = (queryTime - timestamps[index]) / float(timestamps[index + 1] - timestamps[index])
+                speed, bearing = getSegmentMotion(index)
+            else:
+                latitudes.append(nan)
+                longitudes.append(nan)
+                altitudes.append(nan)
+                speeds.append(nan)
+                bearings.append(nan)
+                continue
+            nextIndex = index + 1 if fraction else index
+            latitude = columns.latitudes[index]
+            longitude = columns.longitudes[index]
+            altitude = columns.altitudes[index]
+            latitudes.append((latitude + (columns.latitudes[nextIndex] - latitude) * fraction) / 10000000.0)
+            longitudes.append((longitude + (columns.longitudes[nextIndex] - longitude) * fraction) / 10000000.0)
+            altitudes.append(altitude + (columns.altitudes[nextIndex] - altitude) * fraction)
+            speeds.append(speed)
+            bearings.append(bearing)
+        return latitudes, longitudes, altitudes, speeds, bearings
+
+    def getProjection(self):
+        """
+        Get the trackpoints in a local equirectangular projection for simplification.
+        
+        @return: Tupel of the lists of x and y coordinates in metres and the list of the indices of push log points
+                 and track starts.
+        """
+        columns = self.getColumns()
+        scale = radians(1 / 10000000.0) * EARTH_RADIUS
+        longitudeScale = scale * cos(radians(sum(columns.latitudes) / max(len(columns), 1) / 10000000.0))
+        fixedTypes = Trackpoint.TRACKSTART | Trackpoint.LOGPOINT
+        return ([longitude * longitudeScale for longitude in columns.longitudes],
+                [latitude * scale for latitude in columns.latitudes],
+                [index for index, pointType in enumerate(columns.types) if pointType & fixedTypes])
+
+    def simplify(self, tolerance):
+        """
+        Create a simplified copy of this track for display with the Douglas-Peucker algorithm,
+        see L{simplifyPolyline()}.
+        
+        The first and the last trackpoint, push log points and track starts are always kept. The duration and the
+        length of the copy are the values of the original track.
+        
+        @param tolerance: The maximum distance in metres between the original and the simplified track.
+        @return: The simplified L{Track}; this track if no trackpoint can be removed.
+        """
+        count = self.getTrackPointCount()
+        if count < 3:
+            return self
+        xs, ys, fixed = self.getProjection()
+        indices = simplifyPolyline(xs, ys, tolerance, fixed)
+        if len(indices) == count:
+            return self
+        trackdata = self.getTrackData()
+        length = Trackpoint.TRACKPOINTLEN
+        track = Track(b"".join([trackdata[index * length:(index + 1) * length] for index in indices]), 0,
+                      len(indices), self.trackDuration, self.trackLength, self.timezone, self.autotimezone)
+        track.autotimezoneresult = self.autotimezoneresult
+        return track
+
     def getPushPointCount(self):
         """
         Get the count of push points in this track.
@@ -327,13 +511,31 @@ class Trackpoint:
         """
         return struct.unpack('<I', self.trackpoint[0x02:0x06])[0]
 
+    def getLatitudeField(self):
+        """
+        Get the latitude field of the trackpoint (decimal degrees scaled by 1e7).
+        Use L{formatScaled()} to format the value without float rounding.
+        
+        @return: The latitude field of the trackpoint.
+        """
+        return struct.unpack('<i', self.trackpoint[0x06:0x0a])[0]
+
+    def getLongitudeField(self):
+        """
+        Get the longitude field of the trackpoint (decimal degrees scaled by 1e7).
+        Use L{formatScaled()} to format the value without float rounding.
+        
+        @return: The longitude field of the trackpoint.
+        """
+        return struct.unpack('<i', self.trackpoint[0x0a:0x0e])[0]
+
     def getLatitude(self):
         """
         Get the latitude of the trackpoint in decimal degrees.
         
         @return: The latitude of the trackpoint.
         """
-        return struct.unpack('<i', self.trackpoint[0x06:0x0a])[0] / 10000000.0
+        return self.getLatitudeField() / 10000000.0
 
     def getLongitude(self):
         """
@@ -341,7 +543,7 @@ class Trackpoint:
         
         @return: The longitude of the trackpoint.
         """
-        return struct.unpack('<i', self.trackpoint[0x0a:0x0e])[0] / 10000000.0
+        return self.getLongitudeField() / 10000000.0
 
     def getAltitude(self):
         """
@@ -405,6 +607,45 @@ class Trackpoint:
         value = (self.getType() & int('1111111110000000', 2)) >> 7
         return value + 589
 
+class TrackColumns:
+    """
+    This class represents the trackpoints of a track in columnar form.
+    
+    Each attribute is an array with one entry per trackpoint. Latitude and longitude are kept as the raw integer
+    values scaled by 1e7, the timestamps are seconds since the epoch (UTC).
+    Decoding a whole track at once is much faster than creating a L{Trackpoint} object for every point.
+    """
+
+    TRACKPOINTFORMAT = struct.Struct('<HIiih')
+    """ The binary layout of a trackpoint: type, date/time field, latitude, longitude, altitude. """
+
+    def __init__(self, trackdata):
+        """
+        Constructor.
+        
+        @param trackdata: The trackdata as array of bytes.
+        """
+        assert len(trackdata) % Trackpoint.TRACKPOINTLEN == 0
+        if len(trackdata) > 0:
+            types, dateTimeFields, latitudes, longitudes, altitudes = \
+                zip(*TrackColumns.TRACKPOINTFORMAT.iter_unpack(trackdata))
+        else:
+            types = dateTimeFields = latitudes = longitudes = altitudes = ()
+        self.types = array('H', types)
+        self.dateTimeFields = array('I', dateTimeFields)
+        self.timestamps = array('q', map(convertToTimestamp, dateTimeFields))
+        self.latitudes = array('i', latitudes)
+        self.longitudes = array('i', longitudes)
+        self.altitudes = array('h', altitudes)
+
+    def __len__(self):
+        """
+        Get the number of trackpoints.
+        
+        @return: The number of trackpoints.
+        """
+        return len(self.timestamps)
+
 class TK1File:
     """
     This class represents a .tk1 tracklog file.
@@ -792,7 +1033,6 @@ class TK1File:
         header += struct.pack('<i', footerpos)
         header += struct.pack('<i', trackcount)
         header += fillBytes(0x00, 876)
-        print("len", len(header), TK1File.HEADERLEN)
         assert len(header) == TK1File.HEADERLEN
         return header
 
@@ -842,6 +1082,109 @@ class TK1File:
                                     trackDuration.days * TK1File.SECONDS_PER_DAY + trackDuration.seconds, trackDistance)
         return tracks
 
+class TK1Writer:
+    """
+    This class writes a .tk1 file from trackdata appended in chunks.
+
+    Unlike L{TK1File.init()} the trackdata isn't kept in memory, the footer data is calculated while the trackpoints
+    are written. Every call of L{flush()} writes footer and header, so the file is complete after each flush.
+    """
+
+    def __init__(self, fileHandle, devicename, deviceinfo, deviceserial, exporttimestamp = None):
+        """
+        Constructor.
+        
+        @param fileHandle: The file handle of a writeable and seekable .tk1 file.
+        @param devicename: The name of the gps device.
+        @param deviceinfo: The information string of the gps device.
+        @param deviceserial: The serial number of the gps device.
+        @param exporttimestamp: The date and time of the data export.
+        """
+        if exporttimestamp == None:
+            exporttimestamp = time.strftime(TK1File.EXPORT_TIMESTAMP_FORMAT, time.localtime()).encode("ascii")
+        self.fileHandle = fileHandle
+        self.devicename = devicename
+        self.deviceinfo = deviceinfo
+        self.deviceserial = deviceserial
+        self.exporttimestamp = exporttimestamp
+        self.tk1 = TK1File()
+        self.tracks = {}
+        self.trackdataLen = 0
+        self.logversion = 1.0
+        self.trackStartTime = None
+        self.previousPoint = None
+        self.flushed = False
+        self.fileHandle.write(self.createHeader())
+
+    def write(self, trackdata):
+        """
+        Append trackpoints. A trackpoint with the trackstart flag starts a new track.
+        
+        @param trackdata: The trackdata as array of bytes.
+        """
+        columns = TrackColumns(trackdata)
+        track = self.tracks.get(len(self.tracks) - 1)
+        for index in range(len(columns)):
+            timestamp = columns.timestamps[index]
+            latitude = columns.latitudes[index] / 10000000.0
+            longitude = columns.longitudes[index] / 10000000.0
+            # The first trackpoint might not be marked with the trackstart flag.
+            if columns.types[index] & Trackpoint.TRACKSTART or track == None:
+                track = self.tracks[len(self.tracks)] = \
+                    [TK1File.HEADERLEN + self.trackdataLen + index * Trackpoint.TRACKPOINTLEN, 0, 0, float(0)]
+                self.trackStartTime = timestamp
+            else:
+                track[3] += calculateVincentyDistance(self.previousPoint[0], self.previousPoint[1],
+                                                      latitude, longitude)[0]
+            track[1] += 1
+            track[2] = timestamp - self.trackStartTime
+            self.previousPoint = (latitude, longitude)
+            # See guessLogVersion().
+            if columns.types[index] & int('1111111111111000', 2):
+                self.logversion = 2.0
+        if self.flushed:
+            self.fileHandle.seek(TK1File.HEADERLEN + self.trackdataLen)
+            self.flushed = False
+        self.fileHandle.write(trackdata)
+        self.trackdataLen += len(trackdata)
+
+    def flush(self):
+        """
+        Write footer and header. Further trackpoints overwrite the footer.
+        """
+        self.fileHandle.seek(TK1File.HEADERLEN + self.trackdataLen)
+        self.fileHandle.write(self.tk1.createFooter(self.tracks))
+        self.fileHandle.truncate()
+        self.fileHandle.seek(0)
+        self.fileHandle.write(self.createHeader())
+        self.fileHandle.flush()
+        self.flushed = True
+
+    def getTrackCount(self):
+        """
+        Get the number of tracks written.
+        
+        @return: The number of tracks.
+        """
+        return len(self.tracks)
+
+    def getTrackpointCount(self):
+        """
+        Get the number of trackpoints written.
+        
+        @return: The number of trackpoints.
+        """
+        return self.trackdataLen // Trackpoint.TRACKPOINTLEN
+
+    def createHeader(self):
+        """
+        Create the header data for the trackpoints written so far.
+        
+        @return: The header data.
+        """
+        return self.tk1.createHeader(self.logversion, self.devicename, self.deviceinfo, self.deviceserial,
+                                     self.trackdataLen, len(self.tracks), self.exporttimestamp)
+
 class TK2File:
     """
     This class represents a .tk2 tracklog file.
@@ -927,7 +1270,7 @@ class TK2File:
         
         @return: The name of the gps device. 
         """
-        return self.header[0x001e:0x0031].strip(chr(0))
+        return self.header[0x001e:0x0031].strip(bytes([0]))
 
     def getDeviceInfo(self):
         """
@@ -935,7 +1278,7 @@ class TK2File:
         
         @return: The gps device information. 
         """
-        return self.header[0x0032:0x0045].strip(chr(0))
+        return self.header[0x0032:0x0045].strip(bytes([0]))
 
     def getDeviceSerial(self):
         """
@@ -943,7 +1286,7 @@ class TK2File:
         
         @return: The serial number of the gps device. 
         """
-        return self.header[0x0046:0x0054].strip(chr(0))
+        return self.header[0x0046:0x0054].strip(bytes([0]))
 
     def getExportTimeString(self):
         """
@@ -951,7 +1294,7 @@ class TK2File:
         
         @return: The date and time of the export. 
         """
-        return self.header[0x006E:0x0081].strip(chr(0))
+        return self.header[0x006E:0x0081].strip(bytes([0]))
     
     def getTimezone(self):
         """
@@ -983,7 +1326,7 @@ class TK2File:
         @return: The user comment.
         """
         comment = self.header[0x0082:0x01ae]
-        return comment.decode('utf-16').encode(CONSOLE_OUTPUT_ENCODING).strip(chr(0))
+        return comment.decode('utf-16').strip(chr(0))
 
     def setComment(self, comment):
         """
@@ -993,7 +1336,7 @@ class TK2File:
         """
         commentUnicode = comment[:150].encode('utf_16')
         header = self.header
-        header = header[:0x0082] + commentUnicode + fillBytes(chr(0), 300-len(commentUnicode)) + header[0x01ae:]
+        header = header[:0x0082] + commentUnicode + fillBytes(0x00, 300-len(commentUnicode)) + header[0x01ae:]
         assert len(header) == TK2File.HEADERLEN
         self.header = header
 
@@ -1156,7 +1499,7 @@ class TK3File(TK2File):
 
     # pylint: disable-msg=R0904,R0921
 
-    FILEMARKER = 'WintecLogTk3'
+    FILEMARKER = b'WintecLogTk3'
     """ The identification marker at the beginning of the TK3 file. """
 
     def __init__(self):
@@ -1205,8 +1548,8 @@ class TK3File(TK2File):
         @param trackdata: The trackdata.
         @return: The push log points.
         """
-        logPoints = ""
-        track = Track(trackdata, 0, len(trackdata) / Trackpoint.TRACKPOINTLEN, 0, 0, utc, False)
+        logPoints = b""
+        track = Track(trackdata, 0, len(trackdata) // Trackpoint.TRACKPOINTLEN, 0, 0, utc, False)
         for trackpoint in track.trackpoints():
             if trackpoint.isLogPoint():
                 logPoints += trackpoint.trackpoint
@@ -1302,6 +1645,7 @@ class TK3File(TK2File):
         lastTrackpoint = Trackpoint(self.trackdata[-Trackpoint.TRACKPOINTLEN:])
         firstTrackpointDate = firstTrackpoint.getDateTime(timezone).strftime("%Y-%m-%dT%H:%M:%SZ%z")
         firstTrackpointDate = firstTrackpointDate[:-2] + ":" + firstTrackpointDate[-2:]
+        firstTrackpointDate = firstTrackpointDate.encode("ascii")
         lastTrackpointDate = lastTrackpoint.getDateTime(timezone).strftime("%Y-%m-%dT%H:%M:%SZ%z")
         lastTrackpointDate = lastTrackpointDate[:-2] + ":" + lastTrackpointDate[-2:]
         lastTrackpointDate = lastTrackpointDate.encode("ascii")
@@ -1327,6 +1671,21 @@ class TK3File(TK2File):
         assert len(header) == TK3File.HEADERLEN
         return header
 
+FILEMARKERLEN = 12
+""" The number of bytes of the file marker needed to detect the type of a TK file. """
+
+def getTKFileClass(fileMarker):
+    """
+    Get the class for the file marker of a wintec file.
+    
+    @param fileMarker: The first L{FILEMARKERLEN} bytes of the file.
+    @return: The class TK1File, TK2File or TK3File; None if the file marker is unknown.
+    """
+    fileTypes = {TK1File.FILEMARKER[:FILEMARKERLEN] : TK1File,
+                 TK2File.FILEMARKER                 : TK2File,
+                 TK3File.FILEMARKER                 : TK3File,}
+    return fileTypes.get(fileMarker)
+
 def readTKFile(fileName):
     """
     Read a wintec file (.TK1, .TK2 or .TK3) and return an object of the corresponding class.
@@ -1335,94 +1694,1967 @@ def readTKFile(fileName):
     @return: An object of TK1File, TK2File or TK3File depending of the file content;
              None in case of an error.
     """
-    fileMarkerLen = 12
-    fileTypes = {TK1File.FILEMARKER[:fileMarkerLen] : TK1File,
-                 TK2File.FILEMARKER                 : TK2File,
-                 TK3File.FILEMARKER                 : TK3File,}
-    
-    f = open(fileName, "rb")
-    fileMarker = f.read(fileMarkerLen)
-    try:
-        fileClass = fileTypes[fileMarker]
-    except KeyError:
+    f, offset, length = openTKFile(fileName)
+    f.seek(offset)
+    data = f.read(length)
+    f.close()
+    fileClass = getTKFileClass(data[:FILEMARKERLEN])
+    if fileClass == None:
         print("%s is not a valid TK file!" % fileName)
         return None
     tkFile = fileClass()
-    f.seek(0)
-    tkFile.read(f)
-    f.close()
+    tkFile.read(io.BytesIO(data))
     return tkFile
 
-def createOutputFile(outputDir, filename, template, value, flags = "w"):
+def openTKFile(fileName):
     """
-    Create output file.
-    
-    If outputDir is None, the file is created in the current directory.
-    If filename is None, the file name is created by applying value to template. 
+    Open a wintec file, a compressed wintec file (see L{getCompression()}) or a member of a pack file (see L{TKPack})
+    for reading.
     
-    @param outputDir: The output directory.
-    @param filename: The output file name.
-    @param template: The file name template.
-    @param value: The file name template value.
-    @param flags: The file open mode flags.
-    @return: An open writeable filehandle.
+    @param fileName: The name and path of the wintec file or pack#member.
+    @return: Tuple of the open file handle, the offset and the length of the wintec file data.
     """
-    if not filename:
-        filename = template % value
-    if outputDir:
-        filename = os.path.join(outputDir, filename) 
-    print('Create %s' % filename)
-    return open(filename, flags)
-
-def fillBytes(byte, count):
+    packName, memberName = splitPackPath(fileName)
+    if memberName == None:
+        if getCompression(fileName) != None:
+            data = readCompressedFile(fileName)
+            return io.BytesIO(data), 0, len(data)
+        return open(fileName, "rb"), 0, os.path.getsize(fileName)
+    member = getPack(packName).getMember(memberName)
+    if member == None:
+        raise IOError("%s not found in %s!" % (memberName, packName))
+    return open(packName, "rb"), member.offset, member.length
+
+SPARSE_READ_FACTOR = 32
+""" L{TKFileReference.readTrack()} reads single trackpoints if less than every n-th trackpoint is selected. """
+
+class TKFileReference:
     """
-    Create a string of bytes with the given length.
+    This class represents a wintec file on disk without holding its track data.
     
-    @param byte: The byte to fill into the string.
-    @param count: The length of the resulting string.
-    @return: A string of bytes with the given length.
+    Only the header and the first trackpoint are read on creation, which is enough to sort files and to create
+    output file names. The complete file is read by L{load()} when its track data is needed.
     """
-    assert count >= 0
-    return count * bytes([byte])
 
-def guessLogVersion(trackdata):
+    def __init__(self, fileName):
+        """
+        Constructor.
+        
+        @param fileName: The name and path of the wintec file.
+        """
+        self.fileName = fileName
+        self.fileClass = None
+        self.header = None
+        self.firstTrackpoint = None
+        self.timezone = None
+        self.autotimezone = False
+        packName, memberName = splitPackPath(fileName)
+        if memberName != None:
+            # The pack directory contains the header and the first trackpoint of every member.
+            member = getPack(packName).getMember(memberName)
+            if member == None:
+                raise IOError("%s not found in %s!" % (memberName, packName))
+            self.offset, self.length = member.offset, member.length
+            data = member.prefix
+        else:
+            f, self.offset, self.length = openTKFile(fileName)
+            data = f.read(TK1File.HEADERLEN + Trackpoint.TRACKPOINTLEN)
+            f.close()
+        self.fileClass = getTKFileClass(data[:FILEMARKERLEN])
+        if self.fileClass != None and len(data) == TK1File.HEADERLEN + Trackpoint.TRACKPOINTLEN:
+            self.header = data[:TK1File.HEADERLEN]
+            self.firstTrackpoint = Trackpoint(data[TK1File.HEADERLEN:])
+
+    def isValid(self):
+        """
+        Test wether the file is a wintec file with at least one trackpoint.
+        
+        @return: True if the file is valid; False otherwise.
+        """
+        return self.firstTrackpoint != None
+
+    def getFileName(self):
+        """
+        Get the name and path of the wintec file.
+        
+        @return: The file name.
+        """
+        return self.fileName
+
+    def getFileClass(self):
+        """
+        Get the class of the wintec file.
+        
+        @return: The class TK1File, TK2File or TK3File.
+        """
+        return self.fileClass
+
+    def getFirstTrackpoint(self):
+        """
+        Get the first L{Trackpoint} of the track data.
+        
+        @return: The first L{Trackpoint}.
+        """
+        return self.firstTrackpoint
+
+    def getLastTrackpoint(self):
+        """
+        Get the last L{Trackpoint} of the track data.
+        
+        Only the last trackpoint is read from the file.
+        
+        @return: The last L{Trackpoint}.
+        """
+        if self.fileClass == TK1File:
+            end = struct.unpack('<I', self.header[0x008c:0x0090])[0]
+        else:
+            end = self.length
+        f, offset, _ = openTKFile(self.fileName)
+        f.seek(offset + end - Trackpoint.TRACKPOINTLEN)
+        trackpoint = Trackpoint(f.read(Trackpoint.TRACKPOINTLEN))
+        f.close()
+        return trackpoint
+
+    def getTrackCount(self):
+        """
+        Get the number of tracks.
+        
+        @return: The number of tracks.
+        """
+        if self.fileClass == TK1File:
+            return struct.unpack('<I', self.header[0x0090:0x0094])[0]
+        return 1
+
+    def getLogVersion(self):
+        """
+        Get the log version of the gps device as float.
+        
+        @return: The log version of the gps device.
+        """
+        return struct.unpack('<f', self.header[0x0010:0x0014])[0]
+
+    def getTrackExtents(self):
+        """
+        Get the position and the footer values of the tracks in the file.
+        
+        Only the header and the footer are read, not the track data.
+        
+        @return: A list with a tupel of file offset, trackpoint count, track duration and track length
+                 for every track.
+        """
+        if self.fileClass == TK1File:
+            f, offset, _ = openTKFile(self.fileName)
+            f.seek(offset + struct.unpack('<I', self.header[0x008c:0x0090])[0])
+            footer = f.read(self.getTrackCount() * TK1File.FooterEntry.FOOTERENTRYLEN)
+            f.close()
+            extents = []
+            for footerStart in range(0, len(footer), TK1File.FooterEntry.FOOTERENTRYLEN):
+                footerEntry = TK1File.FooterEntry()
+                footerEntry.fill(footer[footerStart:footerStart + TK1File.FooterEntry.FOOTERENTRYLEN])
+                extents.append((footerEntry.getFooterTrackOffset(), footerEntry.getFooterTrackpointCount(),
+                                footerEntry.getFooterTrackDuration(), footerEntry.getFooterTrackLength()))
+            return extents
+        tkfile = self.fileClass()
+        tkfile.header = self.header
+        if self.fileClass == TK3File:
+            return [(TK3File.HEADERLEN, tkfile.getTrackpointCount(), 0, 0)]
+        return [(TK2File.HEADERLEN, tkfile.getTrackpointCount(), tkfile.getTrackTime(),
+                 tkfile.getTrackDistance() / 1000.0)]
+
+    def readTrack(self, extent, indices = None):
+        """
+        Read a single track from the file.
+        
+        If only a few trackpoints are selected by indices, only these trackpoints are read from the file.
+        
+        @param extent: The track position as returned by L{getTrackExtents()}.
+        @param indices: The sorted indices of the trackpoints to read; None to read all trackpoints.
+        @return: The L{Track}.
+        """
+        offset, trackpointCount, trackDuration, trackLength = extent
+        length = Trackpoint.TRACKPOINTLEN
+        f, fileOffset, _ = openTKFile(self.fileName)
+        if indices != None and len(indices) * SPARSE_READ_FACTOR < trackpointCount:
+            trackdata = []
+            for index in indices:
+                f.seek(fileOffset + offset + index * length)
+                trackdata.append(f.read(length))
+            trackdata = b"".join(trackdata)
+        else:
+            f.seek(fileOffset + offset)
+            trackdata = f.read(trackpointCount * length)
+            if indices != None:
+                trackdata = b"".join([trackdata[index * length:(index + 1) * length] for index in indices])
+        f.close()
+        if indices != None:
+            trackpointCount = len(indices)
+        if self.fileClass == TK1File:
+            return Track(trackdata, 0, trackpointCount, trackDuration, trackLength,
+                         self.timezone if self.timezone else utc, self.autotimezone)
+        tkfile = self.fileClass()
+        tkfile.header = self.header
+        return Track(trackdata, 0, trackpointCount, trackDuration, trackLength, tkfile.getTimezone(), False)
+
+    def setTimezone(self, timezone):
+        """
+        Set the timezone used for .tk1 files.
+        
+        @param timezone: A L{FixedOffset} object.
+        """
+        self.timezone = timezone
+
+    def setAutotimezone(self, autotimezone):
+        """
+        Set autotimezone used for .tk1 files.
+        
+        @param autotimezone: Boolean.
+        """
+        self.autotimezone = autotimezone
+
+    def load(self):
+        """
+        Read the complete wintec file.
+        
+        @return: An object of TK1File, TK2File or TK3File.
+        """
+        tkfile = readTKFile(self.fileName)
+        if isinstance(tkfile, TK1File):
+            if self.timezone:
+                tkfile.setTimezone(self.timezone)
+            tkfile.setAutotimezone(self.autotimezone)
+        return tkfile
+
+class TKFileSequence:
     """
-    Determine log version.
+    A sequence of wintec files which are read one at a time.
     
-    The log version 2.0 was introduced for WSG-1000 logs containing temperature and air pressure.
-    The temperature overlaps with the over speed flag of log version 1.0, so we must ignore this bit when searching
-    for a trackpoint with temperature/air pressure set.
+    Every iteration reads the files again, so at most one file is held in memory, no matter how many files
+    the sequence contains.
     """
-    dataPos = 0
-    for dataPos in range(0, len(trackdata), Trackpoint.TRACKPOINTLEN):
-        if Trackpoint(trackdata[dataPos:dataPos + Trackpoint.TRACKPOINTLEN]).getType() & int('1111111111111000', 2):
-            return 2.0
-    return 1.0
 
-def getGeonamesTimezoneId(lat, lng):
+    def __init__(self, references):
+        """
+        Constructor.
+        
+        @param references: A list of L{TKFileReference} objects.
+        """
+        self.references = references
+
+    def __len__(self):
+        """
+        Get the number of files.
+        
+        @return: The number of files.
+        """
+        return len(self.references)
+
+    def __getitem__(self, index):
+        """
+        Get the L{TKFileReference} with the given index.
+        
+        @param index: The index of the file.
+        @return: The L{TKFileReference}.
+        """
+        return self.references[index]
+
+    def __iter__(self):
+        """
+        A generator which reads the files one after the other.
+        
+        @return: Next TK1File, TK2File or TK3File object.
+        """
+        for reference in self.references:
+            yield reference.load()
+
+    def selectTracks(self):
+        """
+        A generator which iterates over the positions of all tracks without reading the track data.
+        
+        @return: Next tupel of L{TKFileReference}, track extent (see L{TKFileReference.getTrackExtents()}) and
+                 trackpoint indices for L{TKFileReference.readTrack()}.
+        """
+        for reference in self.references:
+            for extent in reference.getTrackExtents():
+                yield reference, extent, None
+
+class TKMergedFile:
     """
-    Query geonames.org for the timzoneId of the given GPS coordinate.
+    Consecutive tracks of a single wintec file selected by L{TKTrackMerge}.
     
-    @param lat: The latitude.
-    @param lng: The longitude.
-    @return: The timezoneId of the given GPS coordinate as string.
-    """
-    result = urllib2.urlopen("http://ws.geonames.org/timezone?lat=%s&lng=%s" % (lat, lng)).read()
-    return re.search("<timezoneId>([^<]*)</timezoneId>", result).group(1)
-
-def determineTimezone(trackpoint):
+    Provides the methods of TK1File, TK2File and TK3File used by the converters.
     """
-    Get the timezone as L{FixedOffset} for the GPS coordinate and time of the given L{Trackpoint}.
 
-    We use geonames.org to determine the timezoneId of the given GPS coordinate and use the Olson tz database to
-    calculate the timezone offset for the date and time of the L{Trackpoint}, taking daylight saving time into account.
+    def __init__(self, reference, tracks):
+        """
+        Constructor.
+        
+        @param reference: The L{TKFileReference} of the wintec file.
+        @param tracks: A list of L{Track} objects.
+        """
+        self.reference = reference
+        self.trackList = tracks
 
-    We use L{FixedOffset} instead of the location timezone, because the local time should match the time recorded
-    by devices like cameras, which are unlikely to self-adjust their clock for DST. If the track happens to contain the
-    point of the beginning or ending of the DST, the local time would jump; this doesn't happen with the L{FixedOffset}
-    timezone as it ignores DST.
+    def tracks(self):
+        """
+        A generator which iterates over the tracks.
         
-    @param trackpoint: The L{Trackpoint}.
+        @return: Next L{Track}.
+        """
+        for track in self.trackList:
+            yield track
+
+    def getLogVersion(self):
+        """
+        Get the log version of the gps device as float.
+        
+        @return: The log version of the gps device.
+        """
+        return self.reference.getLogVersion()
+
+class TKTrackMerge(TKFileSequence):
+    """
+    A sequence of wintec files whose tracks are merged into a single stream ordered by time.
+    
+    The files are read track by track with a k-way merge keyed on the timestamp of the first trackpoint, so only
+    one track per file is held in memory. Exact duplicates of a track are dropped by a set of track hashes, e.g.
+    if a .tk1 file is given together with its .tk2 files. Trackpoints of a track which are contained in an
+    overlapping previous track are dropped as well; only the tracks overlapping in time are compared point by point.
+    The tracks are merged only once: the positions of the merged tracks are kept after the first complete iteration,
+    further iterations read the selected trackpoints directly.
+    """
+
+    def __init__(self, references):
+        """
+        Constructor.
+        
+        @param references: A list of L{TKFileReference} objects.
+        """
+        TKFileSequence.__init__(self, references)
+        self.selection = None
+
+    def mergeTracks(self):
+        """
+        A generator which iterates over the merged tracks.
+        
+        @return: Next tupel of L{TKFileReference}, track extent, trackpoint indices (None for all trackpoints) and
+                 the L{Track}. The extent contains duration and length of the selected trackpoints.
+        """
+        # pylint: disable-msg=R0914
+        if self.selection != None:
+            for reference, extent, indices in self.selection:
+                yield reference, extent, indices, reference.readTrack(extent, indices)
+            return
+        selection = []
+        trackHashes = set()
+        # List of end time, columns and the lazily created set of trackpoint keys of every previous track which
+        # might overlap the following tracks.
+        previousTracks = []
+        length = Trackpoint.TRACKPOINTLEN
+        streams = [self.readTracks(fileNumber, reference) for fileNumber, reference in enumerate(self.references)]
+        for startTime, negativeEndTime, _, _, reference, extent, track in heapq.merge(*streams):
+            trackdata = track.getTrackData()
+            trackHash = computeSha256(trackdata).digest()
+            if trackHash in trackHashes:
+                continue
+            trackHashes.add(trackHash)
+            previousTracks = [previous for previous in previousTracks if previous[0] >= startTime]
+            indices = None
+            if previousTracks:
+                columns = track.getColumns()
+                for previous in previousTracks:
+                    if previous[2] == None:
+                        previous[2] = set(zip(previous[1].dateTimeFields, previous[1].latitudes,
+                                              previous[1].longitudes, previous[1].altitudes))
+                keys = zip(columns.dateTimeFields, columns.latitudes, columns.longitudes, columns.altitudes)
+                indices = [index for index, key in enumerate(keys)
+                           if not any(key in previous[2] for previous in previousTracks)]
+                if len(indices) == 0:
+                    continue
+                if len(indices) == len(columns):
+                    indices = None
+            previousTracks.append([-negativeEndTime, track.getColumns(), None])
+            if indices != None:
+                columns = track.getColumns()
+                trackLength = float(0)
+                for previousIndex, index in zip(indices, indices[1:]):
+                    trackLength += calculateVincentyDistance(columns.latitudes[previousIndex] / 10000000.0,
+                                                             columns.longitudes[previousIndex] / 10000000.0,
+                                                             columns.latitudes[index] / 10000000.0,
+                                                             columns.longitudes[index] / 10000000.0)[0]
+                extent = (extent[0], extent[1], columns.timestamps[indices[-1]] - columns.timestamps[indices[0]],
+                          trackLength)
+                selected = Track(b"".join([trackdata[index * length:(index + 1) * length] for index in indices]), 0,
+                                 len(indices), extent[2], extent[3], track.timezone, track.autotimezone)
+                selected.autotimezoneresult = track.autotimezoneresult
+                track = selected
+            selection.append((reference, extent, indices))
+            yield reference, extent, indices, track
+        self.selection = selection
+
+    def readTracks(self, fileNumber, reference):
+        """
+        A generator which reads the tracks of a file one after the other.
+        
+        Tracks with the same start time are ordered by descending end time, so a complete track is merged before
+        its partial copies, followed by the file order.
+        
+        @param fileNumber: The number of the file.
+        @param reference: The L{TKFileReference}.
+        @return: Next tupel of start time, negative end time, file number, track number, L{TKFileReference},
+                 track extent and L{Track}.
+        """
+        for trackNumber, extent in enumerate(reference.getTrackExtents()):
+            if extent[1] == 0:
+                continue
+            track = reference.readTrack(extent)
+            startTime = convertToTimestamp(track.getFirstPoint().getDateTimeField())
+            endTime = convertToTimestamp(track.getLastPoint().getDateTimeField())
+            yield startTime, -endTime, fileNumber, trackNumber, reference, extent, track
+
+    def selectTracks(self):
+        """
+        A generator which iterates over the positions of the merged tracks.
+        
+        @return: Next tupel of L{TKFileReference}, track extent and trackpoint indices for
+                 L{TKFileReference.readTrack()}.
+        """
+        for reference, extent, indices, _ in self.mergeTracks():
+            yield reference, extent, indices
+
+    def __iter__(self):
+        """
+        A generator which iterates over the merged tracks, grouped by file.
+        
+        @return: Next L{TKMergedFile} with consecutive tracks of the same file.
+        """
+        group = None
+        for reference, _, _, track in self.mergeTracks():
+            if group != None and group.reference is not reference:
+                yield group
+                group = None
+            if group == None:
+                group = TKMergedFile(reference, [])
+            group.trackList.append(track)
+        if group != None:
+            yield group
+
+class TKImporter:
+    """
+    This class converts imported trackpoints into a .tk1 file or into one .tk2 file per track.
+
+    The trackpoints are collected in columns and encoded in chunks by L{packTrackpoints()}. The .tk1 file is written
+    by a L{TK1Writer}, so only the current chunk is kept in memory; a .tk2 file needs the trackdata of its track.
+    """
+
+    CHUNKSIZE = 4096
+    """ The number of trackpoints encoded at once. """
+
+    def __init__(self, devicename, deviceinfo, outputDir, filename, defaultFilename, createTk2 = False):
+        """
+        Constructor.
+        
+        @param devicename: The device name to store in the header.
+        @param deviceinfo: The device information to store in the header.
+        @param outputDir: The output directory or None.
+        @param filename: The .tk1 output file name or None to use defaultFilename.
+        @param defaultFilename: The generic .tk1 output file name.
+        @param createTk2: True to create .tk2 files instead of a .tk1 file.
+        """
+        self.devicename = devicename[:20]
+        self.deviceinfo = deviceinfo[:20]
+        self.outputDir = outputDir
+        self.filename = filename
+        self.defaultFilename = defaultFilename
+        self.createTk2 = createTk2
+        self.fileHandle = None
+        self.writer = None
+        self.trackStart = True
+        self.pushpointCount = 0
+        self.trackpointCount = 0
+        self.fileCount = 0
+        self.resetColumns()
+
+    def resetColumns(self):
+        """
+        Start new columns for the next chunk.
+        """
+        self.types = []
+        self.timestamps = []
+        self.latitudes = []
+        self.longitudes = []
+        self.altitudes = []
+
+    def addTrackpoint(self, timestamp, latitude, longitude, altitude, logPoint = False, temperature = None,
+                      pressure = None):
+        """
+        Add a trackpoint to the current track.
+        
+        Temperature and air pressure are stored like in WSG1000 log version 2.0, see L{Trackpoint.getTemperature()}
+        and L{Trackpoint.getAirPressure()}.
+        
+        @param timestamp: The seconds since the epoch (UTC).
+        @param latitude: The latitude field value (decimal degrees scaled by 1e7).
+        @param longitude: The longitude field value (decimal degrees scaled by 1e7).
+        @param altitude: The altitude in meters.
+        @param logPoint: True if the trackpoint is a push log point.
+        @param temperature: The temperature in degrees celsius or None.
+        @param pressure: The air pressure in hectopascal or None.
+        """
+        pointType = Trackpoint.LOGPOINT if logPoint else 0
+        if temperature != None and pressure != None:
+            pointType |= max(0, min(0x1f, int(round((temperature + 10) / 2.0)))) << 2
+            pointType |= max(0, min(0x1ff, int(round(pressure)) - 589)) << 7
+        if self.trackStart:
+            pointType |= Trackpoint.TRACKSTART
+            self.trackStart = False
+        self.types.append(pointType)
+        self.timestamps.append(timestamp)
+        self.latitudes.append(latitude)
+        self.longitudes.append(longitude)
+        self.altitudes.append(max(-32768, min(32767, altitude)))
+        self.pushpointCount += logPoint
+        self.trackpointCount += 1
+        if len(self.timestamps) >= TKImporter.CHUNKSIZE:
+            self.writeChunk()
+
+    def startTrack(self):
+        """
+        Finish the current track; the next trackpoint starts a new track.
+        """
+        self.endTrack()
+        self.trackStart = True
+
+    def writeChunk(self):
+        """
+        Encode the collected trackpoints and append them to the output.
+        """
+        if not self.timestamps:
+            return
+        trackdata = packTrackpoints(self.types, array('I', map(convertFromTimestamp, self.timestamps)),
+                                    self.latitudes, self.longitudes, self.altitudes)
+        self.resetColumns()
+        if self.writer == None:
+            if self.createTk2:
+                self.fileHandle = io.BytesIO()
+            else:
+                self.fileHandle = createOutputFile(self.outputDir, self.filename, "%s", self.defaultFilename,
+                                                   flags = "wb", buffering = OUTPUT_BUFFER_SIZE)
+                self.fileCount += 1
+            self.writer = TK1Writer(self.fileHandle, self.devicename, self.deviceinfo, b"")
+        self.writer.write(trackdata)
+
+    def endTrack(self):
+        """
+        Finish the current track and write its .tk2 file.
+        """
+        self.writeChunk()
+        if self.createTk2 and self.writer != None:
+            self.writer.flush()
+            trackdata = self.fileHandle.getvalue()[TK1File.HEADERLEN:TK1File.HEADERLEN + self.writer.trackdataLen]
+            _, _, duration, length = self.writer.tracks[0]
+            tk2File = TK2File()
+            tk2File.init(self.devicename, self.deviceinfo, b"", self.writer.exporttimestamp, trackdata, duration,
+                         int(length * 1000), self.pushpointCount, "", utc)
+            f = createOutputFile(self.outputDir, None, "%s", tk2File.createFilename(), flags = "wb")
+            tk2File.write(f)
+            f.close()
+            self.fileCount += 1
+            self.writer = None
+            self.fileHandle = None
+        self.pushpointCount = 0
+
+    def close(self):
+        """
+        Finish the last track and close the output file.
+        """
+        self.endTrack()
+        if self.writer != None:
+            self.writer.flush()
+            self.fileHandle.close()
+            self.writer = None
+            self.fileHandle = None
+
+def parseNmeaCoordinate(value, hemisphere):
+    """
+    Convert a NMEA coordinate (dddmm.mmmm) into the trackpoint latitude/longitude field (degrees scaled by 1e7).
+    
+    Only integer arithmetic is used, so the conversion is exact up to the final rounding.
+    
+    @param value: The coordinate field as bytes.
+    @param hemisphere: The hemisphere field (N, S, E or W) as bytes.
+    @return: The coordinate field value.
+    """
+    whole, _, fraction = value.partition(b".")
+    scale = 10 ** len(fraction)
+    minutes = int(whole[-2:]) * scale + (int(fraction) if fraction else 0)
+    # Minutes to degrees scaled by 1e7, rounded to the nearest integer.
+    field = int(whole[:-2] or 0) * 10000000 + (minutes * 20000000 + 60 * scale) // (120 * scale)
+    if hemisphere in (b"S", b"W"):
+        field = -field
+    return field
+
+class NmeaParser:
+    """
+    This class parses the RMC and GGA sentences of a NMEA-0183 stream into trackpoints.
+
+    RMC provides date, time and position, GGA the altitude. A trackpoint is emitted as soon as both sentences of a
+    fix have been seen, or when the next fix starts without a matching GGA sentence.
+    Only the fields needed are converted and no string decoding takes place.
+    """
+
+    def __init__(self, emit):
+        """
+        Constructor.
+        
+        @param emit: Function called with dateTimeField, latitude, longitude and altitude of every trackpoint.
+        """
+        self.emit = emit
+        self.pending = None
+        self.ggaTime = None
+        self.altitude = 0
+
+    def parse(self, line):
+        """
+        Parse a single NMEA sentence. Invalid sentences and sentences without a fix are ignored.
+        
+        @param line: The sentence as bytes.
+        """
+        start = line.find(b"$")
+        end = line.rfind(b"*")
+        if start < 0 or end < start:
+            return
+        checksum = 0
+        for char in line[start + 1:end]:
+            checksum ^= char
+        try:
+            if checksum != int(line[end + 1:end + 3], 16):
+                return
+        except ValueError:
+            return
+        try:
+            self.parseFields(line[start + 3:start + 6], line[start:end].split(b","))
+        except (ValueError, IndexError):
+            # Ignore sentences with malformed fields.
+            pass
+
+    def parseFields(self, sentence, fields):
+        """
+        Process the fields of a sentence with correct checksum.
+        
+        @param sentence: The sentence type without talker id, e.g. RMC.
+        @param fields: The fields of the sentence as bytes.
+        """
+        if sentence == b"RMC":
+            if len(fields) < 10 or fields[2] != b"A":
+                return
+            fixTime = fields[1]
+            date = fields[9]
+            year = 2000 + int(date[4:6])
+            month = int(date[2:4])
+            day = int(date[0:2])
+            hour = int(fixTime[0:2])
+            minute = int(fixTime[2:4])
+            second = int(fixTime[4:6])
+            # Skip dates which can't be stored in a trackpoint, e.g. 1999 after a GPS week rollover.
+            if not (year < 2064 and 1 <= month <= 12 and 1 <= day <= 31 and hour < 24 and minute < 60 and
+                    second < 60):
+                return
+            # Raises ValueError for days beyond the end of the month.
+            getDayStart(((year - 2000) << 9) | (month << 5) | day)
+            dateTimeField = convertToDateTimeField(year, month, day, hour, minute, second)
+            latitude = parseNmeaCoordinate(fields[3], fields[4])
+            longitude = parseNmeaCoordinate(fields[5], fields[6])
+            self.flush()
+            if fixTime == self.ggaTime:
+                self.emit(dateTimeField, latitude, longitude, self.altitude)
+            else:
+                self.pending = (fixTime, dateTimeField, latitude, longitude)
+        elif sentence == b"GGA":
+            if len(fields) < 10 or fields[6] in (b"", b"0") or fields[9] == b"":
+                return
+            self.ggaTime = fields[1]
+            self.altitude = max(-32768, min(32767, round(float(fields[9]))))
+            if self.pending != None and self.pending[0] == self.ggaTime:
+                self.flush()
+
+    def flush(self):
+        """
+        Emit the pending trackpoint with the last known altitude.
+        """
+        if self.pending != None:
+            _, dateTimeField, latitude, longitude = self.pending
+            self.pending = None
+            self.emit(dateTimeField, latitude, longitude, self.altitude)
+
+OUTPUT_BUFFER_SIZE = 1024 * 1024
+""" The buffer size in bytes for output files written by the converters. """
+
+def createOutputFile(outputDir, filename, template, value, flags = "w", buffering = -1, compression = None,
+                     threads = 1):
+    """
+    Create output file.
+    
+    If outputDir is None, the file is created in the current directory.
+    If filename is None, the file name is created by applying value to template. 
+    If compression is None, a filename ending with a compression extension selects the compression.
+    
+    @param outputDir: The output directory.
+    @param filename: The output file name.
+    @param template: The file name template.
+    @param value: The file name template value.
+    @param flags: The file open mode flags.
+    @param buffering: The buffer size in bytes; -1 for the default buffer size, see L{open()}.
+    @param compression: The compression (see L{COMPRESSION_EXTENSIONS}) or None.
+    @param threads: The number of compression threads, see L{CompressedFile}.
+    @return: An open writeable filehandle; compressed text files are UTF-8 encoded.
+    """
+    filename = getOutputFileName(outputDir, filename, template, value, compression)
+    if compression == None:
+        compression = getCompression(filename)
+    print('Create %s' % filename)
+    if compression == None:
+        return open(filename, flags, buffering)
+    outputFile = CompressedFile(open(filename, "wb"), compression, threads)
+    if buffering != 0:
+        outputFile = io.BufferedWriter(outputFile, buffering if buffering > 1 else io.DEFAULT_BUFFER_SIZE)
+    if "b" in flags:
+        return outputFile
+    return io.TextIOWrapper(outputFile, encoding = "utf-8", line_buffering = buffering == 1)
+
+def getOutputFileName(outputDir, filename, template, value, compression = None):
+    """
+    Get the name of an output file as created by L{createOutputFile()}.
+    
+    @param outputDir: The output directory.
+    @param filename: The output file name.
+    @param template: The file name template.
+    @param value: The file name template value.
+    @param compression: The compression (see L{COMPRESSION_EXTENSIONS}) or None.
+    @return: The file name including the output directory.
+    """
+    if not filename:
+        filename = template % value
+    if compression != None and not filename.endswith(COMPRESSION_EXTENSIONS[compression]):
+        filename += COMPRESSION_EXTENSIONS[compression]
+    if outputDir:
+        filename = os.path.join(outputDir, filename) 
+    return filename
+
+CONVERSION_CACHE_FILE = os.path.join(os.environ.get("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache")),
+                                     "wintec", "conversions.json")
+""" The default file of the L{ConversionCache}. """
+
+CONVERSION_CACHE_ENTRIES = 10000
+""" The maximum number of conversions kept by the L{ConversionCache}; the least recently used ones are removed. """
+
+def getFileState(fileName):
+    """
+    Get size and modification time of a file.
+    
+    @param fileName: The file name; for pack members the state of the pack file.
+    @return: A list of size and modification time in nanoseconds; None if the file doesn't exist.
+    """
+    try:
+        stat = os.stat(splitPackPath(fileName)[0])
+    except OSError:
+        return None
+    return [stat.st_size, stat.st_mtime_ns]
+
+def computeSha256(data):
+    """
+    Compute the SHA-256 hash of data. hashlib is imported on first use, as it loads OpenSSL, which takes about a
+    tenth of the start time of a tool.
+    
+    @param data: The data as array of bytes.
+    @return: The hash object.
+    """
+    import hashlib # pylint: disable-msg=C0415
+    return hashlib.sha256(data)
+
+def hashTKFile(fileName):
+    """
+    Compute the SHA-256 hash of a wintec file, see L{openTKFile()}.
+    
+    @param fileName: The name of the wintec file, compressed file or pack member.
+    @return: The hash as hex string.
+    """
+    f, offset, length = openTKFile(fileName)
+    f.seek(offset)
+    contentHash = computeSha256(f.read(length)).hexdigest()
+    f.close()
+    return contentHash
+
+class ConversionCache:
+    """
+    This class records the conversions done by the tools to skip conversions with unchanged inputs.
+
+    A conversion is identified by a key, e.g. the tool and the output file name. It is unchanged, if the tool
+    L{VERSION}, the options and the input file hashes are the same and the output files still exist unmodified.
+    The hash of an input file is only computed again, if its size or modification time has changed.
+    Several tools may use the cache file at the same time, so only the conversions changed by this cache are
+    merged into the cache file when it is written.
+    """
+
+    def __init__(self, fileName = CONVERSION_CACHE_FILE, force = False):
+        """
+        Constructor.
+        
+        @param fileName: The cache file.
+        @param force: True to treat all conversions as changed.
+        """
+        self.fileName = fileName
+        self.force = force
+        self.entries = self.readEntries()
+        self.changed = set()
+        self.removed = set()
+
+    def readEntries(self):
+        """
+        Read the conversions from the cache file.
+        
+        @return: A map of conversion key and entry; empty if the cache file doesn't exist or is damaged.
+        """
+        try:
+            f = open(self.fileName, "r", encoding = "utf-8")
+        except OSError:
+            return {}
+        try:
+            return json.load(f)
+        except ValueError:
+            # A damaged cache only costs a conversion.
+            return {}
+        finally:
+            f.close()
+
+    def getInputStates(self, inputNames, entry):
+        """
+        Get name, size, modification time and hash of the input files.
+        
+        @param inputNames: The names of the input files.
+        @param entry: The cached conversion entry or None; the hashes of files with unchanged size and modification
+                      time are taken from it.
+        @return: A list with a list of name, size, modification time and hash for every input file;
+                 None if an input file is missing.
+        """
+        cached = {}
+        if entry != None:
+            cached = dict([(name, (size, modificationTime, contentHash))
+                           for name, size, modificationTime, contentHash in entry["inputs"]])
+        states = []
+        for inputName in inputNames:
+            inputName = os.path.abspath(inputName)
+            state = getFileState(inputName)
+            if state == None:
+                return None
+            size, modificationTime = state
+            previous = cached.get(inputName)
+            if previous != None and previous[:2] == (size, modificationTime):
+                contentHash = previous[2]
+            else:
+                try:
+                    contentHash = hashTKFile(inputName)
+                except OSError:
+                    # The input file was removed after getting its state.
+                    return None
+            states.append([inputName, size, modificationTime, contentHash])
+        return states
+
+    def isUnchanged(self, key, options, inputNames):
+        """
+        Test whether a conversion was already done with the same inputs and options.
+        
+        @param key: The conversion key.
+        @param options: The options of the conversion as list of option and value.
+        @param inputNames: The names of the input files.
+        @return: True if the conversion can be skipped; False otherwise.
+        """
+        entry = self.entries.get(key)
+        if self.force or entry == None or entry["options"] != [VERSION] + [list(option) for option in options]:
+            return False
+        if [os.path.abspath(inputName) for inputName in inputNames] != [state[0] for state in entry["inputs"]]:
+            return False
+        for outputName, size, modificationTime in entry["outputs"]:
+            if getFileState(outputName) != [size, modificationTime]:
+                return False
+        states = self.getInputStates(inputNames, entry)
+        if states == None or [state[3] for state in states] != [state[3] for state in entry["inputs"]]:
+            return False
+        entry["inputs"] = states
+        entry["used"] = time.time()
+        self.changed.add(key)
+        return True
+
+    def update(self, key, options, inputNames, outputNames):
+        """
+        Record a conversion. A conversion whose input or output files are missing is removed instead.
+        
+        @param key: The conversion key.
+        @param options: The options of the conversion as list of option and value.
+        @param inputNames: The names of the input files.
+        @param outputNames: The names of the created files.
+        """
+        states = self.getInputStates(inputNames, self.entries.get(key))
+        outputs = [[os.path.abspath(outputName), getFileState(outputName)] for outputName in outputNames]
+        if states == None or [output for output in outputs if output[1] == None]:
+            self.entries.pop(key, None)
+            self.changed.discard(key)
+            self.removed.add(key)
+            return
+        self.entries[key] = {"options": [VERSION] + [list(option) for option in options],
+                             "inputs": states,
+                             "outputs": [[outputName] + state for outputName, state in outputs],
+                             "used": time.time()}
+        self.changed.add(key)
+        self.removed.discard(key)
+
+    def close(self):
+        """
+        Write the cache file.
+        
+        The cache file is read again and the conversions changed or removed by this cache are merged into it, so
+        conversions recorded by other tools in the meantime are kept. Conversions whose output files are missing
+        and the least recently used conversions exceeding L{CONVERSION_CACHE_ENTRIES} are removed. The merged
+        conversions are written to a unique temporary file, which replaces the cache file. Where available, an
+        exclusive lock on the lock file next to the cache file serializes the tools writing the cache.
+        """
+        directory = os.path.dirname(os.path.abspath(self.fileName))
+        if not os.path.exists(directory):
+            os.makedirs(directory, exist_ok = True)
+        lockFile = open(self.fileName + ".lock", "a")
+        try:
+            try:
+                import fcntl # pylint: disable-msg=C0415
+                fcntl.flock(lockFile, fcntl.LOCK_EX)
+            except ImportError:
+                # No file locking on Windows, merging the entries still keeps most concurrent conversions.
+                pass
+            self.writeEntries(directory)
+        finally:
+            # Closing the lock file releases the lock.
+            lockFile.close()
+
+    def writeEntries(self, directory):
+        """
+        Merge the conversions changed or removed by this cache into the cache file, see L{close()}.
+        
+        @param directory: The directory of the cache file.
+        """
+        import tempfile # pylint: disable-msg=C0415
+        entries = self.readEntries()
+        for key in self.changed:
+            entries[key] = self.entries[key]
+        for key in self.removed:
+            entries.pop(key, None)
+        modified = len(self.changed) + len(self.removed) > 0
+        keys = [key for key, entry in entries.items()
+                if [output for output in entry["outputs"] if not os.path.exists(output[0])]]
+        keys += sorted(entries, key = lambda key: entries[key]["used"], reverse = True)[CONVERSION_CACHE_ENTRIES:]
+        for key in keys:
+            if entries.pop(key, None) != None:
+                modified = True
+        self.entries = entries
+        self.changed = set()
+        self.removed = set()
+        if not modified:
+            return
+        handle, tempName = tempfile.mkstemp(prefix = os.path.basename(self.fileName) + ".", suffix = ".tmp",
+                                            dir = directory)
+        try:
+            f = os.fdopen(handle, "w", encoding = "utf-8")
+            try:
+                json.dump(entries, f)
+            finally:
+                f.close()
+            os.replace(tempName, self.fileName)
+        except BaseException:
+            os.remove(tempName)
+            raise
+
+COMPRESSION_EXTENSIONS = {"gz": ".gz", "xz": ".xz", "zst": ".zst"}
+""" A map of the supported compressions and their file name extensions; zst needs zstandard. """
+
+COMPRESSION_BLOCKSIZE = 1024 * 1024
+""" The size in bytes of the blocks compressed in parallel by L{CompressedFile}. """
+
+decompressedcache = {} # pylint: disable-msg=C0103
+""" A map of the last decompressed file name and a tuple of modification time and content. """
+
+def importZstandard():
+    """
+    Import zstandard on first use.
+    
+    @return: The zstandard module or None if zstandard isn't installed.
+    """
+    try:
+        import zstandard
+    except ImportError:
+        return None
+    return zstandard
+
+def getCompression(fileName):
+    """
+    Get the compression of a file from its file name extension.
+    
+    @param fileName: The file name.
+    @return: The compression (see L{COMPRESSION_EXTENSIONS}) or None for uncompressed files.
+    """
+    for compression, extension in COMPRESSION_EXTENSIONS.items():
+        if fileName.endswith(extension):
+            return compression
+    return None
+
+def createCompressor(compression):
+    """
+    Create a compressor object with compress() and flush() methods for a compression.
+    
+    @param compression: The compression, see L{COMPRESSION_EXTENSIONS}.
+    @return: The compressor object.
+    @raise IOError: If zstandard isn't installed for zst compression.
+    """
+    if compression == "gz":
+        return zlib.compressobj(6, zlib.DEFLATED, 31)
+    if compression == "xz":
+        import lzma
+        return lzma.LZMACompressor()
+    zstandard = importZstandard()
+    if zstandard == None:
+        raise IOError("zst compression needs zstandard (pip install zstandard)!")
+    return zstandard.ZstdCompressor().compressobj()
+
+def compressOutputBlock(compression, data):
+    """
+    Compress data into a complete gzip member, xz stream or zstd frame. Concatenated blocks are valid files.
+    
+    @param compression: The compression, see L{COMPRESSION_EXTENSIONS}.
+    @param data: The data to compress.
+    @return: The compressed data.
+    """
+    compressor = createCompressor(compression)
+    return compressor.compress(data) + compressor.flush()
+
+def openCompressedFile(fileName):
+    """
+    Open a file for reading, compressed files (see L{getCompression()}) are decompressed while reading.
+    
+    @param fileName: The file name.
+    @return: A binary file object.
+    @raise IOError: If zstandard isn't installed for zst compressed files.
+    """
+    compression = getCompression(fileName)
+    if compression == None:
+        return open(fileName, "rb")
+    if compression == "gz":
+        import gzip
+        return gzip.open(fileName, "rb")
+    if compression == "xz":
+        import lzma
+        return lzma.open(fileName, "rb")
+    zstandard = importZstandard()
+    if zstandard == None:
+        raise IOError("%s: zst decompression needs zstandard (pip install zstandard)!" % fileName)
+    return io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(open(fileName, "rb"), closefd = True,
+                                                                        read_across_frames = True))
+
+def readCompressedFile(fileName):
+    """
+    Read and decompress a file. The content of the last file is cached, as L{TKFileReference} reads a file several
+    times.
+    
+    @param fileName: The file name.
+    @return: The decompressed content.
+    """
+    modificationTime = os.path.getmtime(fileName)
+    cached = decompressedcache.get(fileName)
+    if cached == None or cached[0] != modificationTime:
+        f = openCompressedFile(fileName)
+        cached = (modificationTime, f.read())
+        f.close()
+        decompressedcache.clear()
+        decompressedcache[fileName] = cached
+    return cached[1]
+
+class CompressedFile(io.BufferedIOBase):
+    """
+    This class is a binary output stream, which compresses the data written to the underlying file.
+    
+    With one thread the data is compressed as single stream. With more threads the data is split into blocks of
+    L{COMPRESSION_BLOCKSIZE} bytes, which are compressed in parallel into concatenated gzip members, xz streams or
+    zstd frames. zlib, lzma and zstandard release the global interpreter lock while compressing, so all cores are
+    used.
+    """
+
+    def __init__(self, fileHandle, compression, threads = 1):
+        """
+        Constructor.
+        
+        @param fileHandle: The binary output file.
+        @param compression: The compression, see L{COMPRESSION_EXTENSIONS}.
+        @param threads: The number of compression threads; 0 uses all processors.
+        """
+        io.BufferedIOBase.__init__(self)
+        self.fileHandle = fileHandle
+        self.compression = compression
+        if threads == 0:
+            threads = os.cpu_count() or 1
+        self.threads = threads
+        self.executor = None
+        self.compressor = None
+        if threads > 1:
+            from concurrent.futures import ThreadPoolExecutor
+            self.executor = ThreadPoolExecutor(threads)
+            self.pending = []
+            self.block = bytearray()
+        else:
+            self.compressor = createCompressor(compression)
+
+    def writable(self):
+        """
+        @return: True.
+        """
+        return True
+
+    def write(self, data):
+        """
+        Compress and write data.
+        
+        @param data: The data.
+        @return: The number of bytes written.
+        """
+        if self.compressor != None:
+            self.fileHandle.write(self.compressor.compress(data))
+            return len(data)
+        self.block += data
+        if len(self.block) >= COMPRESSION_BLOCKSIZE:
+            self.submitBlock()
+        return len(data)
+
+    def submitBlock(self):
+        """
+        Compress the current block in the background and write the oldest compressed blocks, so at most two blocks
+        per thread are held in memory.
+        """
+        self.pending.append(self.executor.submit(compressOutputBlock, self.compression, bytes(self.block)))
+        self.block = bytearray()
+        while len(self.pending) > 2 * self.threads or (self.pending and self.pending[0].done()):
+            self.fileHandle.write(self.pending.pop(0).result())
+
+    def close(self):
+        """
+        Write the remaining data and close the underlying file.
+        """
+        if self.closed:
+            return
+        try:
+            if self.compressor != None:
+                self.fileHandle.write(self.compressor.flush())
+            else:
+                if self.block:
+                    self.submitBlock()
+                for future in self.pending:
+                    self.fileHandle.write(future.result())
+        finally:
+            if self.executor != None:
+                self.executor.shutdown(cancel_futures = True)
+            self.fileHandle.close()
+            io.BufferedIOBase.close(self)
+
+COLUMNAR_FORMATS = ("parquet", "arrow", "npz")
+""" The file formats supported by L{ColumnarWriter}; parquet and arrow need pyarrow. """
+
+COLUMNAR_COLUMNS = ("file", "track", "time", "lat", "lon", "alt", "flags", "temperature", "pressure")
+""" The columns written by L{ColumnarWriter}. """
+
+NPY_TYPES = {'B': '|u1', 'h': '<i2', 'i': '<i4', 'q': '<i8', 'f': '<f4', 'd': '<f8'}
+""" A map of array type codes and the corresponding numpy type descriptions. """
+
+def importPyarrow():
+    """
+    Import pyarrow with its parquet and ipc modules on first use. Importing pyarrow takes longer than most tools
+    need to run, so it is never imported at startup.
+    
+    @return: The pyarrow module or None if pyarrow isn't installed.
+    """
+    # pylint: disable-msg=W0612
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:
+        return None
+    return pyarrow
+
+def createNpyData(values, descr = None):
+    """
+    Create the content of a one-dimensional .npy file (numpy format version 1.0).
+    
+    @param values: An array; a list of strings is stored as unicode array.
+    @param descr: The numpy type description or None to derive it from the array type code.
+    @return: The .npy file content as bytes.
+    """
+    if isinstance(values, list):
+        width = max([len(value) for value in values] + [1])
+        descr = "<U%i" % width
+        data = b"".join(value.ljust(width, chr(0)).encode("utf-32-le") for value in values)
+    else:
+        if descr == None:
+            descr = NPY_TYPES[values.typecode]
+        if sys.byteorder != "little":
+            values = array(values.typecode, values)
+            values.byteswap()
+        data = values.tobytes()
+    header = "{'descr': '%s', 'fortran_order': False, 'shape': (%i,), }" % (descr, len(values))
+    # The header is padded, so the data starts at a multiple of 64 bytes.
+    header = header.ljust(64 * ((len(header) + 11) // 64 + 1) - 11) + "\n"
+    return b"\x93NUMPY\x01\x00" + struct.pack("<H", len(header)) + header.encode("latin1") + data
+
+class NpzPartitionWriter:
+    """
+    This class collects the trackpoint columns of a partition and writes them as .npz file on L{close()}.
+
+    The .npz file is written without numpy; temperature and air pressure are stored as float with NaN for log
+    version 1.0 trackpoints.
+    """
+
+    def __init__(self, fileName):
+        """
+        Constructor.
+        
+        @param fileName: The name of the .npz file.
+        """
+        self.fileName = fileName
+        self.files = []
+        self.values = {"track": array('i'), "time": array('q'), "lat": array('d'), "lon": array('d'),
+                       "alt": array('h'), "flags": array('B'), "temperature": array('f'), "pressure": array('f')}
+
+    def write(self, fileName, trackNumber, values):
+        """
+        Add the trackpoints of a track.
+        
+        @param fileName: The name of the TK file.
+        @param trackNumber: The number of the track in the TK file.
+        @param values: A map of column names and arrays, see L{ColumnarWriter.createValues()}.
+        """
+        count = len(values["time"])
+        self.files.extend([fileName] * count)
+        self.values["track"].extend(array('i', [trackNumber]) * count)
+        for name in ("time", "lat", "lon", "alt", "flags"):
+            self.values[name].extend(values[name])
+        for name in ("temperature", "pressure"):
+            if values[name] == None:
+                self.values[name].extend(array('f', [float('nan')]) * count)
+            else:
+                self.values[name].extend(array('f', values[name]))
+
+    def close(self):
+        """
+        Write the .npz file.
+        """
+        import zipfile # pylint: disable-msg=C0415
+        npz = zipfile.ZipFile(self.fileName, "w")
+        try:
+            npz.writestr("file.npy", createNpyData(self.files))
+            for name in COLUMNAR_COLUMNS[1:]:
+                npz.writestr("%s.npy" % name, createNpyData(self.values[name], "<M8[s]" if name == "time" else None))
+        finally:
+            npz.close()
+
+class ArrowPartitionWriter:
+    """
+    This class writes the trackpoint columns of a partition track by track into a Parquet or Arrow IPC file.
+
+    Temperature and air pressure are null for log version 1.0 trackpoints.
+    """
+
+    def __init__(self, fileName, fileFormat):
+        """
+        Constructor.
+        
+        @param fileName: The name of the output file.
+        @param fileFormat: "parquet" or "arrow".
+        """
+        pyarrow = self.pyarrow = importPyarrow()
+        self.schema = pyarrow.schema([("file", pyarrow.string()), ("track", pyarrow.int32()),
+                                      ("time", pyarrow.timestamp("s", tz = "UTC")), ("lat", pyarrow.float64()),
+                                      ("lon", pyarrow.float64()), ("alt", pyarrow.int16()),
+                                      ("flags", pyarrow.uint8()), ("temperature", pyarrow.int16()),
+                                      ("pressure", pyarrow.int16())])
+        if fileFormat == "parquet":
+            self.writer = pyarrow.parquet.ParquetWriter(fileName, self.schema)
+        else:
+            self.writer = pyarrow.ipc.new_file(fileName, self.schema)
+
+    def write(self, fileName, trackNumber, values):
+        """
+        Write the trackpoints of a track.
+        
+        @param fileName: The name of the TK file.
+        @param trackNumber: The number of the track in the TK file.
+        @param values: A map of column names and arrays, see L{ColumnarWriter.createValues()}.
+        """
+        pyarrow = self.pyarrow
+        count = len(values["time"])
+        columns = [pyarrow.array([fileName] * count, pyarrow.string()),
+                   pyarrow.array([trackNumber] * count, pyarrow.int32())]
+        for field in list(self.schema)[2:]:
+            value = values[field.name]
+            if value == None:
+                columns.append(pyarrow.nulls(count, field.type))
+            else:
+                # The arrays are passed to pyarrow without copying.
+                columns.append(pyarrow.Array.from_buffers(field.type, count, [None, pyarrow.py_buffer(value)]))
+        self.writer.write_table(pyarrow.Table.from_arrays(columns, schema = self.schema))
+
+    def close(self):
+        """
+        Close the output file.
+        """
+        self.writer.close()
+
+class ColumnarWriter:
+    """
+    This class writes trackpoints as columnar files for data analysis, partitioned by date (UTC).
+
+    Every partition is a directory named date=YYYY-MM-DD containing part-NNNNN files, as read by pandas and pyarrow
+    datasets. The columns are:
+    file name, track number, UTC time, latitude, longitude, altitude, flags (trackstart, push log point and, for
+    log version 1.0, over speed) and temperature and air pressure of WSG-1000 log version 2.0 trackpoints.
+
+    The tracks are expected in chronological order: a partition is closed as soon as a track starts on a later day.
+    """
+
+    def __init__(self, outputDir, fileFormat):
+        """
+        Constructor.
+        
+        @param outputDir: The output directory or None for the current directory.
+        @param fileFormat: One of L{COLUMNAR_FORMATS}.
+        """
+        assert fileFormat in COLUMNAR_FORMATS
+        self.outputDir = outputDir if outputDir else "."
+        self.fileFormat = fileFormat
+        self.partitions = {}
+        self.partCounts = {}
+        self.trackpointCount = 0
+
+    def writeTrack(self, fileName, trackNumber, track, logVersion):
+        """
+        Write the trackpoints of a track into the partitions of their dates.
+        
+        @param fileName: The name of the TK file stored in the file column.
+        @param trackNumber: The number of the track in the TK file.
+        @param track: The L{Track}.
+        @param logVersion: The log version of the TK file.
+        """
+        columns = track.getColumns()
+        count = len(columns)
+        if count == 0:
+            return
+        timestamps = columns.timestamps
+        firstDay = min(timestamps) // TK1File.SECONDS_PER_DAY
+        for day in sorted(self.partitions.keys()):
+            if day < firstDay:
+                self.closePartition(day)
+        values = self.createValues(columns, logVersion)
+        if firstDay == max(timestamps) // TK1File.SECONDS_PER_DAY:
+            runs = [(0, count, firstDay)]
+        else:
+            runs = []
+            start = 0
+            day = timestamps[0] // TK1File.SECONDS_PER_DAY
+            for index in range(1, count):
+                if timestamps[index] // TK1File.SECONDS_PER_DAY != day:
+                    runs.append((start, index, day))
+                    start = index
+                    day = timestamps[index] // TK1File.SECONDS_PER_DAY
+            runs.append((start, count, day))
+        for start, end, day in runs:
+            if start > 0 or end < count:
+                runValues = dict((name, value[start:end] if value != None else None) for name, value in values.items())
+            else:
+                runValues = values
+            self.getPartition(day).write(fileName, trackNumber, runValues)
+        self.trackpointCount += count
+
+    def createValues(self, columns, logVersion):
+        """
+        Create the column arrays of a track.
+        
+        @param columns: The L{TrackColumns} of the track.
+        @param logVersion: The log version of the TK file.
+        @return: A map of column names and arrays; temperature and pressure are None for log version 1.0.
+        """
+        values = {"time": columns.timestamps, "alt": columns.altitudes,
+                  "lat": array('d', [value / 10000000.0 for value in columns.latitudes]),
+                  "lon": array('d', [value / 10000000.0 for value in columns.longitudes])}
+        if logVersion >= 2.0:
+            # See Trackpoint.getTemperature() and Trackpoint.getAirPressure().
+            values["flags"] = array('B', [value & 0x03 for value in columns.types])
+            values["temperature"] = array('h', [2 * ((value >> 2) & 0x1f) - 10 for value in columns.types])
+            values["pressure"] = array('h', [(value >> 7) + 589 for value in columns.types])
+        else:
+            values["flags"] = array('B', [value & 0x07 for value in columns.types])
+            values["temperature"] = values["pressure"] = None
+        return values
+
+    def getPartition(self, day):
+        """
+        Get the writer of a partition, creating a new part file if the partition isn't open.
+        
+        @param day: The days since the epoch.
+        @return: The partition writer.
+        """
+        if day not in self.partitions:
+            directory = os.path.join(self.outputDir,
+                                     "date=%s" % datetime.date.fromordinal(day + EPOCH_ORDINAL).isoformat())
+            if not os.path.exists(directory):
+                os.makedirs(directory)
+            part = self.partCounts.get(day, 0)
+            self.partCounts[day] = part + 1
+            fileName = os.path.join(directory, "part-%05i.%s" % (part, self.fileFormat))
+            print("Create %s" % fileName)
+            if self.fileFormat == "npz":
+                self.partitions[day] = NpzPartitionWriter(fileName)
+            else:
+                self.partitions[day] = ArrowPartitionWriter(fileName, self.fileFormat)
+        return self.partitions[day]
+
+    def closePartition(self, day):
+        """
+        Close a partition.
+        
+        @param day: The days since the epoch.
+        """
+        self.partitions.pop(day).close()
+
+    def close(self):
+        """
+        Close all partitions.
+        """
+        for day in list(self.partitions.keys()):
+            self.closePartition(day)
+
+def encodeVarints(values):
+    """
+    Encode non-negative integers as LEB128 varints, prefixed by a mode byte.
+    
+    If all values are less than 128, each value is stored in a single byte without the loop over the values.
+    
+    @param values: A list of non-negative integers.
+    @return: The encoded values as bytes.
+    """
+    if not values or max(values) < 0x80:
+        return b"\x00" + bytes(values)
+    data = bytearray(b"\x01")
+    for value in values:
+        while value >= 0x80:
+            data.append((value & 0x7f) | 0x80)
+            value >>= 7
+        data.append(value)
+    return bytes(data)
+
+def decodeVarints(data, pos, count):
+    """
+    Decode values encoded by L{encodeVarints()}.
+    
+    @param data: The encoded data.
+    @param pos: The position of the mode byte.
+    @param count: The number of values.
+    @return: Tuple of the list of values and the position after the last value.
+    """
+    pos += 1
+    if data[pos - 1] == 0:
+        return list(data[pos:pos + count]), pos + count
+    values = []
+    value = shift = 0
+    while len(values) < count:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7f) << shift
+        if byte & 0x80:
+            shift += 7
+        else:
+            values.append(value)
+            value = shift = 0
+    return values, pos
+
+def encodeDeltas(values):
+    """
+    Encode integers as zigzag encoded differences to their predecessors, see L{encodeVarints()}.
+    
+    @param values: An iterable of integers.
+    @return: The encoded values as bytes.
+    """
+    previous = 0
+    zigzags = []
+    for value in values:
+        delta = value - previous
+        previous = value
+        zigzags.append(delta << 1 if delta >= 0 else ((-delta) << 1) - 1)
+    return encodeVarints(zigzags)
+
+def decodeDeltas(data, pos, count):
+    """
+    Decode values encoded by L{encodeDeltas()}.
+    
+    @param data: The encoded data.
+    @param pos: The position of the mode byte.
+    @param count: The number of values.
+    @return: Tuple of the list of values and the position after the last value.
+    """
+    zigzags, pos = decodeVarints(data, pos, count)
+    return list(accumulate([zigzag >> 1 if not zigzag & 1 else -((zigzag + 1) >> 1) for zigzag in zigzags])), pos
+
+def splitTrackdata(trackdata):
+    """
+    Split trackdata into the data of the single trackpoints.
+    
+    @param trackdata: The trackdata as array of bytes.
+    @return: A list with the data of every trackpoint.
+    """
+    return [trackdata[pos:pos + Trackpoint.TRACKPOINTLEN] for pos in range(0, len(trackdata), Trackpoint.TRACKPOINTLEN)]
+
+PACK_MARKER = b"WintecPack01\x00\x00\x00\x00"
+""" The identification marker at the beginning and the end of a pack file. """
+
+PACK_EXTENSION = ".tkp"
+""" The file extension of pack files. """
+
+PACK_SEPARATOR = "#"
+""" The separator between pack file name and member name, e.g. 2008-05.tkp#20080501_101010.tk2. """
+
+PACK_TRAILER = struct.Struct("<QI16s")
+""" The end of a pack file: directory offset, directory length and pack marker. """
+
+PACK_ENTRY = struct.Struct("<HQI")
+""" The start of a pack directory entry: name length, offset and length of the member. """
+
+PACK_PREFIXLEN = TK1File.HEADERLEN + Trackpoint.TRACKPOINTLEN
+""" The number of bytes at the beginning of every member stored in the pack directory: header and first trackpoint. """
+
+packcache = {} # pylint: disable-msg=C0103
+""" A map of pack file names and tuples of modification time and L{TKPack} object. """
+
+class TKPackMember:
+    """
+    This class represents a wintec file stored in a L{TKPack}.
+    """
+
+    def __init__(self, name, offset, length, prefix):
+        """
+        Constructor.
+        
+        @param name: The member name.
+        @param offset: The offset of the member data in the pack file.
+        @param length: The length of the member data.
+        @param prefix: The header and the first trackpoint of the member.
+        """
+        self.name = name
+        self.offset = offset
+        self.length = length
+        self.prefix = prefix
+
+class TKPack:
+    """
+    This class reads a pack file, which consolidates many wintec files into a single file.
+
+    The members are stored unchanged one after the other, followed by a compressed directory with the name, the
+    position, the header and the first trackpoint of every member. Members are addressed as pack#member by
+    L{readTKFile()}, L{TKFileReference} and L{globTKFiles()}.
+    """
+
+    def __init__(self, fileName):
+        """
+        Constructor. Only the directory is read.
+        
+        @param fileName: The name of the pack file.
+        @raise IOError: If the file isn't a pack file.
+        """
+        self.fileName = fileName
+        self.members = []
+        self.memberIndex = {}
+        f = open(fileName, "rb")
+        try:
+            f.seek(-PACK_TRAILER.size, os.SEEK_END)
+            self.directoryOffset, directoryLength, marker = PACK_TRAILER.unpack(f.read())
+            if marker != PACK_MARKER:
+                raise IOError("%s is not a pack file!" % fileName)
+            f.seek(self.directoryOffset)
+            directory = zlib.decompress(f.read(directoryLength))
+        finally:
+            f.close()
+        pos = 0
+        while pos < len(directory):
+            nameLength, offset, length = PACK_ENTRY.unpack(directory[pos:pos + PACK_ENTRY.size])
+            pos += PACK_ENTRY.size
+            name = directory[pos:pos + nameLength].decode("utf-8")
+            pos += nameLength
+            prefixLength = min(length, PACK_PREFIXLEN)
+            member = TKPackMember(name, offset, length, directory[pos:pos + prefixLength])
+            pos += prefixLength
+            self.members.append(member)
+            self.memberIndex[name] = member
+
+    def getMembers(self):
+        """
+        Get the members of the pack.
+        
+        @return: A list of L{TKPackMember} objects.
+        """
+        return self.members
+
+    def getMember(self, name):
+        """
+        Get a member by name.
+        
+        @param name: The member name.
+        @return: The L{TKPackMember} or None.
+        """
+        return self.memberIndex.get(name)
+
+    def readMember(self, member):
+        """
+        Read the data of a member.
+        
+        @param member: The L{TKPackMember}.
+        @return: The wintec file content.
+        """
+        f = open(self.fileName, "rb")
+        f.seek(member.offset)
+        data = f.read(member.length)
+        f.close()
+        return data
+
+class TKPackWriter:
+    """
+    This class creates a pack file or adds wintec files to an existing one, see L{TKPack}.
+    """
+
+    def __init__(self, fileName):
+        """
+        Constructor.
+        
+        @param fileName: The name of the pack file. An existing pack file is extended.
+        """
+        self.fileName = fileName
+        if os.path.exists(fileName):
+            pack = getPack(fileName)
+            self.members = list(pack.getMembers())
+            self.fileHandle = open(fileName, "r+b")
+            self.fileHandle.seek(pack.directoryOffset)
+        else:
+            self.members = []
+            self.fileHandle = open(fileName, "wb")
+            self.fileHandle.write(PACK_MARKER)
+        self.names = set([member.name for member in self.members])
+
+    def addFile(self, name, data):
+        """
+        Add a wintec file.
+        
+        @param name: The member name; must not contain the L{PACK_SEPARATOR}.
+        @param data: The content of the wintec file.
+        @return: False if the pack already contains a member with this name; True otherwise.
+        """
+        assert PACK_SEPARATOR not in name
+        if name in self.names:
+            return False
+        offset = self.fileHandle.tell()
+        self.fileHandle.write(data)
+        self.members.append(TKPackMember(name, offset, len(data), data[:PACK_PREFIXLEN]))
+        self.names.add(name)
+        return True
+
+    def close(self):
+        """
+        Write the directory and close the pack file.
+        """
+        directory = []
+        for member in self.members:
+            name = member.name.encode("utf-8")
+            directory.append(PACK_ENTRY.pack(len(name), member.offset, member.length) + name + member.prefix)
+        directory = zlib.compress(b"".join(directory))
+        offset = self.fileHandle.tell()
+        self.fileHandle.write(directory)
+        self.fileHandle.write(PACK_TRAILER.pack(offset, len(directory), PACK_MARKER))
+        self.fileHandle.truncate()
+        self.fileHandle.close()
+        packcache.pop(self.fileName, None)
+
+def getPack(fileName):
+    """
+    Get the L{TKPack} of a pack file. The directories are cached, so a pack file is read only once.
+    
+    @param fileName: The name of the pack file.
+    @return: The L{TKPack}.
+    """
+    modificationTime = os.path.getmtime(fileName)
+    cached = packcache.get(fileName)
+    if cached == None or cached[0] != modificationTime:
+        cached = packcache[fileName] = (modificationTime, TKPack(fileName))
+    return cached[1]
+
+def splitPackPath(fileName):
+    """
+    Split a name of the form pack#member into the pack file name and the member name.
+    
+    @param fileName: The file name.
+    @return: Tuple of pack file name and member name; the member name is None for other file names.
+    """
+    position = fileName.find(PACK_EXTENSION + PACK_SEPARATOR)
+    if position < 0:
+        return fileName, None
+    position += len(PACK_EXTENSION)
+    return fileName[:position], fileName[position + len(PACK_SEPARATOR):]
+
+LOD_EXTENSION = ".lod"
+""" The extension appended to the TK file name for the level of detail sidecar file. """
+
+def globTKFiles(pattern):
+    """
+    Expand a file name pattern like glob(), including members of pack files.
+    
+    A pack file matched by the pattern is expanded to all of its members, the pattern pack#member selects the
+    members matching the member pattern. Level of detail sidecar files (see tklod.py) are skipped.
+    
+    @param pattern: The file name pattern, e.g. "*.tk2", "2008-*.tkp" or "2008-05.tkp#*_10*.tk2".
+    @return: A list of file names.
+    """
+    packPattern, memberPattern = splitPackPath(pattern)
+    fileNames = []
+    for fileName in glob.glob(packPattern):
+        if fileName.endswith(LOD_EXTENSION):
+            continue
+        if fileName.endswith(PACK_EXTENSION) and os.path.isfile(fileName):
+            for member in getPack(fileName).getMembers():
+                if memberPattern == None or fnmatch.fnmatchcase(member.name, memberPattern):
+                    fileNames.append(fileName + PACK_SEPARATOR + member.name)
+        elif memberPattern == None:
+            fileNames.append(fileName)
+    return fileNames
+
+MERCATOR_MAXLATITUDE = 85.0511287798
+""" The latitude limit of the Web Mercator projection. """
+
+def projectToMercator(latitudes, longitudes):
+    """
+    Project coordinates to Web Mercator.
+    
+    @param latitudes: The latitudes scaled by 1e7, e.g. L{TrackColumns.latitudes}.
+    @param longitudes: The longitudes scaled by 1e7.
+    @return: Tupel of the lists of x and y coordinates in the range 0..1; y grows from north to south.
+    """
+    limit = MERCATOR_MAXLATITUDE * 10000000
+    factor = pi / 180 / 10000000.0
+    ys = [0.5 - log(tan(pi / 4 + max(-limit, min(limit, latitude)) * factor / 2)) / (2 * pi)
+          for latitude in latitudes]
+    return [longitude / 3600000000.0 + 0.5 for longitude in longitudes], ys
+
+def fillBytes(byte, count):
+    """
+    Create a string of bytes with the given length.
+    
+    @param byte: The byte to fill into the string.
+    @param count: The length of the resulting string.
+    @return: A string of bytes with the given length.
+    """
+    assert count >= 0
+    return count * bytes([byte])
+
+def guessLogVersion(trackdata):
+    """
+    Determine log version.
+    
+    The log version 2.0 was introduced for WSG-1000 logs containing temperature and air pressure.
+    The temperature overlaps with the over speed flag of log version 1.0, so we must ignore this bit when searching
+    for a trackpoint with temperature/air pressure set.
+    """
+    dataPos = 0
+    for dataPos in range(0, len(trackdata), Trackpoint.TRACKPOINTLEN):
+        if Trackpoint(trackdata[dataPos:dataPos + Trackpoint.TRACKPOINTLEN]).getType() & int('1111111111111000', 2):
+            return 2.0
+    return 1.0
+
+def convertToTimestamp(dateTime):
+    """
+    Convert the date/time field value returned by L{Trackpoint.getDateTimeField()} to seconds since the epoch (UTC).
+    
+    This is the fast path of L{Trackpoint.convertToDateTime()} for bulk conversions: the date bits are looked up
+    in a cache, so no datetime object is created for the trackpoints of a day already seen.
+    
+    @param dateTime: The date/time field value.
+    @return: The seconds since the epoch.
+    """
+    dateBits = dateTime >> 17
+    try:
+        dayStart = daystartcache[dateBits]
+    except KeyError:
+        dayStart = getDayStart(dateBits)
+    return dayStart + ((dateTime >> 12) & 0x1f) * 3600 + ((dateTime >> 6) & 0x3f) * 60 + (dateTime & 0x3f)
+
+def getDayStart(dateBits):
+    """
+    Get the seconds since the epoch at midnight of a day. The result is kept in L{daystartcache}.
+    
+    @param dateBits: The date bits of a date/time field, i.e. the field value shifted right by 17 bits.
+    @return: The seconds since the epoch.
+    @raise ValueError: If the date bits aren't a valid date.
+    """
+    try:
+        return daystartcache[dateBits]
+    except KeyError:
+        day = dateBits & 0x1f
+        month = (dateBits >> 5) & 0x0f
+        year = (dateBits >> 9) + 2000
+        dayStart = daystartcache[dateBits] = \
+            (datetime.date(year, month, day).toordinal() - EPOCH_ORDINAL) * TK1File.SECONDS_PER_DAY
+        return dayStart
+
+def convertToDateTimeField(year, month, day, hour, minute, second):
+    """
+    Create the date/time field value of a trackpoint. This is the inverse of L{Trackpoint.convertToDateTime()}.
+    
+    @param year: The year (2000-2063).
+    @param month: The month.
+    @param day: The day of the month.
+    @param hour: The hour.
+    @param minute: The minute.
+    @param second: The second.
+    @return: The date/time field value.
+    """
+    assert 2000 <= year < 2064
+    return ((year - 2000) << 26) | (month << 22) | (day << 17) | (hour << 12) | (minute << 6) | second
+
+def convertFromTimestamp(timestamp):
+    """
+    Convert seconds since the epoch (UTC) to the date/time field value. This is the inverse of
+    L{convertToTimestamp()}; like there the date bits are cached, so bulk conversions create no datetime objects.
+    
+    @param timestamp: The seconds since the epoch as integer.
+    @return: The date/time field value.
+    """
+    days, seconds = divmod(timestamp, TK1File.SECONDS_PER_DAY)
+    try:
+        dateBits = datebitscache[days]
+    except KeyError:
+        date = datetime.date.fromordinal(days + EPOCH_ORDINAL)
+        assert 2000 <= date.year < 2064
+        dateBits = datebitscache[days] = ((date.year - 2000) << 26) | (date.month << 22) | (date.day << 17)
+    hours, seconds = divmod(seconds, 3600)
+    return dateBits | (hours << 12) | ((seconds // 60) << 6) | (seconds % 60)
+
+def packTrackpoints(types, dateTimeFields, latitudes, longitudes, altitudes):
+    """
+    Encode columns of trackpoint values into trackdata. This is the inverse of L{TrackColumns}.
+    
+    @param types: The type fields.
+    @param dateTimeFields: The date/time field values, see L{convertFromTimestamp()}.
+    @param latitudes: The latitude field values (decimal degrees scaled by 1e7).
+    @param longitudes: The longitude field values (decimal degrees scaled by 1e7).
+    @param altitudes: The altitudes in meters as integers.
+    @return: The trackdata as array of bytes.
+    """
+    count = len(dateTimeFields)
+    values = [None] * (5 * count)
+    values[0::5] = types
+    values[1::5] = dateTimeFields
+    values[2::5] = latitudes
+    values[3::5] = longitudes
+    values[4::5] = altitudes
+    return struct.pack("<" + "HIiih" * count, *values)
+
+COORDINATE_SCALE = 7
+""" The number of decimal digits of the integer latitude and longitude values (scaled by 1e7). """
+
+def formatScaled(value, scale, digits):
+    """
+    Format an integer value scaled by 10**scale as decimal number with the given number of fractional digits.
+    
+    Only integer arithmetic is used, so the result is exact. If digits is less than scale, the value is rounded
+    half away from zero. The result matches the "%.<digits>f" formatting of value / 10**scale, except for
+    values exactly halfway between two results, where the float formatting depends on the binary representation.
+    
+    @param value: The scaled integer value.
+    @param scale: The number of decimal digits of the scaled value.
+    @param digits: The number of fractional digits of the result.
+    @return: The formatted value.
+    """
+    if digits < scale:
+        divisor = 10 ** (scale - digits)
+        magnitude = (abs(value) + divisor // 2) // divisor
+    else:
+        magnitude = abs(value) * 10 ** (digits - scale)
+    integer, fraction = divmod(magnitude, 10 ** digits)
+    if digits == 0:
+        return "%s%i" % ("-" if value < 0 else "", integer)
+    return "%s%i.%0*i" % ("-" if value < 0 else "", integer, digits, fraction)
+
+def formatScaledColumn(values, scale, digits):
+    """
+    Format a column of integer values scaled by 10**scale, see L{formatScaled()}.
+    
+    @param values: An iterable of scaled integer values, e.g. a column of L{TrackColumns}.
+    @param scale: The number of decimal digits of the scaled values.
+    @param digits: The number of fractional digits of the results.
+    @return: A list of formatted values.
+    """
+    if scale == 0:
+        suffix = "." + "0" * digits if digits else ""
+        return ["%i%s" % (value, suffix) for value in values]
+    if digits == scale:
+        divisor = 10 ** digits
+        template = "%i.%0" + str(digits) + "i"
+        return [template % divmod(value, divisor) if value >= 0 else "-" + template % divmod(-value, divisor)
+                for value in values]
+    return [formatScaled(value, scale, digits) for value in values]
+
+def parseScaled(text, scale):
+    """
+    Parse a decimal number into an integer value scaled by 10**scale. This is the inverse of L{formatScaled()}.
+    
+    Only integer arithmetic is used; surplus fractional digits are rounded half away from zero.
+    
+    @param text: The decimal number as string or bytes, e.g. "51.0945793".
+    @param scale: The number of decimal digits of the scaled value.
+    @return: The scaled integer value.
+    @raise ValueError: If the text is no decimal number.
+    """
+    text = text.strip()
+    negative = text[:1] in ("-", b"-")
+    if negative or text[:1] in ("+", b"+"):
+        text = text[1:]
+    integer, _, fraction = text.partition("." if isinstance(text, str) else b".")
+    if len(fraction) > scale:
+        value = int(integer or 0) * 10 ** scale + int(fraction[:scale] or 0) + (int(fraction[scale:scale + 1]) >= 5)
+    else:
+        value = (int(integer or 0) * 10 ** len(fraction) + int(fraction or 0)) * 10 ** (scale - len(fraction))
+    return -value if negative else value
+
+def getGeonamesTimezoneId(lat, lng):
+    """
+    Query geonames.org for the timzoneId of the given GPS coordinate.
+    
+    @param lat: The latitude.
+    @param lng: The longitude.
+    @return: The timezoneId of the given GPS coordinate as string.
+    """
+    import urllib.request # pylint: disable-msg=C0415
+    result = urllib.request.urlopen("http://ws.geonames.org/timezone?lat=%s&lng=%s" % (lat, lng)).read()
+    result = result.decode("utf-8")
+    return re.search("<timezoneId>([^<]*)</timezoneId>", result).group(1)
+
+def determineTimezone(trackpoint):
+    """
+    Get the timezone as L{FixedOffset} for the GPS coordinate and time of the given L{Trackpoint}.
+
+    We use geonames.org to determine the timezoneId of the given GPS coordinate and use the Olson tz database to
+    calculate the timezone offset for the date and time of the L{Trackpoint}, taking daylight saving time into account.
+
+    We use L{FixedOffset} instead of the location timezone, because the local time should match the time recorded
+    by devices like cameras, which are unlikely to self-adjust their clock for DST. If the track happens to contain the
+    point of the beginning or ending of the DST, the local time would jump; this doesn't happen with the L{FixedOffset}
+    timezone as it ignores DST.
+        
+    @param trackpoint: The L{Trackpoint}.
     @return: Local timezone.
     """
     lat = trackpoint.getLatitude()
@@ -1452,6 +3684,101 @@ def parseTimezone(timezoneString):
     else:
         return None
     
+EARTH_RADIUS = 6371008.8
+""" The mean radius of the earth in metres. """
+
+def simplifyPolyline(xs, ys, tolerance, fixed = ()):
+    """
+    Simplify a polyline with the Douglas-Peucker algorithm.
+    
+    The line is split at the fixed points and the parts are simplified without recursion, using a stack of
+    pending segments. The distances of a segment are computed in one map() call per pass, so the running time is
+    O(n log n) for real tracks.
+    
+    @param xs: The x coordinates of the points in metres.
+    @param ys: The y coordinates of the points in metres.
+    @param tolerance: The maximum distance in metres between the original and the simplified line.
+    @param fixed: The indices of points which must be kept.
+    @return: The sorted list of the indices of the kept points.
+    """
+    count = len(xs)
+    keep = bytearray(count)
+    if count > 0:
+        keep[0] = keep[-1] = 1
+    for index in fixed:
+        keep[index] = 1
+    anchors = [index for index in range(count) if keep[index]]
+    segments = list(zip(anchors[:-1], anchors[1:]))
+    while segments:
+        start, end = segments.pop()
+        if end - start < 2:
+            continue
+        x0 = xs[start]
+        y0 = ys[start]
+        dx = xs[end] - x0
+        dy = ys[end] - y0
+        length = hypot(dx, dy)
+        if length == 0:
+            distances = list(map(lambda x, y: hypot(x - x0, y - y0), xs[start + 1:end], ys[start + 1:end]))
+            limit = tolerance
+        else:
+            # The cross product is the distance to the line multiplied by the segment length.
+            distances = list(map(lambda x, y: abs(dy * (x - x0) - dx * (y - y0)), xs[start + 1:end],
+                                 ys[start + 1:end]))
+            limit = tolerance * length
+        maximum = max(distances)
+        if maximum > limit:
+            index = start + 1 + distances.index(maximum)
+            keep[index] = 1
+            segments.append((index, end))
+            segments.append((start, index))
+    return [index for index in range(count) if keep[index]]
+
+def rankPolyline(xs, ys, fixed = ()):
+    """
+    Compute the Douglas-Peucker importance of every point of a polyline.
+    
+    The importance of a point is its distance to the segment it splits, limited by the importance of the point
+    which created the segment. So L{simplifyPolyline()} with a tolerance keeps exactly the points with an importance
+    greater than the tolerance, and the simplifications for all tolerances are computed in a single pass.
+    
+    @param xs: The x coordinates of the points in metres.
+    @param ys: The y coordinates of the points in metres.
+    @param fixed: The indices of points which must be kept.
+    @return: An array with the importance of every point in metres; infinite for the fixed points and the first
+             and the last point.
+    """
+    count = len(xs)
+    infinite = float('inf')
+    importance = array('d', bytes(8 * count))
+    if count > 0:
+        importance[0] = importance[-1] = infinite
+    for index in fixed:
+        importance[index] = infinite
+    anchors = [index for index in range(count) if importance[index] == infinite]
+    segments = [(start, end, infinite) for start, end in zip(anchors[:-1], anchors[1:])]
+    while segments:
+        start, end, limit = segments.pop()
+        if end - start < 2:
+            continue
+        x0 = xs[start]
+        y0 = ys[start]
+        dx = xs[end] - x0
+        dy = ys[end] - y0
+        length = hypot(dx, dy)
+        if length == 0:
+            distances = list(map(lambda x, y: hypot(x - x0, y - y0), xs[start + 1:end], ys[start + 1:end]))
+            length = 1.0
+        else:
+            distances = list(map(lambda x, y: abs(dy * (x - x0) - dx * (y - y0)), xs[start + 1:end],
+                                 ys[start + 1:end]))
+        maximum = max(distances)
+        index = start + 1 + distances.index(maximum)
+        value = importance[index] = min(maximum / length, limit)
+        segments.append((index, end, value))
+        segments.append((start, index, value))
+    return importance
+
 def calculateVincentyDistance(latitude1, longitude1, latitude2, longitude2):
     """
     Calculate the geodesic distance and the bearing between two points using the formula